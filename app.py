@@ -2,6 +2,7 @@
 import webview
 import os
 import sys
+import multiprocessing
 from pathlib import Path
 from gui.api import API
 
@@ -45,9 +46,14 @@ def main():
     # Set window reference in API
     api.set_window(window)
     
-    # Start GUI
-    webview.start()
+    # Start GUI (returns after the window is closed)
+    try:
+        webview.start()
+    finally:
+        api.close()
 
 
 if __name__ == '__main__':
+    # PyInstaller打包後，PDF用圖片轉換的行程池需要
+    multiprocessing.freeze_support()
     main()
\ No newline at end of file
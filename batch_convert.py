@@ -8,12 +8,27 @@ import os
 import sys
 import glob
 from pathlib import Path
-from vocus_converter import VocusArticleConverter
+from vocus_converter import VocusArticleConverter, check_already_converted
+from utils.html_parser import PARSER_CHOICES, DEFAULT_PARSER
+from utils.html_cleanup import load_ad_patterns
+from utils.article_cache import DEFAULT_MAX_MB
+from utils.cleanup_profile import CleanupProfile
+from utils.fetch_engine import FetchEngine, DEFAULT_MAX_IN_FLIGHT, DEFAULT_PER_HOST
+from utils.image_derivatives import DEFAULT_PDF_IMAGE_DPI
+from utils.rate_limiter import configure_rate_limiter, DEFAULT_RATE
+from utils.http_session import get_session, prewarm, connection_stats, reset_connection_stats
 
 
 def batch_convert(input_pattern="*.html", output_dir="output", images_dir="images", 
-                 skip_existing=False, force_overwrite=False, interactive=True):
-    """批次轉換HTML檔案"""
+                 skip_existing=False, force_overwrite=False, interactive=True,
+                 parser=DEFAULT_PARSER, ad_patterns=None, use_cache=True, cache_max_mb=DEFAULT_MAX_MB,
+                 profile_cleanup=False, profile_output=None, minify_pdf=True,
+                 max_in_flight=DEFAULT_MAX_IN_FLIGHT, per_host=DEFAULT_PER_HOST, prewarm_connections=0,
+                 use_image_store=True, use_http_cache=True, max_image_width=None,
+                 image_derivatives=True, pdf_image_dpi=DEFAULT_PDF_IMAGE_DPI,
+                 rate_limit=DEFAULT_RATE, max_bytes_per_sec=None, hedge_requests=True,
+                 offline_archive=None, record_archive=None):
+    """批次轉換HTML檔案（profile_cleanup 時回傳整批的 CleanupProfile）"""
     
     # 找到所有符合條件的HTML檔案
     html_files = glob.glob(input_pattern)
@@ -29,15 +44,11 @@ def batch_convert(input_pattern="*.html", output_dir="output", images_dir="image
     converted_files = []
     new_files = []
     
+    # 只串流讀取<head>，不為每個檔案建立轉換器
     print("檢查已轉換的文章...")
     for html_file in html_files:
         try:
-            converter = VocusArticleConverter(
-                input_file=html_file,
-                output_dir=output_dir,
-                images_dir=images_dir
-            )
-            already_converted, status = converter.check_already_converted()
+            already_converted, status = check_already_converted(html_file, output_dir)
             if already_converted:
                 converted_files.append((html_file, status))
             else:
@@ -109,22 +120,96 @@ def batch_convert(input_pattern="*.html", output_dir="output", images_dir="image
     success_count = 0
     fail_count = 0
     skip_count = len(html_files) - len(files_to_process)
+    profile = CleanupProfile() if profile_cleanup else None
     
-    for idx, html_file in enumerate(files_to_process, 1):
-        print(f"\n[{idx}/{len(files_to_process)}] 處理檔案: {html_file}")
+    # 整批共用的圖片下載引擎（同時下載數與每個主機的上限）
+    fetch_engine = FetchEngine(max_in_flight=max_in_flight, per_host=per_host, hedge=hedge_requests)
+    
+    # 每個主機的節流與斷路器（整批與兩個下載器共用）
+    configure_rate_limiter(rate=rate_limit, bytes_per_sec=max_bytes_per_sec)
+    
+    # 整批共用連線池，可先建立好到圖片主機的連線
+    reset_connection_stats()
+    get_session(pool_maxsize=per_host)
+    if prewarm_connections and offline_archive:
+        print("離線模式，不預先建立連線")
+    elif prewarm_connections:
+        opened = prewarm(connections=min(per_host, prewarm_connections))
+        print(f"已預先建立 {opened} 個連線")
+    
+    def start_article(html_file):
+        """建立轉換器並完成前半段（解析），圖片排入共用的下載引擎"""
+        converter = VocusArticleConverter(
+            input_file=html_file,
+            output_dir=output_dir,
+            images_dir=images_dir,
+            parser=parser,
+            ad_patterns=ad_patterns,
+            use_cache=use_cache,
+            cache_max_mb=cache_max_mb,
+            profile_cleanup=profile is not None,
+            minify_pdf=minify_pdf,
+            fetch_engine=fetch_engine,
+            use_image_store=use_image_store,
+            use_http_cache=use_http_cache,
+            max_image_width=max_image_width,
+            image_derivatives=image_derivatives,
+            pdf_image_dpi=pdf_image_dpi,
+            offline_archive=offline_archive,
+            record_archive=record_archive
+        )
+        try:
+            converter.prepare()
+        except Exception:
+            if profile is not None:
+                profile.merge(converter.cleanup_profile)
+            raise
+        return converter
+    
+    def finish_article(idx, html_file, converter):
+        """等待圖片並轉換PDF，回傳是否成功"""
+        print(f"\n[{idx}/{len(files_to_process)}] 等待圖片並轉換PDF: {html_file}")
         print("-"*50)
-        
         try:
-            converter = VocusArticleConverter(
-                input_file=html_file,
-                output_dir=output_dir,
-                images_dir=images_dir
-            )
-            converter.convert()
-            success_count += 1
+            converter.finish()
+            return True
         except Exception as e:
             print(f"錯誤：處理檔案 {html_file} 時發生錯誤: {str(e)}")
-            fail_count += 1
+            return False
+        finally:
+            if profile is not None:
+                profile.merge(converter.cleanup_profile)
+    
+    # 文章N+1先解析並排入圖片，再等待文章N的圖片並轉換PDF，
+    # 整批的同時下載數才能涵蓋相鄰的文章，不會在每篇文章之間閒置
+    pending = None  # (編號, 檔案, 轉換器)：已解析、圖片下載中的上一篇文章
+    try:
+        for idx, html_file in enumerate(files_to_process, 1):
+            print(f"\n[{idx}/{len(files_to_process)}] 處理檔案: {html_file}")
+            print("-"*50)
+            
+            try:
+                converter = start_article(html_file)
+            except Exception as e:
+                # 上一篇繼續等到下一篇文章解析完成
+                print(f"錯誤：處理檔案 {html_file} 時發生錯誤: {str(e)}")
+                fail_count += 1
+                continue
+            
+            if pending is not None:
+                if finish_article(*pending):
+                    success_count += 1
+                else:
+                    fail_count += 1
+            pending = (idx, html_file, converter)
+        
+        if pending is not None:
+            if finish_article(*pending):
+                success_count += 1
+            else:
+                fail_count += 1
+    finally:
+        fetch_engine.close()
     
     print("\n" + "="*50)
     print("批次轉換完成！")
@@ -132,7 +217,18 @@ def batch_convert(input_pattern="*.html", output_dir="output", images_dir="image
     print(f"失敗: {fail_count} 個檔案")
     if skip_count > 0:
         print(f"跳過: {skip_count} 個檔案")
+    stats = connection_stats()
+    print(f"HTTP請求: {stats['requests']} 次，新建連線: {stats['connections']} 次")
+    if fetch_engine.stats['hedged']:
+        print(f"對沖請求: {fetch_engine.stats['hedged']} 次，其中 {fetch_engine.stats['hedge_wins']} 次較快完成")
     print("="*50)
+    
+    if profile is not None:
+        print(profile.format_report())
+        if profile_output:
+            profile.save(profile_output)
+            print(f"效能分析結果已儲存至: {profile_output}")
+        return profile
 
 
 def main():
@@ -148,6 +244,42 @@ def main():
     )
     parser.add_argument('--output-dir', '-o', default='output', help='輸出目錄')
     parser.add_argument('--images-dir', '-i', default='images', help='圖片目錄')
+    parser.add_argument('--parser', choices=PARSER_CHOICES, default=DEFAULT_PARSER,
+                        help=f'HTML解析引擎，不可用時自動退回html.parser (預設: {DEFAULT_PARSER})')
+    parser.add_argument('--ad-patterns', help='額外的廣告關鍵字檔案（每行一個）')
+    parser.add_argument('--no-cache', action='store_true', help='不使用解析結果快取')
+    parser.add_argument('--cache-max-mb', type=int, default=DEFAULT_MAX_MB,
+                        help=f'解析結果快取容量上限 (預設: {DEFAULT_MAX_MB} MB)')
+    parser.add_argument('--profile-cleanup', action='store_true',
+                        help='記錄每條清理規則的耗時與移除節點數並彙總整批結果（建議搭配 --no-cache）')
+    parser.add_argument('--profile-output', help='將清理規則效能分析結果寫入JSON檔案')
+    parser.add_argument('--no-minify', action='store_true', help='PDF轉換前不精簡HTML')
+    parser.add_argument('--max-in-flight', type=int, default=DEFAULT_MAX_IN_FLIGHT,
+                        help=f'整批同時下載的圖片請求數上限 (預設: {DEFAULT_MAX_IN_FLIGHT})')
+    parser.add_argument('--per-host', type=int, default=DEFAULT_PER_HOST,
+                        help=f'同一個主機同時下載的請求數上限 (預設: {DEFAULT_PER_HOST})')
+    parser.add_argument('--prewarm', type=int, default=0, metavar='N',
+                        help='開始轉換前先建立到每個圖片主機的N個連線 (預設: 0，不預先連線)')
+    parser.add_argument('--no-image-store', action='store_true',
+                        help='不使用圖片儲存區（每篇文章各自下載與儲存圖片）')
+    parser.add_argument('--no-http-cache', action='store_true',
+                        help='重新下載圖片時不送出條件式請求（If-None-Match / If-Modified-Since）')
+    parser.add_argument('--max-image-width', type=int, metavar='PX',
+                        help='先下載這個寬度的縮圖（例如1600），失敗時退回原圖 (預設: 下載原圖)')
+    parser.add_argument('--no-image-derivatives', action='store_true',
+                        help='PDF直接嵌入原圖，不先縮小與轉檔')
+    parser.add_argument('--pdf-image-dpi', type=int, default=DEFAULT_PDF_IMAGE_DPI,
+                        help=f'PDF用圖片縮小到的頁面解析度 (預設: {DEFAULT_PDF_IMAGE_DPI})')
+    parser.add_argument('--rate-limit', type=float, default=DEFAULT_RATE,
+                        help=f'每個主機每秒的請求數上限 (預設: {DEFAULT_RATE:g})')
+    parser.add_argument('--max-bytes-per-sec', type=int,
+                        help='每個主機每秒下載的位元組數上限 (預設: 不限制)')
+    parser.add_argument('--no-hedge', action='store_true',
+                        help='不使用對沖請求（下載方式失敗後才嘗試下一個）')
+    parser.add_argument('--offline-archive', metavar='PATH',
+                        help='離線模式：圖片只從這個封存（目錄或.zip）取得，缺少的圖片只回報不下載')
+    parser.add_argument('--record-archive', metavar='PATH',
+                        help='把下載完成的圖片記錄到這個封存（目錄或.zip），供之後離線重播')
     
     # 新增的重複處理選項
     group = parser.add_mutually_exclusive_group()
@@ -176,7 +308,27 @@ def main():
         images_dir=args.images_dir,
         skip_existing=args.skip_existing,
         force_overwrite=args.force_overwrite,
-        interactive=not args.non_interactive
+        interactive=not args.non_interactive,
+        parser=args.parser,
+        ad_patterns=load_ad_patterns(args.ad_patterns) if args.ad_patterns else None,
+        use_cache=not args.no_cache,
+        cache_max_mb=args.cache_max_mb,
+        profile_cleanup=args.profile_cleanup or bool(args.profile_output),
+        profile_output=args.profile_output,
+        minify_pdf=not args.no_minify,
+        max_in_flight=args.max_in_flight,
+        per_host=args.per_host,
+        prewarm_connections=args.prewarm,
+        use_image_store=not args.no_image_store,
+        use_http_cache=not args.no_http_cache,
+        max_image_width=args.max_image_width,
+        image_derivatives=not args.no_image_derivatives,
+        pdf_image_dpi=args.pdf_image_dpi,
+        rate_limit=args.rate_limit,
+        max_bytes_per_sec=args.max_bytes_per_sec,
+        hedge_requests=not args.no_hedge,
+        offline_archive=args.offline_archive,
+        record_archive=args.record_archive
     )
 
 
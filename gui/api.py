@@ -12,6 +12,8 @@ from pathlib import Path
 sys.path.append(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
 
 from vocus_converter import VocusArticleConverter
+from utils.article_metadata import read_head_metadata
+from utils.fetch_engine import FetchEngine
 
 
 class API:
@@ -23,6 +25,9 @@ class API:
         self.progress_queue = queue.Queue()
         self.converter = None
         self.window = None  # Will be set by the main app
+        # Image downloads share one in-flight budget across every file the GUI converts;
+        # the engine starts on first use and is closed after each conversion run
+        self.fetch_engine = FetchEngine()
         
     def set_window(self, window):
         """Set the webview window reference"""
@@ -62,6 +67,37 @@ class API:
         # For now, return the paths as-is
         return [f['path'] for f in file_objects]
         
+    def _resolve_file_path(self, file_object):
+        """Resolve a file object from the GUI to an absolute path"""
+        file_path = file_object['path']
+        # If path is relative or just filename, make it absolute
+        if not os.path.isabs(file_path):
+            # Assume it's in article_html directory
+            if not file_path.startswith('article_html/'):
+                file_path = f"article_html/{file_object['name']}"
+            # Convert to absolute path
+            file_path = os.path.abspath(file_path)
+        return file_path
+        
+    def get_files_info(self, file_objects):
+        """Read title/author/dates for the file list (head-only, no full parse)"""
+        infos = []
+        for f in file_objects:
+            file_path = self._resolve_file_path(f)
+            info = {'name': f['name'], 'path': f['path']}
+            try:
+                metadata = read_head_metadata(file_path)
+                info.update({
+                    'title': metadata['title'] or '',
+                    'author': metadata['author'],
+                    'pubdate': metadata['pubdate'] or '',
+                    'lastmod': metadata['lastmod'] or metadata['modified_time'] or ''
+                })
+            except Exception as e:
+                info['error'] = str(e)
+            infos.append(info)
+        return {'success': True, 'files': infos}
+        
     def start_conversion(self, params):
         """Start the conversion process in a background thread"""
         if self.conversion_thread and self.conversion_thread.is_alive():
@@ -72,34 +108,32 @@ class API:
         
         # Start conversion in background thread
         self.conversion_thread = threading.Thread(
-            target=self._run_conversion,
+            target=self._run_conversion_and_release,
             args=(params,)
         )
         self.conversion_thread.start()
         
         return {'success': True}
         
+    def _run_conversion_and_release(self, params):
+        """Run a conversion, then stop the download engine's threads until the next run"""
+        try:
+            self._run_conversion(params)
+        finally:
+            self.fetch_engine.close()
+            
     def _run_conversion(self, params):
         """Run the actual conversion process"""
         # Extract file paths from file objects
         file_objects = params['files']
-        files = []
-        for f in file_objects:
-            file_path = f['path']
-            # If path is relative or just filename, make it absolute
-            if not os.path.isabs(file_path):
-                # Assume it's in article_html directory
-                if not file_path.startswith('article_html/'):
-                    file_path = f"article_html/{f['name']}"
-                # Convert to absolute path
-                file_path = os.path.abspath(file_path)
-            files.append(file_path)
+        files = [self._resolve_file_path(f) for f in file_objects]
             
         convert_pdf = params['convert_pdf']
         convert_md = params['convert_md']
         
         results = []
         total_files = len(files)
+        prepared = {}  # index -> parsed converter (or the exception raised while parsing it)
         
         for idx, file_path in enumerate(files):
             if self.stop_event.is_set():
@@ -146,38 +180,21 @@ class API:
             })
             
             try:
-                # Determine output and images directories
-                try:
-                    # Check if running as packaged app
-                    if hasattr(sys, '_MEIPASS'):
-                        # Running as packaged app - use user's Documents folder
-                        home_dir = Path.home()
-                        base_dir = home_dir / "VocusConverter"
-                        output_dir = str(base_dir / "output")
-                        images_dir = str(base_dir / "images")
-                    else:
-                        # Running from source - use current directory
-                        output_dir = "output"
-                        images_dir = "images"
-                except Exception:
-                    # Fallback
-                    output_dir = "output"
-                    images_dir = "images"
+                # Parse HTML first (this is essential!); images start downloading as they are found.
+                # The next file may already have been parsed while the previous one was converting
+                converter = prepared.pop(idx) if idx in prepared else self._start_article(file_path)
+                
+                # Parse the next file now so its images download while this one waits and renders;
+                # the shared engine's in-flight budget then spans neighbouring articles
+                if idx + 1 < total_files and not self.stop_event.is_set():
+                    prepared[idx + 1] = self._start_article(files[idx + 1])
                 
-                # Create converter with progress callback
-                converter = VocusArticleConverter(
-                    file_path,
-                    output_dir=output_dir,
-                    images_dir=images_dir,
-                    image_progress_callback=self._image_progress_callback
-                )
+                if isinstance(converter, Exception):
+                    raise converter
                 
                 # Store current filename for progress callback
                 self.current_filename = filename
                 
-                # Parse HTML first (this is essential!)
-                converter.parse_html()
-                
                 # Download images if they exist
                 if converter.images:
                     converter.download_images()
@@ -308,6 +325,40 @@ class API:
             'report_path': report_path
         })
         
+    def _output_dirs(self):
+        """Output and images directories"""
+        try:
+            # Check if running as packaged app
+            if hasattr(sys, '_MEIPASS'):
+                # Running as packaged app - use user's Documents folder
+                home_dir = Path.home()
+                base_dir = home_dir / "VocusConverter"
+                return str(base_dir / "output"), str(base_dir / "images")
+        except Exception:
+            pass
+        # Running from source (or fallback) - use current directory
+        return "output", "images"
+        
+    def _start_article(self, file_path):
+        """
+        Create a converter and parse the file; its images are queued on the shared engine while parsing.
+        Errors are returned instead of raised so they are reported when that file's turn comes
+        """
+        try:
+            output_dir, images_dir = self._output_dirs()
+            # Create converter with progress callback
+            converter = VocusArticleConverter(
+                file_path,
+                output_dir=output_dir,
+                images_dir=images_dir,
+                image_progress_callback=self._image_progress_callback,
+                fetch_engine=self.fetch_engine
+            )
+            converter.parse_html(start_downloads=True)
+            return converter
+        except Exception as e:
+            return e
+        
     def _image_progress_callback(self, current, total):
         """Callback for image download progress"""
         self._send_progress({
@@ -340,6 +391,16 @@ class API:
             self.conversion_thread.join(timeout=5)
         return {'success': True}
         
+    def close(self):
+        """Stop any running conversion and release the download engine (called on app shutdown)"""
+        self.stop_event.set()
+        self.pause_event.clear()
+        # The window is gone; progress updates have nowhere to go
+        self.window = None
+        if self.conversion_thread and self.conversion_thread.is_alive():
+            self.conversion_thread.join()
+        self.fetch_engine.close()
+        
     def _generate_report(self, results):
         """Generate conversion report in JSON and YAML formats"""
         timestamp = datetime.now().strftime("%Y%m%d%H%M")
@@ -21,7 +21,7 @@ document.addEventListener('DOMContentLoaded', function() {
     stopBtn.addEventListener('click', stopConversion);
 });
 
-function handleFileSelection(event) {
+async function handleFileSelection(event) {
     const files = Array.from(event.target.files);
     selectedFiles = files.map(file => ({
         name: file.name,
@@ -30,6 +30,21 @@ function handleFileSelection(event) {
     
     updateFileList();
     updateButtonStates();
+    
+    // Load article titles from <head> only (no full parse)
+    try {
+        const result = await window.pywebview.api.get_files_info(selectedFiles);
+        if (result.success) {
+            selectedFiles = selectedFiles.map((file, index) => ({
+                ...file,
+                title: result.files[index].title,
+                pubdate: result.files[index].pubdate
+            }));
+            updateFileList();
+        }
+    } catch (error) {
+        console.log('Failed to load file info:', error);
+    }
 }
 
 function updateFileList() {
@@ -40,12 +55,24 @@ function updateFileList() {
         return;
     }
     
-    fileList.innerHTML = selectedFiles.map((file, index) => `
-        <div class="file-item">
-            <span>${file.name}</span>
-            <button class="remove-btn" onclick="removeFile(${index})">移除</button>
-        </div>
-    `).join('');
+    // Titles come from the article pages themselves, so they are set as text, never as HTML
+    fileList.innerHTML = '';
+    selectedFiles.forEach((file, index) => {
+        const item = document.createElement('div');
+        item.className = 'file-item';
+
+        const label = document.createElement('span');
+        label.textContent = file.title ? `${file.title} (${file.name})` : file.name;
+        item.appendChild(label);
+
+        const removeBtn = document.createElement('button');
+        removeBtn.className = 'remove-btn';
+        removeBtn.textContent = '移除';
+        removeBtn.addEventListener('click', () => removeFile(index));
+        item.appendChild(removeBtn);
+
+        fileList.appendChild(item);
+    });
 }
 
 function removeFile(index) {
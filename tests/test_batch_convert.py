@@ -0,0 +1,74 @@
+"""批次轉換流程的測試"""
+import io
+import glob
+import tempfile
+import contextlib
+import unittest
+from pathlib import Path
+from unittest import mock
+
+import batch_convert
+
+
+class PipelineTest(unittest.TestCase):
+
+    def setUp(self):
+        self._tmp = tempfile.TemporaryDirectory()
+        self.tmp = Path(self._tmp.name)
+        for name in ("a.html", "b.html", "c.html"):
+            (self.tmp / name).write_text("<html></html>", encoding='utf-8')
+        self.events = []
+
+    def tearDown(self):
+        self._tmp.cleanup()
+
+    def fake_converter(self, fail_prepare=()):
+        events = self.events
+
+        class FakeConverter:
+            def __init__(self, input_file, **options):
+                self.name = Path(input_file).name
+                self.cleanup_profile = None
+
+            def prepare(self):
+                if self.name in fail_prepare:
+                    raise ValueError("壞掉的檔案")
+                events.append(("prepare", self.name))
+
+            def finish(self):
+                events.append(("finish", self.name))
+
+        return FakeConverter
+
+    def files(self):
+        """batch_convert 處理檔案的順序"""
+        return [Path(path).name for path in glob.glob(str(self.tmp / "*.html"))]
+
+    def run_batch(self, converter):
+        pattern = str(self.tmp / "*.html")
+        with mock.patch.object(batch_convert, 'VocusArticleConverter', converter), \
+                contextlib.redirect_stdout(io.StringIO()) as out:
+            batch_convert.batch_convert(pattern, output_dir=str(self.tmp / "output"), interactive=False)
+        return out.getvalue()
+
+    def test_next_article_is_prepared_before_previous_finishes(self):
+        output = self.run_batch(self.fake_converter())
+        first, second, third = self.files()
+        self.assertEqual(self.events, [
+            ("prepare", first), ("prepare", second), ("finish", first),
+            ("prepare", third), ("finish", second), ("finish", third),
+        ])
+        self.assertIn("成功: 3 個檔案", output)
+
+    def test_failed_prepare_does_not_block_neighbours(self):
+        first, second, third = self.files()
+        output = self.run_batch(self.fake_converter(fail_prepare=(second,)))
+        self.assertEqual(self.events, [
+            ("prepare", first), ("prepare", third), ("finish", first), ("finish", third),
+        ])
+        self.assertIn("成功: 2 個檔案", output)
+        self.assertIn("失敗: 1 個檔案", output)
+
+
+if __name__ == "__main__":
+    unittest.main()
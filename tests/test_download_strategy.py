@@ -0,0 +1,48 @@
+"""下載策略排序的測試"""
+import tempfile
+import unittest
+from pathlib import Path
+
+from utils.download_strategy import StrategyStats
+
+ORIGINAL = "https://images.vocus.cc/abc/photo.jpg"
+RESIZED = "https://resize-image.vocus.cc/resize?url=https%3A%2F%2Fimages.vocus.cc%2Fabc%2Fphoto.jpg&width=740"
+
+
+class StrategyOrderTest(unittest.TestCase):
+
+    def setUp(self):
+        self._tmp = tempfile.TemporaryDirectory()
+        self.stats = StrategyStats(Path(self._tmp.name) / "stats.json")
+
+    def tearDown(self):
+        self._tmp.cleanup()
+
+    def attempts(self):
+        return [("原始URL", ORIGINAL, None), ("Resize URL", RESIZED, None), ("網頁模式", ORIGINAL, None)]
+
+    def test_faster_resize_host_never_outranks_working_original(self):
+        for _ in range(50):
+            self.stats.record(RESIZED, "Resize URL", True, 0.05)
+            self.stats.record(ORIGINAL, "原始URL", True, 2.0)
+        self.stats.record(ORIGINAL, "原始URL", False, 0)
+
+        names = [name for name, _, _ in self.stats.order(self.attempts())]
+        self.assertEqual(names[0], "原始URL")
+        self.assertEqual(names[-1], "Resize URL")
+
+    def test_strategies_for_same_url_are_reordered(self):
+        for _ in range(20):
+            self.stats.record(ORIGINAL, "網頁模式", True, 0.1)
+            self.stats.record(ORIGINAL, "原始URL", False, 0)
+
+        names = [name for name, _, _ in self.stats.order(self.attempts())]
+        self.assertEqual(names, ["網頁模式", "原始URL", "Resize URL"])
+
+    def test_no_history_keeps_original_order(self):
+        names = [name for name, _, _ in self.stats.order(self.attempts())]
+        self.assertEqual(names, ["原始URL", "網頁模式", "Resize URL"])
+
+
+if __name__ == "__main__":
+    unittest.main()
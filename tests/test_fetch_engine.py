@@ -0,0 +1,115 @@
+"""下載排程引擎對沖請求的測試"""
+import time
+import threading
+import unittest
+
+from utils.fetch_engine import FetchEngine, hedge_cancelled, claim_result, response_started, on_hedge_cancel
+
+PRIMARY = "https://images.vocus.cc/abc/photo.jpg"
+FALLBACK = "https://resize-image.vocus.cc/resize?url=photo.jpg&width=740"
+
+
+def streaming_fetch(calls, name, first_byte_after, total, signal=True):
+    """模擬下載：first_byte_after 秒後收到回應，total 秒後傳輸完成"""
+    def fetch():
+        calls.append(name)
+        time.sleep(first_byte_after)
+        if signal:
+            response_started()
+        deadline = time.monotonic() + total - first_byte_after
+        while time.monotonic() < deadline:
+            if hedge_cancelled():
+                return None
+            time.sleep(0.01)
+        return claim_result() or None
+    return fetch
+
+
+def stalled_fetch(calls, name, aborted, first_byte_after=0.3):
+    """模擬收到回應後讀取卡住的下載：不檢查 hedge_cancelled()，只有中斷函數能讓它結束"""
+    def fetch():
+        calls.append(name)
+        time.sleep(first_byte_after)
+        response_started()
+        on_hedge_cancel(aborted.set)
+        if not aborted.wait(10):
+            return claim_result() or None
+        raise ConnectionError("connection aborted")
+    return fetch
+
+
+def failing_fetch(calls, name, delay):
+    def fetch():
+        calls.append(name)
+        time.sleep(delay)
+        raise RuntimeError("boom")
+    return fetch
+
+
+class HedgeTest(unittest.TestCase):
+
+    def run_job(self, attempts):
+        with FetchEngine(max_in_flight=4, per_host=2) as engine:
+            engine.hedge_delay = lambda host: 0.1
+            result = engine.submit(attempts).result(timeout=10)
+            return result, engine.stats
+
+    def test_slow_streaming_but_responsive_download_is_not_hedged(self):
+        calls = []
+        result, stats = self.run_job([
+            (PRIMARY, streaming_fetch(calls, "primary", first_byte_after=0.01, total=0.6)),
+            (FALLBACK, streaming_fetch(calls, "fallback", first_byte_after=0.01, total=0.05)),
+        ])
+        self.assertTrue(result)
+        self.assertEqual(calls, ["primary"])
+        self.assertEqual(stats['hedged'], 0)
+
+    def test_unresponsive_download_is_hedged(self):
+        calls = []
+        result, stats = self.run_job([
+            (PRIMARY, streaming_fetch(calls, "primary", first_byte_after=0.6, total=0.6)),
+            (FALLBACK, streaming_fetch(calls, "fallback", first_byte_after=0.01, total=0.05)),
+        ])
+        self.assertTrue(result)
+        self.assertEqual(calls, ["primary", "fallback"])
+        self.assertEqual(stats['hedged'], 1)
+        self.assertEqual(stats['hedge_wins'], 1)
+
+    def test_stalled_loser_is_aborted_when_winner_claims(self):
+        calls, aborted = [], threading.Event()
+        start = time.monotonic()
+        result, stats = self.run_job([
+            (PRIMARY, stalled_fetch(calls, "primary", aborted)),
+            (FALLBACK, streaming_fetch(calls, "fallback", first_byte_after=0.4, total=0.5)),
+        ])
+        # 引擎關閉時不必等卡住的讀取逾時
+        self.assertLess(time.monotonic() - start, 3)
+        self.assertTrue(result)
+        self.assertTrue(aborted.is_set())
+        self.assertEqual(stats['hedge_wins'], 1)
+
+    def test_raising_attempt_aborts_its_siblings(self):
+        calls, aborted = [], threading.Event()
+        start = time.monotonic()
+        with FetchEngine(max_in_flight=4, per_host=2) as engine:
+            engine.hedge_delay = lambda host: 0.1
+            future = engine.submit([
+                (PRIMARY, stalled_fetch(calls, "primary", aborted, first_byte_after=0.2)),
+                (FALLBACK, failing_fetch(calls, "fallback", delay=0.4)),
+            ])
+            with self.assertRaises(RuntimeError):
+                future.result(timeout=10)
+        self.assertLess(time.monotonic() - start, 3)
+        self.assertEqual(calls, ["primary", "fallback"])
+        self.assertTrue(aborted.is_set())
+
+    def test_first_byte_latency_is_recorded(self):
+        with FetchEngine(max_in_flight=2, per_host=2) as engine:
+            engine.submit([(PRIMARY, streaming_fetch([], "primary", first_byte_after=0.05, total=0.4))]).result(timeout=10)
+            samples = list(engine._latencies["images.vocus.cc"])
+        self.assertEqual(len(samples), 1)
+        self.assertLess(samples[0], 0.3)
+
+
+if __name__ == "__main__":
+    unittest.main()
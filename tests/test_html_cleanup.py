@@ -0,0 +1,106 @@
+"""HTML清理引擎與原本逐項清理的一致性測試"""
+import random
+import unittest
+
+from bs4 import BeautifulSoup
+
+from utils.benchmark_cleanup import legacy_clean, engine_clean, synthetic_article
+
+# 每條規則與規則之間的交互作用
+FIXTURES = {
+    'zoom_control': '<div class="zoom-control"><svg></svg></div><div class="zoom-control"><img src="../../images/a/1.png"/></div>',
+    'expand_button': '<figure><button aria-label="Expand image"><svg></svg></button><img src="../../images/a/1.png"/></figure>',
+    'rmiz_wrapper': ('<div data-rmiz=""><div data-rmiz-content="found"><img src="../../images/a/1.png"/>'
+                     '<img src="https://images.vocus.cc/remote.png"/></div></div>'),
+    'rmiz_on_img': '<p><img data-rmiz="" src="../../images/a/1.png"/></p>',
+    'rmiz_img_in_ad': '<div class="ad-box"><img data-rmiz="" src="../../images/a/1.png"/></div>',
+    'ghost': '<div data-rmiz-ghost=""><img src="../../images/a/1.png"/></div><p>內文</p>',
+    'ad_text': ('<p>廣告</p><div><span>為什麼會看到廣告</span></div>'
+                '<p>這篇文章談的是廣告投放的策略與實際執行的經驗分享</p><p>ads</p>'),
+    'ad_text_with_image': '<div>廣告<img src="../../images/a/1.png"/></div>',
+    'ui_class': ('<div class="header"><img src="../../images/a/1.png"/><span>標題</span></div>'
+                 '<div class="my-zoom-wrapper"><img class="zoom-img" src="https://x/y.png"/></div>'),
+    'btn_zoom_img': ('<span data-rmiz-btn-zoom=""><img data-rmiz-btn-zoom="" src="../../images/a/1.png"/></span>'
+                     '<img data-rmiz-btn-zoom="" src="https://x/y.png"/>'),
+    'nested_rules': ('<div class="advertisement"><div data-rmiz=""><div data-rmiz-ghost="">ads</div>'
+                     '<img class="ad" src="../../images/a/1.png"/></div></div>'),
+    'empty_divs': '<div><div> </div><div><span></span></div></div><div><video></video></div><div><iframe src="x"></iframe></div>',
+}
+
+# 隨機組合用的元素（每張圖片的src都不同，見 CleanupEngine.clean 的說明）
+OPEN_TAGS = [
+    '<div>', '<div class="zoom-control">', '<div class="ad-slot">', '<div class="x">', '<div data-rmiz="">',
+    '<div data-rmiz-ghost="">', '<button aria-label="Expand image">', '<svg>', '<span>', '<p>', '<figure>',
+    '<span data-rmiz-btn-zoom="">', '<div class="my-zoom">', '<div class="advertisement">', '<section>',
+]
+LEAVES = [
+    '<img src="../../images/a/{n}.png"/>', '<img src="https://x/{n}.png"/>',
+    '<img data-rmiz="" src="../../images/a/{n}.png"/>', '<img class="ad" src="../../images/a/{n}.png"/>',
+    '<img class="zoom" src="https://x/{n}.png"/>', '<img data-rmiz-btn-zoom="" src="../../images/a/{n}.png"/>',
+    '廣告', 'ads', '為什麼會看到廣告', '短字', ' ', '這是一段很長的正常文字內容，不應該被刪除的說明文字',
+]
+RANDOM_CASES = 300
+
+
+def random_fragment(rng, depth=0):
+    parts = []
+    for _ in range(rng.randint(1, 3)):
+        if depth < 4 and rng.random() < 0.55:
+            tag = rng.choice(OPEN_TAGS)
+            name = tag[1:].split()[0].rstrip('>')
+            parts.append(f'{tag}{random_fragment(rng, depth + 1)}</{name}>')
+        else:
+            parts.append(rng.choice(LEAVES).format(n=rng.randrange(10 ** 9)))
+    return ''.join(parts)
+
+
+def clean_with(clean, html):
+    soup = BeautifulSoup(f'<article><section>{html}</section></article>', 'html.parser')
+    root = soup.find('article')
+    clean(root)
+    return str(root)
+
+
+class CleanupParityTest(unittest.TestCase):
+
+    def assert_parity(self, html):
+        try:
+            expected = clean_with(legacy_clean, html)
+        except AttributeError:
+            # 逐項清理存取已被移除的文字節點（見 CleanupEngine.clean 的說明）
+            return
+        self.assertEqual(clean_with(engine_clean, html), expected)
+
+    def test_fixtures(self):
+        for name, html in FIXTURES.items():
+            with self.subTest(name):
+                self.assert_parity(html)
+
+    def test_synthetic_article(self):
+        html = synthetic_article(40, seed=1)
+        outputs = []
+        for clean in (legacy_clean, engine_clean):
+            soup = BeautifulSoup(html, 'html.parser')
+            clean(soup.find('article'))
+            outputs.append(str(soup))
+        self.assertEqual(outputs[1], outputs[0])
+        self.assertEqual(outputs[0].count('<img'), 40)
+
+    def test_random_trees(self):
+        rng = random.Random(20240601)
+        for case in range(RANDOM_CASES):
+            html = random_fragment(rng)
+            with self.subTest(case=case, html=html):
+                self.assert_parity(html)
+
+    def test_identical_images_are_each_kept(self):
+        # 逐項清理的 set 把兩張標記相同的圖片視為同一張，第一張被移除後第二張也跟著被移除
+        html = ('<div data-rmiz-ghost=""><img class="ad" src="../../images/a/1.png"/></div>'
+                '<img class="ad" src="../../images/a/1.png"/>')
+        self.assertEqual(clean_with(engine_clean, html),
+                         '<article><section><img class="ad" src="../../images/a/1.png"/></section></article>')
+        self.assertEqual(clean_with(legacy_clean, html), '<article><section></section></article>')
+
+
+if __name__ == "__main__":
+    unittest.main()
@@ -0,0 +1,58 @@
+"""以mmap讀取HTML的測試"""
+import tempfile
+import unittest
+from pathlib import Path
+
+from bs4 import BeautifulSoup
+
+from utils.html_input import open_html, normalize_newlines
+
+PAGE = ('<html><head><meta charset="big5"><meta name="pubdate" content="2024-05-01T08:00:00Z">'
+        '</head>\r\n<body><!-- <img src="comment.png"> -->'
+        '<script>var s = "<img src=\'script.png\'>";</script>'
+        '<p>圖片<img data-src="https://images.vocus.cc/a.png" src="&quot;x&quot;.png"></p>\r'
+        '<img src="b.png"/></body></html>')
+
+
+class HtmlSourceTest(unittest.TestCase):
+
+    def setUp(self):
+        self._tmp = tempfile.TemporaryDirectory()
+        self.path = Path(self._tmp.name) / "article.html"
+
+    def tearDown(self):
+        self._tmp.cleanup()
+
+    def write(self, encoding):
+        self.path.write_bytes(PAGE.encode(encoding))
+
+    def assert_same_tags(self, soup, expected):
+        for name in ('meta', 'img'):
+            self.assertEqual([tag.attrs for tag in soup.find_all(name)],
+                             [tag.attrs for tag in expected.find_all(name)])
+
+    def test_parse_tags_matches_full_parse(self):
+        self.write('big5')
+        expected = BeautifulSoup(self.path.read_bytes(), 'html.parser', from_encoding='big5')
+        with open_html(self.path) as source:
+            soup = source.parse_tags(('meta', 'img'))
+        self.assert_same_tags(soup, expected)
+        self.assertEqual(len(soup.find_all('img')), 2)
+
+    def test_parse_tags_for_utf16(self):
+        self.write('utf-16')
+        expected = BeautifulSoup(self.path.read_bytes().decode('utf-16'), 'html.parser')
+        with open_html(self.path) as source:
+            self.assert_same_tags(source.parse_tags(('meta', 'img')), expected)
+
+    def test_normalize_newlines_on_mmap(self):
+        self.write('utf-8')
+        with open_html(self.path) as source:
+            normalized = normalize_newlines(source.data)
+        self.assertIsInstance(normalized, bytes)
+        self.assertEqual(normalized, normalize_newlines(PAGE.encode('utf-8')))
+        self.assertNotIn(b'\r', normalized)
+
+
+if __name__ == "__main__":
+    unittest.main()
@@ -0,0 +1,50 @@
+"""PDF用HTML精簡的測試"""
+import tempfile
+import unittest
+from pathlib import Path
+
+from utils.html_minify import minify_html
+from vocus_converter import VocusArticleConverter
+
+CONTENT = ('<div class="article-content"><div><p class="para">'
+           '<span style="color: rgb(230, 0, 0);">紅字</span> '
+           '<span style="font-weight: bold; font-style: italic">粗斜體</span> '
+           '<span style="background-color: #ff0; cursor: pointer;">底色</span> '
+           '<span class="empty" style=" ; ">一般</span>'
+           '</p></div></div>')
+
+
+class MinifyStyleTest(unittest.TestCase):
+
+    def test_rendering_styles_are_kept(self):
+        html, _ = minify_html(CONTENT)
+        self.assertIn('<span style="color:rgb(230, 0, 0)">紅字</span>', html)
+        self.assertIn('<span style="font-weight:bold;font-style:italic">粗斜體</span>', html)
+        self.assertIn('<span style="background-color:#ff0">底色</span>', html)
+
+    def test_empty_styles_are_removed(self):
+        html, stats = minify_html(CONTENT)
+        self.assertIn('</span> 一般</p>', html)
+        self.assertNotIn('class=', html)
+        self.assertGreater(stats['attributes_removed'], 0)
+
+    def test_overridden_declaration_is_removed(self):
+        html, _ = minify_html('<p><span style="color:red;color:blue">字</span></p>')
+        self.assertIn('style="color:blue"', html)
+        html, _ = minify_html('<p><span style="color:red !important;color:blue">字</span></p>')
+        self.assertIn('style="color:red !important"', html)
+
+    def test_colored_span_survives_in_pdf_html(self):
+        with tempfile.TemporaryDirectory() as tmp:
+            tmp = Path(tmp)
+            converter = VocusArticleConverter(tmp / "article.html", output_dir=tmp / "output",
+                                              images_dir=tmp / "images", use_cache=False)
+            converter.title = "測試"
+            converter.publish_date_display = "2024-01-01 00:00"
+            converter.content_html = CONTENT
+            pdf_html = converter._build_pdf_html(minify=True)
+        self.assertIn('<span style="color:rgb(230, 0, 0)">紅字</span>', pdf_html)
+
+
+if __name__ == "__main__":
+    unittest.main()
@@ -0,0 +1,98 @@
+"""解析引擎結果一致性的測試"""
+import io
+import re
+import tempfile
+import contextlib
+import unittest
+from pathlib import Path
+
+from utils.html_parser import make_soup, PARSER_CHOICES, _lexbor_available, _lxml_available
+from vocus_converter import VocusArticleConverter
+
+PAGE = """<!DOCTYPE html>
+<html><head><title>測試</title>
+<meta property="og:title" content="表格與錯誤巢狀">
+<meta name="pubdate" content="2024-03-01T10:00:00Z">
+</head><body>
+<nav><table><tr><td>導覽</td></tr></table></nav>
+<article class="editor-content">
+<p>段落 <b>粗體 <i>粗斜體</b> 斜體</i> 結尾</p>
+<table><tr><th>欄一</th><th>欄二</th></tr><tr><td>1</td><td>2</td></tr></table>
+<p>段落中的<div>區塊</div>之後</p>
+<ul><li>一<li>二</ul>
+<img src="https://images.vocus.cc/abc/photo.png" alt="圖">
+</article>
+<footer>頁尾</footer>
+</body></html>"""
+
+# 內容區塊的標籤不平衡，無法預先擷取，需要解析完整頁面
+UNSLICEABLE_PAGE = PAGE.replace('</article>', '</div></article>')
+
+ENGINES = [engine for engine, available in (('lexbor', _lexbor_available()), ('lxml', _lxml_available()))
+           if available]
+
+COMPARED_FIELDS = ['title', 'author', 'publish_date', 'last_modified', 'content_html', 'images']
+
+
+def article_and_title(soup):
+    article = soup.find('article', class_=re.compile('editor-content'))
+    return str(article), soup.find('meta', property='og:title')['content']
+
+
+@unittest.skipUnless(ENGINES, "selectolax 與 lxml 都未安裝")
+class EngineParityTest(unittest.TestCase):
+
+    def test_engines_match_html_parser_for_table_and_misnested_markup(self):
+        expected = article_and_title(make_soup(PAGE, 'html.parser'))
+        self.assertNotIn('tbody', expected[0])
+        for engine in ENGINES:
+            with self.subTest(engine=engine):
+                self.assertEqual(article_and_title(make_soup(PAGE, engine)), expected)
+
+    def test_engines_match_html_parser_for_bytes(self):
+        data = PAGE.encode('utf-8')
+        expected = article_and_title(make_soup(data, 'html.parser', 'utf-8'))
+        for engine in ENGINES:
+            with self.subTest(engine=engine):
+                self.assertEqual(article_and_title(make_soup(data, engine, 'utf-8')), expected)
+
+    def test_engines_only_keep_article(self):
+        for engine in ENGINES:
+            with self.subTest(engine=engine):
+                soup = make_soup(PAGE, engine)
+                self.assertIsNone(soup.find('nav'))
+                self.assertIsNone(soup.find('footer'))
+
+
+class ConverterParityTest(unittest.TestCase):
+    """各引擎的 parse_html 結果與 html.parser 相同"""
+
+    def setUp(self):
+        self._tmp = tempfile.TemporaryDirectory()
+        self.tmp = Path(self._tmp.name)
+
+    def tearDown(self):
+        self._tmp.cleanup()
+
+    def parse(self, page, parser):
+        html_file = self.tmp / "article.html"
+        html_file.write_text(page, encoding='utf-8')
+        converter = VocusArticleConverter(html_file, output_dir=self.tmp / "output",
+                                          images_dir=self.tmp / "images", parser=parser, use_cache=False)
+        with contextlib.redirect_stdout(io.StringIO()):
+            converter.parse_html()
+        result = {field: getattr(converter, field) for field in COMPARED_FIELDS}
+        result['images'] = [(img['url'], img['relative_path']) for img in converter.images]
+        return result
+
+    def test_converter_output_is_identical_across_engines(self):
+        for page in (PAGE, UNSLICEABLE_PAGE):
+            expected = self.parse(page, 'html.parser')
+            self.assertIn('<table>', expected['content_html'])
+            for parser in PARSER_CHOICES:
+                with self.subTest(parser=parser, sliceable=page is PAGE):
+                    self.assertEqual(self.parse(page, parser), expected)
+
+
+if __name__ == "__main__":
+    unittest.main()
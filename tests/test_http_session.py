@@ -0,0 +1,63 @@
+"""共用連線池與預先連線的測試（本機HTTP伺服器）"""
+import time
+import threading
+import unittest
+from concurrent.futures import ThreadPoolExecutor
+from http.server import ThreadingHTTPServer, BaseHTTPRequestHandler
+
+from utils.http_session import get_session, prewarm, connection_stats
+
+
+class Handler(BaseHTTPRequestHandler):
+    protocol_version = 'HTTP/1.1'
+
+    def do_HEAD(self):
+        time.sleep(0.2)  # 預先連線的請求同時進行，各自佔用一條連線
+        self.send_response(404)
+        self.send_header('Content-Length', '0')
+        self.end_headers()
+
+    def do_GET(self):
+        time.sleep(0.1)
+        self.send_response(200)
+        self.send_header('Content-Length', '2')
+        self.end_headers()
+        self.wfile.write(b'ok')
+
+    def log_message(self, format, *args):
+        pass
+
+
+class PrewarmTest(unittest.TestCase):
+
+    def setUp(self):
+        self.httpd = ThreadingHTTPServer(('127.0.0.1', 0), Handler)
+        self.httpd.daemon_threads = True
+        threading.Thread(target=self.httpd.serve_forever, daemon=True).start()
+        host, port = self.httpd.server_address
+        self.host = f"{host}:{port}"
+
+    def tearDown(self):
+        self.httpd.shutdown()
+        self.httpd.server_close()
+
+    def get_concurrently(self, count):
+        session = get_session()
+        with ThreadPoolExecutor(max_workers=count) as executor:
+            responses = list(executor.map(lambda _: session.get(f"http://{self.host}/a", timeout=5), range(count)))
+        self.assertTrue(all(response.ok for response in responses))
+
+    def test_prewarmed_connections_are_reused(self):
+        session = get_session()
+        opened = prewarm(hosts=[self.host], connections=3, scheme='http')
+        self.assertEqual(opened, 3)
+
+        # 之後要求更大的連線池仍是同一個Session，已建立的連線不會被丟掉
+        self.assertIs(get_session(pool_maxsize=64), session)
+        before = connection_stats()['connections']
+        self.get_concurrently(3)
+        self.assertEqual(connection_stats()['connections'], before)
+
+
+if __name__ == "__main__":
+    unittest.main()
@@ -0,0 +1,41 @@
+"""PDF用圖片衍生檔的測試"""
+import tempfile
+import unittest
+from pathlib import Path
+
+from utils.image_derivatives import build_derivatives, PIL_AVAILABLE
+
+SVG = b'<svg xmlns="http://www.w3.org/2000/svg" width="10" height="10"><rect width="10" height="10"/></svg>'
+
+
+@unittest.skipUnless(PIL_AVAILABLE, "Pillow 未安裝")
+class DerivativeCacheTest(unittest.TestCase):
+
+    def setUp(self):
+        self._tmp = tempfile.TemporaryDirectory()
+        self.images_dir = Path(self._tmp.name)
+
+    def tearDown(self):
+        self._tmp.cleanup()
+
+    def build(self, sources):
+        messages = []
+        results = build_derivatives(sources, self.images_dir, workers=1, log=messages.append)
+        return results, messages
+
+    def test_unsupported_image_is_cached_as_original(self):
+        svg = self.images_dir / "image_1.svg"
+        svg.write_bytes(SVG)
+
+        results, messages = self.build([svg])
+        self.assertEqual(results, {svg: svg})
+        self.assertTrue(any("無法轉換圖片" in message for message in messages))
+
+        results, messages = self.build([svg])
+        self.assertEqual(results, {svg: svg})
+        self.assertFalse(any("無法轉換圖片" in message for message in messages))
+        self.assertIn("0 個新轉換", messages[-1])
+
+
+if __name__ == "__main__":
+    unittest.main()
@@ -0,0 +1,222 @@
+"""圖片下載引擎的測試（本機HTTP伺服器）"""
+import io
+import os
+import time
+import tempfile
+import threading
+import contextlib
+import unittest
+from pathlib import Path
+from http.server import ThreadingHTTPServer, BaseHTTPRequestHandler
+
+from utils.fetch_engine import FetchEngine
+from utils.http_session import get_session
+from utils.image_downloader import ImageDownloader, ADVANCED_STRATEGIES
+from utils.rate_limiter import configure_rate_limiter
+
+PNG = b'\x89PNG\r\n\x1a\n' + os.urandom(4096)
+WEBP = b'RIFF' + (4096).to_bytes(4, 'little') + b'WEBPVP8 ' + os.urandom(4096)
+ETAG = '"v1"'
+
+
+class ImageServer:
+    """
+    提供一張帶ETag的圖片，記錄每個請求的狀態碼；/resize 回傳WebP縮圖（Content-Type 為 variant_type），
+    /stalled.png 延遲回應，送出一半內容後停住
+    """
+
+    def __init__(self):
+        self.statuses = []
+        self.paths = []
+        self.variant_type = 'image/webp'
+        self.released = threading.Event()
+        server = self
+
+        class Handler(BaseHTTPRequestHandler):
+            protocol_version = 'HTTP/1.1'
+
+            def do_GET(self):
+                server.paths.append(self.path)
+                if self.path.startswith('/resize'):
+                    self.send_response(200)
+                    self.send_header('Content-Type', server.variant_type)
+                    self.send_header('Content-Length', str(len(WEBP)))
+                    self.end_headers()
+                    self.wfile.write(WEBP)
+                    return
+                if self.path == '/stalled.png':
+                    time.sleep(0.3)
+                    self.send_response(200)
+                    self.send_header('Content-Type', 'image/png')
+                    self.send_header('Content-Length', str(len(PNG)))
+                    self.end_headers()
+                    self.wfile.write(PNG[:len(PNG) // 2])
+                    self.wfile.flush()
+                    server.released.wait(30)
+                    return
+                if self.path == '/slow.png':
+                    time.sleep(0.6)
+                if self.headers.get('If-None-Match') == ETAG:
+                    server.statuses.append(304)
+                    self.send_response(304)
+                    self.send_header('ETag', ETAG)
+                    self.send_header('Content-Length', '0')
+                    self.end_headers()
+                    return
+                server.statuses.append(200)
+                self.send_response(200)
+                self.send_header('Content-Type', 'image/png')
+                self.send_header('Content-Length', str(len(PNG)))
+                self.send_header('ETag', ETAG)
+                self.end_headers()
+                self.wfile.write(PNG)
+
+            def log_message(self, format, *args):
+                pass
+
+        self.httpd = ThreadingHTTPServer(('127.0.0.1', 0), Handler)
+        self.httpd.daemon_threads = True
+        threading.Thread(target=self.httpd.serve_forever, daemon=True).start()
+        host, port = self.httpd.server_address
+        self.base = f"http://{host}:{port}"
+        self.url = f"{self.base}/photo.png"
+
+    def close(self):
+        self.released.set()
+        self.httpd.shutdown()
+        self.httpd.server_close()
+
+
+class ConditionalRequestTest(unittest.TestCase):
+
+    def setUp(self):
+        configure_rate_limiter(rate=0)
+        self._tmp = tempfile.TemporaryDirectory()
+        self.images_dir = Path(self._tmp.name) / "images"
+        self.server = ImageServer()
+
+    def tearDown(self):
+        self.server.close()
+        self._tmp.cleanup()
+
+    def download(self, local_path):
+        downloader = ImageDownloader(self.images_dir, ADVANCED_STRATEGIES[:1])
+        with contextlib.redirect_stdout(io.StringIO()):
+            result = downloader.download_all([{'url': self.server.url, 'local_path': local_path}])
+        return downloader, result
+
+    def test_fresh_entry_is_skipped_without_request(self):
+        first = self.images_dir / "article_1" / "image_1.png"
+        self.download(first)
+        _, result = self.download(first)
+        self.assertEqual(result, (1, 0))
+        self.assertEqual(self.server.statuses, [200])
+
+    def test_stale_entry_is_revalidated_with_store_on(self):
+        first = self.images_dir / "article_1" / "image_1.png"
+        second = self.images_dir / "article_2" / "image_1.png"
+        downloader, _ = self.download(first)
+        self.assertIsNotNone(downloader.image_store)
+        downloader.http_cache.fresh_seconds = 0
+
+        # 同一個檔案與另一篇文章（儲存區中已有內容）都改為送出條件式請求
+        for path in (first, second):
+            _, result = self.download(path)
+            self.assertEqual(result, (1, 0))
+            self.assertEqual(path.read_bytes(), PNG)
+        self.assertEqual(self.server.statuses, [200, 304, 304])
+        self.assertEqual(downloader.http_cache.revalidated, 2)
+
+
+
+class VariantTest(unittest.TestCase):
+
+    def setUp(self):
+        configure_rate_limiter(rate=0)
+        self._tmp = tempfile.TemporaryDirectory()
+        self.images_dir = Path(self._tmp.name) / "images"
+        self.server = ImageServer()
+        self.local_path = self.images_dir / "article_1" / "image_1.png"
+
+    def tearDown(self):
+        self.server.close()
+        self._tmp.cleanup()
+
+    def download(self, max_image_width=None):
+        img_info = {'url': self.server.url, 'local_path': self.local_path,
+                    'resize_url': f"{self.server.base}/resize?url=photo.png&width=100"}
+        downloader = ImageDownloader(self.images_dir, ADVANCED_STRATEGIES[:1], max_image_width=max_image_width)
+        with contextlib.redirect_stdout(io.StringIO()):
+            result = downloader.download_all([img_info])
+        return img_info, result
+
+    def variant_requests(self):
+        return [path for path in self.server.paths if path.startswith('/resize')]
+
+    def test_variant_is_saved_with_negotiated_extension(self):
+        for content_type in ('image/webp', 'application/octet-stream'):
+            with self.subTest(content_type=content_type):
+                self.server.variant_type = content_type
+                img_info, result = self.download(max_image_width=800 if content_type == 'image/webp' else 900)
+                self.assertEqual(result, (1, 0))
+                self.assertEqual(img_info['local_path'], self.local_path.with_suffix('.webp'))
+                self.assertEqual(img_info['local_path'].read_bytes(), WEBP)
+                self.assertFalse(self.local_path.exists())
+
+    def test_width_is_part_of_validity_check(self):
+        self.download()
+        self.assertEqual(self.local_path.read_bytes(), PNG)
+
+        # 既有的原圖不算是這個寬度的縮圖
+        img_info, _ = self.download(max_image_width=800)
+        self.assertEqual(len(self.variant_requests()), 1)
+        self.assertEqual(img_info['local_path'], self.local_path.with_suffix('.webp'))
+
+        # 同一寬度的縮圖已存在時略過（依實際副檔名找到）
+        img_info, result = self.download(max_image_width=800)
+        self.assertEqual(result, (1, 0))
+        self.assertEqual(len(self.variant_requests()), 1)
+        self.assertEqual(img_info['local_path'], self.local_path.with_suffix('.webp'))
+
+        # 其他寬度重新下載
+        self.download(max_image_width=1200)
+        self.assertEqual(len(self.variant_requests()), 2)
+
+
+class HedgeAbortTest(unittest.TestCase):
+
+    def setUp(self):
+        configure_rate_limiter(rate=0)
+        self._tmp = tempfile.TemporaryDirectory()
+        self.images_dir = Path(self._tmp.name) / "images"
+        self.server = ImageServer()
+
+    def tearDown(self):
+        self.server.close()
+        self._tmp.cleanup()
+
+    def test_stalled_loser_connection_is_closed(self):
+        downloader = ImageDownloader(self.images_dir, ADVANCED_STRATEGIES[:1], use_image_store=False)
+        session = get_session()
+        save_path = self.images_dir / "image_1.png"
+        save_path.parent.mkdir(parents=True)
+        log = io.StringIO()
+
+        def attempt(name):
+            url = f"{self.server.base}/{name}.png"
+            return url, lambda: downloader.fetch(session, url, save_path, strategy=name,
+                                                 log=lambda line: log.write(line + "\n"))
+
+        start = time.monotonic()
+        with FetchEngine(max_in_flight=2, per_host=2) as engine:
+            engine.hedge_delay = lambda host: 0.1
+            result = engine.submit([attempt("stalled"), attempt("slow")]).result(timeout=10)
+        # 卡住的讀取被立即中斷，不必等讀取逾時
+        self.assertLess(time.monotonic() - start, 5)
+        self.assertTrue(result)
+        self.assertEqual(save_path.read_bytes(), PNG)
+        self.assertIn("其他方式已先完成，中斷 stalled", log.getvalue())
+
+
+if __name__ == "__main__":
+    unittest.main()
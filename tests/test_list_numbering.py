@@ -0,0 +1,72 @@
+"""手動編號修正的測試"""
+import unittest
+
+from bs4 import BeautifulSoup
+
+from utils.list_numbering import renumber_lists, MIN_RUN_LENGTH
+
+
+def renumber(html):
+    soup = BeautifulSoup(html, 'html.parser')
+    fixed = renumber_lists(soup)
+    return fixed, [p.get_text() for p in soup.find_all('p')]
+
+
+class RenumberListsTest(unittest.TestCase):
+
+    def test_restart_after_image_continues_numbering(self):
+        fixed, texts = renumber('<p>1. a</p><p>2. b</p><img src="x.png">'
+                                '<p>1. c</p><p>2. d</p><p>3. e</p>')
+        self.assertEqual(fixed, 3)
+        self.assertEqual(texts, ['1. a', '2. b', '3. c', '4. d', '5. e'])
+
+    def test_transparent_wrappers_do_not_break_the_list(self):
+        for wrapper in ('<figure><img src="x.png"><figcaption>說明</figcaption></figure>',
+                        '<picture><img src="x.png"></picture>', '<br>', '<hr>',
+                        '<div><img src="x.png"></div>', '<div> </div>'):
+            with self.subTest(wrapper=wrapper):
+                fixed, texts = renumber(f'<p>1. a</p><p>2. b</p>{wrapper}<p>1. c</p>')
+                self.assertEqual(fixed, 1)
+                self.assertEqual(texts[-1], '3. c')
+
+    def test_text_between_items_starts_a_new_list(self):
+        for separator in ('<p>另一段說明</p>', '<div>另一段說明</div>', '另一段說明'):
+            with self.subTest(separator=separator):
+                fixed, texts = renumber(f'<p>1. a</p><p>2. b</p>{separator}<p>1. c</p><p>2. d</p>')
+                self.assertEqual(fixed, 0)
+                self.assertEqual(texts[-2:], ['1. c', '2. d'])
+
+    def test_run_shorter_than_min_run_length_is_left_alone(self):
+        short = ''.join(f'<p>{n}. item</p>' for n in range(1, MIN_RUN_LENGTH))
+        fixed, texts = renumber(f'{short}<img src="x.png"><p>1. c</p>')
+        self.assertEqual(fixed, 0)
+        self.assertEqual(texts[-1], '1. c')
+
+        # 達到 MIN_RUN_LENGTH 時才接續
+        run = ''.join(f'<p>{n}. item</p>' for n in range(1, MIN_RUN_LENGTH + 1))
+        fixed, texts = renumber(f'{run}<img src="x.png"><p>1. c</p>')
+        self.assertEqual(fixed, 1)
+        self.assertEqual(texts[-1], f'{MIN_RUN_LENGTH + 1}. c')
+
+    def test_nested_lists_are_numbered_independently(self):
+        fixed, texts = renumber(
+            '<p>1. a</p>'
+            '<div><p>1. x</p><p>2. y</p><img src="x.png"><p>1. z</p></div>'
+            '<p>2. b</p><figure><img src="y.png"></figure><p>1. c</p>')
+        self.assertEqual(fixed, 2)
+        self.assertEqual(texts, ['1. a', '1. x', '2. y', '3. z', '2. b', '3. c'])
+
+    def test_marker_inside_inline_markup_is_rewritten(self):
+        soup = BeautifulSoup('<p><strong>1. a</strong></p><p>2. b</p><img src="x.png">'
+                             '<p><strong>1. c</strong> 內文</p>', 'html.parser')
+        self.assertEqual(renumber_lists(soup), 1)
+        self.assertEqual(str(soup.find_all('p')[-1]), '<p><strong>3. c</strong> 內文</p>')
+
+    def test_decimal_is_not_a_marker(self):
+        fixed, texts = renumber('<p>1. a</p><p>2. b</p><img src="x.png"><p>1.5 億人</p>')
+        self.assertEqual(fixed, 0)
+        self.assertEqual(texts[-1], '1.5 億人')
+
+
+if __name__ == "__main__":
+    unittest.main()
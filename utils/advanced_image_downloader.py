@@ -5,194 +5,54 @@
 """
 
 import os
-import time
-import random
-import requests
+import sys
 from pathlib import Path
 from urllib.parse import urlparse, unquote
 import re
-from bs4 import BeautifulSoup
+
+# 加入專案根目錄
+sys.path.append(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from utils.html_input import open_html
+from utils.rate_limiter import configure_rate_limiter, DEFAULT_RATE
+from utils.image_downloader import ImageDownloader, ADVANCED_STRATEGIES, DEFAULT_WORKERS
 
 
 class AdvancedImageDownloader:
-    """進階圖片下載器"""
-    
-    def __init__(self):
-        self.session = requests.Session()
+    """進階圖片下載器（以不同瀏覽器的請求頭嘗試，下載流程與轉換器共用 ImageDownloader）"""
+    
+    def __init__(self, stats_dir="images", workers=DEFAULT_WORKERS, fetch_engine=None,
+                 offline_archive=None, record_archive=None):
+        # 與轉換器共用連線池、節流、策略排序與失效URL快取（以及離線封存）
+        self.downloader = ImageDownloader(stats_dir, ADVANCED_STRATEGIES, offline_archive=offline_archive,
+                                          record_archive=record_archive)
+        self.workers = workers
+        self.fetch_engine = fetch_engine  # None時每次下載自己建立排程引擎
         self.downloaded_urls = set()
         self.success_count = 0
         self.fail_count = 0
-        
-        # 設定多組不同的請求頭
-        self.header_sets = [
-            # Chrome瀏覽器
-            {
-                'User-Agent': 'Mozilla/5.0 (Macintosh; Intel Mac OS X 10_15_7) AppleWebKit/537.36 (KHTML, like Gecko) Chrome/120.0.0.0 Safari/537.36',
-                'Accept': 'image/avif,image/webp,image/apng,image/svg+xml,image/*,*/*;q=0.8',
-                'Accept-Language': 'zh-TW,zh;q=0.9,en;q=0.8',
-                'Accept-Encoding': 'gzip, deflate, br',
-                'Referer': 'https://vocus.cc/',
-                'Sec-Ch-Ua': '"Not_A Brand";v="8", "Chromium";v="120", "Google Chrome";v="120"',
-                'Sec-Ch-Ua-Mobile': '?0',
-                'Sec-Ch-Ua-Platform': '"macOS"',
-                'Sec-Fetch-Dest': 'image',
-                'Sec-Fetch-Mode': 'no-cors',
-                'Sec-Fetch-Site': 'same-site'
-            },
-            # Safari瀏覽器
-            {
-                'User-Agent': 'Mozilla/5.0 (Macintosh; Intel Mac OS X 10_15_7) AppleWebKit/605.1.15 (KHTML, like Gecko) Version/17.0 Safari/605.1.15',
-                'Accept': 'image/png,image/svg+xml,image/*;q=0.8,video/*;q=0.8,*/*;q=0.5',
-                'Accept-Language': 'zh-tw',
-                'Accept-Encoding': 'gzip, deflate, br',
-                'Referer': 'https://vocus.cc/',
-                'Connection': 'keep-alive'
-            },
-            # Firefox瀏覽器
-            {
-                'User-Agent': 'Mozilla/5.0 (Macintosh; Intel Mac OS X 10.15; rv:120.0) Gecko/20100101 Firefox/120.0',
-                'Accept': 'image/avif,image/webp,*/*',
-                'Accept-Language': 'zh-TW,zh;q=0.8,en-US;q=0.5,en;q=0.3',
-                'Accept-Encoding': 'gzip, deflate, br',
-                'Referer': 'https://vocus.cc/',
-                'DNT': '1',
-                'Connection': 'keep-alive',
-                'Sec-Fetch-Dest': 'image',
-                'Sec-Fetch-Mode': 'no-cors',
-                'Sec-Fetch-Site': 'same-site'
-            }
-        ]
-    
-    def download_with_strategies(self, url, save_path, max_retries=3):
-        """使用多種策略下載圖片"""
-        strategies = [
-            self._strategy_direct,
-            self._strategy_with_delay,
-            self._strategy_multiple_headers,
-            self._strategy_chunked_download,
-            self._strategy_curl_simulation
-        ]
-        
-        for i, strategy in enumerate(strategies, 1):
-            print(f"  → 嘗試策略 {i}/{len(strategies)}: {strategy.__name__}")
-            
-            for attempt in range(max_retries):
-                try:
-                    if strategy(url, save_path):
-                        print(f"    → 成功！")
-                        return True
-                except Exception as e:
-                    print(f"    → 嘗試 {attempt+1}/{max_retries} 失敗: {str(e)}")
-                    if attempt < max_retries - 1:
-                        time.sleep(random.uniform(1, 3))  # 隨機延遲
-        
-        return False
     
-    def _strategy_direct(self, url, save_path):
-        """策略1：直接下載"""
-        headers = random.choice(self.header_sets)
-        response = self.session.get(url, headers=headers, timeout=30)
-        response.raise_for_status()
-        return self._save_image(response, save_path)
+    def download_with_strategies(self, url, save_path):
+        """使用多種策略下載一張圖片（依這個主機上各策略的成功率與耗時排序）"""
+        success, _ = self.download_urls([(url, Path(save_path))])
+        return success > 0
     
-    def _strategy_with_delay(self, url, save_path):
-        """策略2：延遲下載（模擬人類行為）"""
-        time.sleep(random.uniform(0.5, 2.0))
-        headers = random.choice(self.header_sets)
-        response = self.session.get(url, headers=headers, timeout=30)
-        response.raise_for_status()
-        return self._save_image(response, save_path)
-    
-    def _strategy_multiple_headers(self, url, save_path):
-        """策略3：嘗試多組請求頭"""
-        for headers in self.header_sets:
-            try:
-                response = self.session.get(url, headers=headers, timeout=30)
-                response.raise_for_status()
-                if self._save_image(response, save_path):
-                    return True
-            except:
-                continue
-        return False
-    
-    def _strategy_chunked_download(self, url, save_path):
-        """策略4：分塊下載"""
-        headers = random.choice(self.header_sets)
-        response = self.session.get(url, headers=headers, timeout=30, stream=True)
-        response.raise_for_status()
-        
-        with open(save_path, 'wb') as f:
-            for chunk in response.iter_content(chunk_size=1024):
-                if chunk:
-                    f.write(chunk)
-                time.sleep(0.01)  # 小延遲模擬慢速下載
-        
-        return self._validate_image(save_path)
-    
-    def _strategy_curl_simulation(self, url, save_path):
-        """策略5：模擬curl請求"""
-        headers = {
-            'User-Agent': 'curl/7.68.0',
-            'Accept': '*/*',
-            'Connection': 'keep-alive'
-        }
-        response = self.session.get(url, headers=headers, timeout=30)
-        response.raise_for_status()
-        return self._save_image(response, save_path)
-    
-    def _save_image(self, response, save_path):
-        """儲存圖片並驗證"""
-        # 檢查內容類型
-        content_type = response.headers.get('content-type', '')
-        if 'image' not in content_type and 'octet-stream' not in content_type:
-            print(f"      警告：內容類型可能不正確: {content_type}")
-        
-        # 儲存檔案
-        with open(save_path, 'wb') as f:
-            f.write(response.content)
-        
-        return self._validate_image(save_path)
-    
-    def _validate_image(self, save_path):
-        """驗證圖片檔案"""
-        if not save_path.exists():
-            return False
-        
-        file_size = save_path.stat().st_size
-        if file_size < 100:
-            save_path.unlink()
-            print(f"      檔案太小，刪除: {file_size} bytes")
-            return False
-        
-        # 檢查檔案頭
-        with open(save_path, 'rb') as f:
-            header = f.read(20)
-        
-        # 常見圖片格式的檔案頭
-        image_signatures = [
-            b'\xff\xd8\xff',  # JPEG
-            b'\x89PNG\r\n\x1a\n',  # PNG
-            b'GIF87a',  # GIF87a
-            b'GIF89a',  # GIF89a
-            b'RIFF',  # WebP (部分)
-            b'\x00\x00\x01\x00',  # ICO
-        ]
-        
-        is_valid_image = any(header.startswith(sig) for sig in image_signatures)
-        if not is_valid_image:
-            print(f"      警告：檔案格式可能有問題，但保留檔案")
-        
-        print(f"      檔案大小: {file_size:,} bytes")
-        return True
+    def download_urls(self, items):
+        """並行下載 [(url, 儲存路徑), ...]，回傳 (成功數, 失敗數)"""
+        images = [{'url': url, 'local_path': Path(save_path)} for url, save_path in items]
+        success, fail = self.downloader.download_all(images, engine=self.fetch_engine, workers=self.workers)
+        self.downloaded_urls.update(img_info['url'] for img_info in images if img_info['local_path'].exists())
+        self.success_count += success
+        self.fail_count += fail
+        return success, fail
     
     def batch_download_from_html(self, html_file, output_dir="images"):
         """從HTML檔案批次下載圖片"""
         print(f"開始從HTML檔案提取並下載圖片: {html_file}")
         
-        with open(html_file, 'r', encoding='utf-8') as f:
-            html_content = f.read()
-        
-        soup = BeautifulSoup(html_content, 'html.parser')
+        # 只需要meta與img標籤
+        with open_html(html_file) as source:
+            soup = source.parse_tags(('meta', 'img'))
         
         # 提取發布日期
         publish_date = self._extract_publish_date(soup)
@@ -205,25 +65,10 @@ class AdvancedImageDownloader:
         image_urls = self._extract_image_urls(soup)
         print(f"找到 {len(image_urls)} 個唯一圖片URL")
         
-        # 下載圖片
-        for i, url in enumerate(image_urls, 1):
-            if url in self.downloaded_urls:
-                continue
-            
-            print(f"\n[{i}/{len(image_urls)}] 下載: {url}")
-            
-            # 確定副檔名
-            ext = self._get_extension_from_url(url)
-            save_path = output_path / f"image_{i}{ext}"
-            
-            if self.download_with_strategies(url, save_path):
-                self.success_count += 1
-                self.downloaded_urls.add(url)
-            else:
-                self.fail_count += 1
-                print(f"  → 下載失敗")
-        
-        print(f"\n下載完成：成功 {self.success_count} 個，失敗 {self.fail_count} 個")
+        # 圖片編號依URL排序決定，並行下載時檔名仍然固定
+        items = [(url, output_path / f"image_{i}{self._get_extension_from_url(url)}")
+                 for i, url in enumerate(image_urls, 1) if url not in self.downloaded_urls]
+        self.download_urls(items)
     
     def _extract_publish_date(self, soup):
         """提取發布日期"""
@@ -280,10 +125,23 @@ def main():
     parser = argparse.ArgumentParser(description='進階Vocus圖片下載器')
     parser.add_argument('html_file', help='HTML檔案路徑')
     parser.add_argument('--output-dir', '-o', default='images', help='輸出目錄')
+    parser.add_argument('--rate-limit', type=float, default=DEFAULT_RATE,
+                        help=f'每個主機每秒的請求數上限 (預設: {DEFAULT_RATE:g})')
+    parser.add_argument('--max-bytes-per-sec', type=int,
+                        help='每個主機每秒下載的位元組數上限 (預設: 不限制)')
+    parser.add_argument('--workers', type=int, default=DEFAULT_WORKERS,
+                        help=f'同時下載的圖片數 (預設: {DEFAULT_WORKERS})')
+    parser.add_argument('--offline-archive', metavar='PATH',
+                        help='離線模式：圖片只從這個封存（目錄或.zip）取得，缺少的圖片只回報不下載')
+    parser.add_argument('--record-archive', metavar='PATH',
+                        help='把下載完成的圖片記錄到這個封存（目錄或.zip），供之後離線重播')
     
     args = parser.parse_args()
     
-    downloader = AdvancedImageDownloader()
+    configure_rate_limiter(rate=args.rate_limit, bytes_per_sec=args.max_bytes_per_sec)
+    downloader = AdvancedImageDownloader(stats_dir=args.output_dir, workers=args.workers,
+                                         offline_archive=args.offline_archive,
+                                         record_archive=args.record_archive)
     downloader.batch_download_from_html(args.html_file, args.output_dir)
 
 
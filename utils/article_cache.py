@@ -0,0 +1,121 @@
+"""
+解析結果快取 - 以輸入檔案內容的雜湊保存 parse_html 的結果
+重新產生PDF或重跑失敗的文章時，不需要再次解析與清理HTML
+"""
+import os
+import json
+import hashlib
+import tempfile
+from pathlib import Path
+
+# parse_html / _process_images / 編號修正的邏輯改變時需要遞增
+ARTICLE_CACHE_VERSION = 1
+
+DEFAULT_MAX_MB = 512
+
+# 快取中保存的文章欄位
+CACHED_FIELDS = ['title', 'author', 'publish_date', 'publish_date_display', 'last_modified', 'content_html']
+
+
+class ArticleCache:
+    """以檔案系統保存的解析結果快取（有容量上限，超過時淘汰最久未使用的項目）"""
+
+    def __init__(self, cache_dir, max_bytes=DEFAULT_MAX_MB * 1024 * 1024):
+        self.cache_dir = Path(cache_dir)
+        self.max_bytes = max_bytes
+        self.hits = 0
+        self.misses = 0
+        self._index = None  # key -> (最後使用時間, 檔案大小)
+
+    def make_key(self, content_bytes, salt=''):
+        """以輸入內容、快取版本與清理規則產生快取鍵"""
+        digest = hashlib.sha256()
+        digest.update(f"v{ARTICLE_CACHE_VERSION}|{salt}|".encode('utf-8'))
+        digest.update(content_bytes)
+        return digest.hexdigest()
+
+    def _path(self, key):
+        return self.cache_dir / key[:2] / f"{key}.json"
+
+    def _load_index(self):
+        """第一次使用時掃描快取目錄，之後只在記憶體中維護"""
+        if self._index is not None:
+            return
+        self._index = {}
+        if not self.cache_dir.exists():
+            return
+        for entry_path in self.cache_dir.glob('*/*.json'):
+            try:
+                stat = entry_path.stat()
+            except OSError:
+                continue
+            self._index[entry_path.stem] = (stat.st_mtime, stat.st_size)
+
+    def get(self, key):
+        """讀取快取，沒有時回傳None"""
+        path = self._path(key)
+        try:
+            with open(path, 'r', encoding='utf-8') as f:
+                data = json.load(f)
+        except (OSError, ValueError):
+            self.misses += 1
+            return None
+
+        # 更新使用時間（LRU）
+        try:
+            os.utime(path)
+            if self._index is not None:
+                stat = path.stat()
+                self._index[key] = (stat.st_mtime, stat.st_size)
+        except OSError:
+            pass
+
+        self.hits += 1
+        return data
+
+    def put(self, key, data):
+        """寫入快取（先寫入暫存檔再改名，避免留下不完整的檔案）"""
+        self._load_index()
+        path = self._path(key)
+        path.parent.mkdir(parents=True, exist_ok=True)
+
+        fd, tmp_path = tempfile.mkstemp(dir=path.parent, suffix='.tmp')
+        try:
+            with os.fdopen(fd, 'w', encoding='utf-8') as f:
+                json.dump(data, f, ensure_ascii=False)
+            os.replace(tmp_path, path)
+        except Exception:
+            if os.path.exists(tmp_path):
+                os.unlink(tmp_path)
+            raise
+
+        stat = path.stat()
+        self._index[key] = (stat.st_mtime, stat.st_size)
+        self._evict()
+
+    def _evict(self):
+        """超過容量上限時，刪除最久未使用的項目"""
+        total = sum(size for _, size in self._index.values())
+        if total <= self.max_bytes:
+            return
+
+        for key, (_, size) in sorted(self._index.items(), key=lambda item: item[1][0]):
+            if total <= self.max_bytes:
+                break
+            try:
+                self._path(key).unlink()
+            except OSError:
+                pass
+            del self._index[key]
+            total -= size
+
+
+_caches = {}
+
+
+def get_article_cache(cache_dir, max_mb=DEFAULT_MAX_MB):
+    """同一個快取目錄在整個行程中共用同一個實例"""
+    cache_dir = Path(cache_dir).resolve()
+    if cache_dir not in _caches:
+        _caches[cache_dir] = ArticleCache(cache_dir, max_mb * 1024 * 1024)
+    return _caches[cache_dir]
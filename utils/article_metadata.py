@@ -0,0 +1,127 @@
+"""
+文章資訊快速擷取 - 串流讀取HTML，只解析到</head>為止
+用於批次預先檢查與GUI檔案清單，避免為了標題建立整份DOM
+"""
+import codecs
+import json
+from html.parser import HTMLParser
+from pathlib import Path
+
+from utils.html_input import sniff_encoding
+
+CHUNK_SIZE = 16 * 1024
+
+
+class _HeadMetadataParser(HTMLParser):
+    """擷取<head>中文章資訊的串流解析器"""
+
+    def __init__(self):
+        super().__init__(convert_charrefs=True)
+        self.metadata = {
+            'title': None,
+            'pubdate': None,
+            'lastmod': None,
+            'modified_time': None,
+            'author': '',
+        }
+        self.head_done = False
+        self.done = False
+        self._has_og_title = False
+        self._ld_json_seen = False
+        self._ld_json_parts = None
+        self._h1_parts = None
+
+    def handle_starttag(self, tag, attrs):
+        if self.done:
+            return
+        if tag == 'meta' and not self.head_done:
+            self._handle_meta(dict(attrs))
+        elif tag == 'script' and not self._ld_json_seen and not self.head_done:
+            if dict(attrs).get('type') == 'application/ld+json':
+                self._ld_json_seen = True
+                self._ld_json_parts = []
+        elif tag == 'body':
+            self._finish_head()
+        elif tag == 'h1' and self.head_done and self._h1_parts is None:
+            self._h1_parts = []
+
+    def handle_endtag(self, tag):
+        if self.done:
+            return
+        if tag == 'script' and self._ld_json_parts is not None:
+            self._handle_ld_json(''.join(self._ld_json_parts))
+            self._ld_json_parts = None
+        elif tag == 'head':
+            self._finish_head()
+        elif tag == 'h1' and self._h1_parts is not None:
+            self.metadata['title'] = ''.join(self._h1_parts).strip()
+            self.done = True
+
+    def handle_data(self, data):
+        if self.done:
+            return
+        if self._ld_json_parts is not None:
+            self._ld_json_parts.append(data)
+        elif self._h1_parts is not None:
+            self._h1_parts.append(data)
+
+    def _handle_meta(self, attrs):
+        """記錄第一個符合的meta標籤（與BeautifulSoup.find相同）"""
+        content = attrs.get('content') or ''
+        prop = attrs.get('property')
+        name = attrs.get('name')
+
+        if prop == 'og:title' and not self._has_og_title:
+            self._has_og_title = True
+            self.metadata['title'] = content.strip()
+        elif name == 'pubdate' and self.metadata['pubdate'] is None:
+            self.metadata['pubdate'] = content
+        elif name == 'lastmod' and self.metadata['lastmod'] is None:
+            self.metadata['lastmod'] = content
+        elif prop == 'article:modified_time' and self.metadata['modified_time'] is None:
+            self.metadata['modified_time'] = content
+
+    def _handle_ld_json(self, text):
+        """從JSON-LD結構化數據提取作者"""
+        try:
+            json_data = json.loads(text)
+            if 'author' in json_data and 'name' in json_data['author']:
+                self.metadata['author'] = json_data['author']['name']
+        except Exception:
+            pass
+
+    def _finish_head(self):
+        """<head>結束：有og:title就停止，否則繼續找第一個h1"""
+        if self.head_done:
+            return
+        self.head_done = True
+        if self._has_og_title:
+            self.done = True
+
+
+def read_head_metadata(html_file, chunk_size=CHUNK_SIZE):
+    """
+    串流讀取HTML檔案，只解析到</head>（沒有og:title時讀到第一個h1）
+
+    Returns:
+        dict: title, pubdate, lastmod, modified_time, author, bytes_read
+    """
+    parser = _HeadMetadataParser()
+    decoder = None
+    bytes_read = 0
+
+    with open(Path(html_file), 'rb') as f:
+        while not parser.done:
+            chunk = f.read(chunk_size)
+            if decoder is None:
+                # 以第一個區塊判斷編碼
+                decoder = codecs.getincrementaldecoder(sniff_encoding(chunk))(errors='replace')
+            if not chunk:
+                parser.feed(decoder.decode(b'', final=True))
+                break
+            bytes_read += len(chunk)
+            parser.feed(decoder.decode(chunk))
+
+    metadata = dict(parser.metadata)
+    metadata['bytes_read'] = bytes_read
+    return metadata
@@ -0,0 +1,157 @@
+#!/usr/bin/env python3
+"""
+HTML清理引擎基準測試
+比較原本逐項 find_all 的清理方式與單次走訪的規則引擎，並確認輸出完全相同
+"""
+
+import os
+import re
+import sys
+import glob
+import time
+import random
+
+# 加入專案根目錄
+sys.path.append(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from bs4 import BeautifulSoup
+from utils.html_cleanup import get_cleanup_engine
+
+
+def legacy_clean(content_soup):
+    """原本的逐項清理（不含編號修正），作為比對基準（已知的差異見 CleanupEngine.clean）"""
+    preserved_imgs = set()
+    for img in content_soup.find_all('img'):
+        if '../../images/' in img.get('src', ''):
+            preserved_imgs.add(img)
+
+    for control in content_soup.find_all('div', class_=re.compile('zoom-control')):
+        if not control.find_all('img'):
+            control.decompose()
+
+    for button in content_soup.find_all('button', attrs={'aria-label': re.compile('Expand image')}):
+        button.decompose()
+
+    for element in content_soup.find_all(attrs={'data-rmiz': True}):
+        if element.name == 'img':
+            if 'data-rmiz' in element.attrs:
+                del element['data-rmiz']
+        else:
+            for img in [img for img in element.find_all('img') if img in preserved_imgs]:
+                element.insert_before(img)
+            element.decompose()
+
+    for svg in content_soup.find_all('svg'):
+        svg.decompose()
+
+    for ghost in content_soup.find_all(attrs={'data-rmiz-ghost': True}):
+        ghost.decompose()
+
+    ad_patterns = ["為什麼會看到廣告", "廣告", "advertisement", "ads"]
+    for text_node in content_soup.find_all(string=True):
+        text_content = text_node.strip()
+        for pattern in ad_patterns:
+            if pattern in text_content:
+                parent = text_node.parent
+                if parent:
+                    if text_content == pattern or len(text_content) < 20:
+                        parent.decompose()
+                        break
+
+    ui_selectors = [
+        {'class': re.compile('zoom.*control')},
+        {'class': re.compile('.*zoom.*')},
+        {'data-rmiz-btn-zoom': True},
+        {'data-rmiz-btn-zoom-icon': True},
+        {'class': re.compile('.*ad.*')},
+        {'class': re.compile('.*advertisement.*')}
+    ]
+    for selector in ui_selectors:
+        for element in content_soup.find_all(attrs=selector):
+            if element.name == 'img' and element in preserved_imgs:
+                continue
+            for img in [img for img in element.find_all('img') if img in preserved_imgs]:
+                element.insert_before(img)
+            element.decompose()
+
+    for div in content_soup.find_all('div'):
+        if (not div.get_text(strip=True) and
+                not div.find_all(['img', 'video', 'audio']) and
+                not div.find_all(attrs={'src': True})):
+            div.decompose()
+
+
+def engine_clean(content_soup):
+    """規則引擎清理（不含編號修正）"""
+    engine = get_cleanup_engine()
+    engine.clean(content_soup)
+    engine.remove_empty_divs(content_soup)
+
+
+def synthetic_article(image_count, seed=0):
+    """產生類似Vocus結構的文章：每張圖片都包在rmiz縮放元件中"""
+    rng = random.Random(seed)
+    parts = []
+    for i in range(image_count):
+        parts.append(f'<p>第{i}段內容，說明這張圖表的重點與<strong>數據</strong>。</p>')
+        parts.append(
+            '<figure><div data-rmiz=""><div data-rmiz-content="found">'
+            f'<img alt="圖{i}" src="../../images/article_bench/image_{i}.png"/>'
+            '<button aria-label="Expand image" data-rmiz-btn-zoom="">'
+            '<svg viewBox="0 0 16 16"><path d="M1 1h14"></path></svg></button></div>'
+            '<div data-rmiz-ghost=""></div></div>'
+            '<div class="zoom-control"><svg><path></path></svg></div>'
+            f'<figcaption>圖{i}說明</figcaption></figure>'
+        )
+        if rng.random() < 0.1:
+            parts.append('<div class="ad-slot"><span>廣告</span></div><div><div></div></div>')
+    return f'<article class="editor-content">{"".join(parts)}</article>'
+
+
+def run(name, html, repeat):
+    """對同一份HTML比較兩種清理方式"""
+    timings = {}
+    outputs = {}
+    for label, clean in [('逐項清理', legacy_clean), ('規則引擎', engine_clean)]:
+        elapsed = 0.0
+        for _ in range(repeat):
+            soup = BeautifulSoup(html, 'html.parser')
+            root = soup.find('article') or soup
+            start = time.perf_counter()
+            clean(root)
+            elapsed += time.perf_counter() - start
+        timings[label] = elapsed / repeat
+        outputs[label] = str(root)
+
+    legacy, engine = timings['逐項清理'], timings['規則引擎']
+    speedup = legacy / engine if engine else float('inf')
+    status = "✓ 相同" if outputs['逐項清理'] == outputs['規則引擎'] else "✗ 不同"
+    print(f"{name:<30}{legacy * 1000:>12.1f}{engine * 1000:>12.1f}{speedup:>9.1f}x  {status}")
+
+
+def main():
+    """主函數"""
+    import argparse
+
+    parser = argparse.ArgumentParser(description='比較逐項清理與規則引擎的速度與輸出')
+    parser.add_argument('pattern', nargs='?', help='額外測試的HTML檔案匹配模式')
+    parser.add_argument('--images', type=int, nargs='+', default=[50, 200, 500],
+                        help='合成文章的圖片數量')
+    parser.add_argument('--repeat', type=int, default=3, help='每項測試重複次數')
+
+    args = parser.parse_args()
+
+    print(f"{'文章':<30}{'逐項(ms)':>12}{'引擎(ms)':>12}{'加速':>10}  輸出")
+    print("=" * 72)
+    for count in args.images:
+        run(f"合成文章 ({count} 張圖片)", synthetic_article(count), args.repeat)
+
+    if args.pattern:
+        for html_file in sorted(glob.glob(args.pattern)):
+            with open(html_file, 'r', encoding='utf-8') as f:
+                html = f.read()
+            run(os.path.basename(html_file)[:28], html, args.repeat)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,147 @@
+#!/usr/bin/env python3
+"""
+圖片下載吞吐量基準測試
+以本機HTTP伺服器提供產生的圖片（可加上模擬的網路延遲），
+比較轉換器與進階下載器兩條路徑在不同同時下載數下的張數/秒與MB/秒，以及從離線封存重播的速度
+"""
+
+import io
+import os
+import sys
+import time
+import tempfile
+import threading
+import contextlib
+from pathlib import Path
+from http.server import ThreadingHTTPServer, BaseHTTPRequestHandler
+
+# 加入專案根目錄
+sys.path.append(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from vocus_converter import VocusArticleConverter
+from utils.advanced_image_downloader import AdvancedImageDownloader
+from utils.rate_limiter import configure_rate_limiter
+
+PNG_SIGNATURE = b'\x89PNG\r\n\x1a\n'
+
+
+def make_handler(images, latency):
+    """提供 /image_<n>.png 的請求處理器，回應前等待 latency 秒"""
+    class ImageHandler(BaseHTTPRequestHandler):
+        protocol_version = 'HTTP/1.1'  # 保持連線，和實際的CDN一樣重複使用連線
+
+        def do_GET(self):
+            body = images.get(self.path)
+            if latency:
+                time.sleep(latency)
+            if body is None:
+                self.send_error(404)
+                return
+            self.send_response(200)
+            self.send_header('Content-Type', 'image/png')
+            self.send_header('Content-Length', str(len(body)))
+            self.end_headers()
+            self.wfile.write(body)
+
+        def log_message(self, format, *args):
+            pass
+
+    return ImageHandler
+
+
+@contextlib.contextmanager
+def image_server(count, size, latency):
+    """啟動本機圖片伺服器，回傳圖片URL清單"""
+    images = {f"/image_{i}.png": PNG_SIGNATURE + os.urandom(size - len(PNG_SIGNATURE))
+              for i in range(1, count + 1)}
+    server = ThreadingHTTPServer(('127.0.0.1', 0), make_handler(images, latency))
+    server.daemon_threads = True
+    thread = threading.Thread(target=server.serve_forever, daemon=True)
+    thread.start()
+    try:
+        host, port = server.server_address
+        yield [f"http://{host}:{port}{path}" for path in images]
+    finally:
+        server.shutdown()
+        server.server_close()
+
+
+def run_converter(urls, work_dir, workers, **options):
+    """轉換器路徑：VocusArticleConverter.download_images()（options 傳給轉換器，例如封存設定）"""
+    work_dir.mkdir(parents=True, exist_ok=True)
+    images_dir = work_dir / "images"
+    converter = VocusArticleConverter(
+        work_dir / "article.html",
+        output_dir=work_dir / "output",
+        images_dir=images_dir,
+        use_cache=False,
+        image_workers=workers,
+        **options
+    )
+    converter.images = [{'url': url, 'local_path': images_dir / f"image_{i}.png"}
+                        for i, url in enumerate(urls, 1)]
+    converter.download_images()
+    return converter.downloaded_images
+
+
+def run_advanced(urls, work_dir, workers):
+    """進階下載器路徑：AdvancedImageDownloader.download_urls()"""
+    images_dir = work_dir / "images"
+    images_dir.mkdir(parents=True, exist_ok=True)
+    downloader = AdvancedImageDownloader(stats_dir=images_dir, workers=workers)
+    success, _ = downloader.download_urls(
+        [(url, images_dir / f"image_{i}.png") for i, url in enumerate(urls, 1)])
+    return success
+
+
+def benchmark(count, size, latency, worker_counts):
+    """每條路徑、每個同時下載數各在新的目錄下載一次（沒有快取可用）"""
+    print(f"圖片 {count} 張，每張 {size / 1024:.0f} KB，模擬延遲 {latency * 1000:.0f} ms")
+    print(f"{'路徑':<12}{'同時下載數':>10}{'成功':>8}{'秒':>9}{'張/秒':>10}{'MB/秒':>10}")
+    print("=" * 60)
+
+    with image_server(count, size, latency) as urls:
+        for name, run in (("轉換器", run_converter), ("進階下載器", run_advanced)):
+            for workers in worker_counts:
+                with tempfile.TemporaryDirectory() as tmp:
+                    start = time.perf_counter()
+                    with contextlib.redirect_stdout(io.StringIO()):
+                        success = run(urls, Path(tmp), workers)
+                    elapsed = time.perf_counter() - start
+                print_row(name, workers, success, elapsed, size)
+
+        # 離線重播：先錄製一次封存，再完全從封存取得（不經過網路）
+        workers = max(worker_counts)
+        with tempfile.TemporaryDirectory() as tmp:
+            archive = Path(tmp) / "archive"
+            with contextlib.redirect_stdout(io.StringIO()):
+                run_converter(urls, Path(tmp) / "record", workers, record_archive=archive)
+                start = time.perf_counter()
+                success = run_converter(urls, Path(tmp) / "replay", workers, offline_archive=archive)
+                elapsed = time.perf_counter() - start
+            print_row("離線封存", workers, success, elapsed, size)
+
+
+def print_row(name, workers, success, elapsed, size):
+    print(f"{name:<12}{workers:>10}{success:>8}{elapsed:>9.2f}"
+          f"{success / elapsed:>10.1f}{success * size / elapsed / 1024 / 1024:>10.2f}")
+
+
+def main():
+    import argparse
+
+    parser = argparse.ArgumentParser(description='比較兩條圖片下載路徑的吞吐量')
+    parser.add_argument('--count', type=int, default=64, help='圖片數 (預設: 64)')
+    parser.add_argument('--size-kb', type=int, default=256, help='每張圖片的大小 (預設: 256 KB)')
+    parser.add_argument('--latency-ms', type=float, default=50, help='模擬的回應延遲 (預設: 50 ms)')
+    parser.add_argument('--workers', type=int, nargs='+', default=[1, 4, 16],
+                        help='要比較的同時下載數 (預設: 1 4 16)')
+    args = parser.parse_args()
+
+    # 基準測試只連到本機，不限制每秒請求數
+    configure_rate_limiter(rate=0)
+    benchmark(args.count, args.size_kb * 1024, args.latency_ms / 1000, args.workers)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,102 @@
+#!/usr/bin/env python3
+"""
+PDF用HTML精簡基準測試
+比較精簡前後的DOM節點數、HTML大小與WeasyPrint轉換時間
+"""
+
+import io
+import os
+import sys
+import glob
+import time
+import tempfile
+import contextlib
+from pathlib import Path
+
+# 加入專案根目錄
+sys.path.append(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from vocus_converter import VocusArticleConverter
+from utils.html_minify import minify_html
+
+
+def render_time(full_html):
+    """以WeasyPrint轉換為PDF（不寫入檔案），回傳耗時；未安裝時回傳None"""
+    try:
+        from weasyprint import HTML
+    except ImportError:
+        return None
+    start = time.perf_counter()
+    HTML(string=full_html).write_pdf()
+    return time.perf_counter() - start
+
+
+def benchmark(html_files):
+    """逐篇比較精簡前後的結果"""
+    print(f"{'檔案':<28}{'節點(前)':>10}{'節點(後)':>10}{'KB(前)':>9}{'KB(後)':>9}"
+          f"{'轉換(前)s':>11}{'轉換(後)s':>11}")
+    print("=" * 88)
+
+    totals = {'before': 0, 'after': 0, 'render_before': 0.0, 'render_after': 0.0}
+    rendered = True
+
+    with tempfile.TemporaryDirectory() as tmp:
+        work_dir = Path(tmp)
+        for html_file in html_files:
+            converter = VocusArticleConverter(
+                html_file,
+                output_dir=work_dir / "output",
+                images_dir=work_dir / "images",
+                use_cache=False
+            )
+            with contextlib.redirect_stdout(io.StringIO()):
+                converter.parse_html()
+                _, stats = minify_html(converter.content_html)
+                full_before = converter._build_pdf_html(minify=False)
+                full_after = converter._build_pdf_html(minify=True)
+
+            before = render_time(full_before)
+            after = render_time(full_after) if before is not None else None
+            rendered = rendered and before is not None
+
+            totals['before'] += stats['nodes_before']
+            totals['after'] += stats['nodes_after']
+            if before is not None:
+                totals['render_before'] += before
+                totals['render_after'] += after
+
+            render_columns = (f"{before:>11.2f}{after:>11.2f}" if before is not None
+                              else f"{'-':>11}{'-':>11}")
+            print(f"{os.path.basename(html_file)[:26]:<28}{stats['nodes_before']:>10}{stats['nodes_after']:>10}"
+                  f"{stats['bytes_before'] / 1024:>9.0f}{stats['bytes_after'] / 1024:>9.0f}{render_columns}")
+
+    print("=" * 88)
+    if totals['before']:
+        print(f"節點數: {totals['before']} → {totals['after']} "
+              f"({(1 - totals['after'] / totals['before']) * 100:.1f}% 減少)")
+    if rendered and totals['render_before']:
+        print(f"轉換時間: {totals['render_before']:.2f}s → {totals['render_after']:.2f}s "
+              f"({totals['render_before'] / totals['render_after']:.2f}x)")
+    elif not rendered:
+        print("WeasyPrint 未安裝，只比較節點數與大小")
+
+
+def main():
+    """主函數"""
+    import argparse
+
+    parser = argparse.ArgumentParser(description='比較PDF用HTML精簡前後的節點數與轉換時間')
+    parser.add_argument('pattern', nargs='?', default='article_html/*.html', help='HTML檔案匹配模式')
+
+    args = parser.parse_args()
+
+    html_files = sorted(glob.glob(args.pattern))
+    if not html_files:
+        print(f"找不到符合條件的HTML檔案: {args.pattern}")
+        return
+
+    benchmark(html_files)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,105 @@
+#!/usr/bin/env python3
+"""
+HTML解析引擎基準測試
+以 html.parser 的結果作為黃金樣本，確認其他引擎輸出一致並比較吞吐量
+"""
+
+import io
+import os
+import sys
+import glob
+import time
+import tempfile
+import contextlib
+from pathlib import Path
+
+# 加入專案根目錄
+sys.path.append(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from vocus_converter import VocusArticleConverter
+from utils.html_parser import PARSER_CHOICES, resolve_parser, make_soup
+
+COMPARED_FIELDS = ['title', 'author', 'publish_date', 'last_modified', 'content_html']
+
+
+def parse_article(html_file, parser, work_dir):
+    """以指定引擎執行parse_html，回傳(結果, 耗時)"""
+    converter = VocusArticleConverter(
+        html_file,
+        output_dir=work_dir / "output",
+        images_dir=work_dir / "images",
+        parser=parser,
+        use_cache=False
+    )
+    start = time.perf_counter()
+    with contextlib.redirect_stdout(io.StringIO()):
+        converter.parse_html()
+    elapsed = time.perf_counter() - start
+
+    result = {field: getattr(converter, field) for field in COMPARED_FIELDS}
+    result['images'] = [(img['url'], img['relative_path']) for img in converter.images]
+    return result, elapsed
+
+
+def benchmark(html_files, engines):
+    """比較各引擎的輸出與耗時"""
+    total_bytes = sum(Path(f).stat().st_size for f in html_files)
+    print(f"黃金樣本: {len(html_files)} 個檔案，共 {total_bytes / 1024 / 1024:.2f} MB")
+    print("=" * 60)
+
+    with tempfile.TemporaryDirectory() as tmp:
+        work_dir = Path(tmp)
+
+        golden = {}
+        for html_file in html_files:
+            golden[html_file], _ = parse_article(html_file, 'html.parser', work_dir)
+
+        print(f"{'引擎':<14}{'DOM建立(s)':>12}{'parse_html(s)':>16}{'MB/s':>10}  一致性")
+        for engine in engines:
+            actual = resolve_parser(engine)
+            soup_time = 0.0
+            parse_time = 0.0
+            mismatches = []
+
+            for html_file in html_files:
+                with open(html_file, 'r', encoding='utf-8') as f:
+                    html_content = f.read()
+                start = time.perf_counter()
+                make_soup(html_content, actual)
+                soup_time += time.perf_counter() - start
+
+                result, elapsed = parse_article(html_file, actual, work_dir)
+                parse_time += elapsed
+                for field, value in result.items():
+                    if value != golden[html_file][field]:
+                        mismatches.append(f"{os.path.basename(html_file)}:{field}")
+
+            throughput = total_bytes / 1024 / 1024 / parse_time if parse_time else 0
+            status = "✓ 相同" if not mismatches else f"✗ 差異 {len(mismatches)} 處"
+            label = engine if engine == actual else f"{engine}→{actual}"
+            print(f"{label:<14}{soup_time:>12.3f}{parse_time:>16.3f}{throughput:>10.2f}  {status}")
+            for mismatch in mismatches[:10]:
+                print(f"    - {mismatch}")
+
+
+def main():
+    """主函數"""
+    import argparse
+
+    parser = argparse.ArgumentParser(description='比較HTML解析引擎的輸出與吞吐量')
+    parser.add_argument('pattern', nargs='?', default='article_html/*.html', help='黃金樣本檔案匹配模式')
+    parser.add_argument('--engines', nargs='+', choices=PARSER_CHOICES,
+                        default=['html.parser', 'lxml', 'lexbor'], help='要比較的解析引擎')
+
+    args = parser.parse_args()
+
+    html_files = sorted(glob.glob(args.pattern))
+    if not html_files:
+        print(f"找不到符合條件的HTML檔案: {args.pattern}")
+        return
+
+    benchmark(html_files, args.engines)
+
+
+if __name__ == "__main__":
+    main()
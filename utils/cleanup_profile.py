@@ -0,0 +1,55 @@
+"""
+清理規則效能分析 - 記錄每條清理規則的耗時、走訪節點數與移除節點數
+單篇文章與整批轉換都可以累計，用來找出特別耗時或沒有作用的規則
+"""
+import json
+
+
+class CleanupProfile:
+    """各清理步驟的累計統計"""
+
+    FIELDS = ('seconds', 'visited', 'removed', 'changed')
+
+    def __init__(self):
+        self.articles = 0
+        self.steps = {}  # 步驟名稱 -> {seconds, visited, removed, changed}（依第一次記錄的順序）
+
+    def record(self, name, seconds=0.0, visited=0, removed=0, changed=0):
+        """累加一個步驟的統計"""
+        step = self.steps.setdefault(name, dict.fromkeys(self.FIELDS, 0))
+        step['seconds'] += seconds
+        step['visited'] += visited
+        step['removed'] += removed
+        step['changed'] += changed
+
+    def add_article(self):
+        self.articles += 1
+
+    def merge(self, other):
+        """合併另一份統計（批次轉換時累計每篇文章）"""
+        self.articles += other.articles
+        for name, step in other.steps.items():
+            self.record(name, **step)
+
+    def as_dict(self):
+        return {
+            'articles': self.articles,
+            'steps': [dict(name=name, **step) for name, step in self.steps.items()],
+        }
+
+    def save(self, path):
+        with open(path, 'w', encoding='utf-8') as f:
+            json.dump(self.as_dict(), f, ensure_ascii=False, indent=2)
+
+    def format_report(self):
+        """依耗時由高到低排列的報表"""
+        total = sum(step['seconds'] for step in self.steps.values())
+        lines = [
+            f"清理規則效能分析（{self.articles} 篇文章）",
+            f"{'步驟':<16}{'耗時(ms)':>10}{'比例':>8}{'走訪節點':>10}{'移除':>8}{'修改':>8}",
+        ]
+        for name, step in sorted(self.steps.items(), key=lambda item: -item[1]['seconds']):
+            share = step['seconds'] / total * 100 if total else 0
+            lines.append(f"{name:<16}{step['seconds'] * 1000:>10.1f}{share:>7.1f}%"
+                         f"{step['visited']:>10}{step['removed']:>8}{step['changed']:>8}")
+        return "\n".join(lines)
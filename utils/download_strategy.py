@@ -0,0 +1,191 @@
+"""
+下載策略排序與失效URL快取
+記錄每個主機上各下載策略的成功率與耗時，下載同一個URL的策略之間先嘗試表現最好的；
+回應404/410的URL在一段時間內直接略過，不再重試
+"""
+import os
+import json
+import time
+import tempfile
+import threading
+from pathlib import Path
+from urllib.parse import urlparse
+
+STATS_FILENAME = ".download_stats.json"
+NEGATIVE_CACHE_FILENAME = ".negative_cache.json"
+
+# 回應這些狀態碼的URL視為已不存在
+GONE_STATUS_CODES = (404, 410)
+# 失效URL略過的期間
+DEFAULT_NEGATIVE_TTL = 7 * 24 * 3600
+# 單一策略累積的嘗試次數超過上限時減半，讓最近的結果權重較高
+MAX_ATTEMPTS_PER_STRATEGY = 200
+
+
+def _host(url):
+    return urlparse(url).hostname or ''
+
+
+def _write_json(path, data):
+    """先寫入暫存檔再改名"""
+    path.parent.mkdir(parents=True, exist_ok=True)
+    fd, tmp_path = tempfile.mkstemp(dir=path.parent, suffix='.tmp')
+    try:
+        with os.fdopen(fd, 'w', encoding='utf-8') as f:
+            json.dump(data, f, ensure_ascii=False)
+        os.replace(tmp_path, path)
+    except Exception:
+        if os.path.exists(tmp_path):
+            os.unlink(tmp_path)
+        raise
+
+
+def _read_json(path):
+    try:
+        with open(path, 'r', encoding='utf-8') as f:
+            return json.load(f)
+    except (OSError, ValueError):
+        return {}
+
+
+class StrategyStats:
+    """每個主機上各策略的 {successes, failures, seconds}"""
+
+    def __init__(self, path):
+        self.path = Path(path)
+        self._lock = threading.Lock()
+        self._stats = None
+        self._dirty = False
+
+    def _load(self):
+        if self._stats is None:
+            self._stats = _read_json(self.path)
+
+    def _score(self, host, name):
+        """(成功率, 平均成功耗時)；沒有紀錄的策略成功率視為0.5"""
+        entry = self._stats.get(host, {}).get(name)
+        if not entry:
+            return (0.5, 0.0)
+        successes, failures = entry['successes'], entry['failures']
+        rate = (successes + 1) / (successes + failures + 2)
+        latency = entry['seconds'] / successes if successes else float('inf')
+        return (rate, latency)
+
+    def order(self, attempts):
+        """
+        排序 [(name, url, fetch), ...]：只在下載同一個URL的策略之間（內容相同、請求頭不同）
+        依成功率（高到低）與平均耗時（短到長）排序，不同URL之間保留原本的先後
+
+        不同URL的內容不一定相同（例如Resize URL是縮小過的圖片），
+        所以縮圖主機再快也不會排到原始URL前面。表現相同時保留原本的順序
+        """
+        with self._lock:
+            self._load()
+            keys = [self._score(_host(url), name) for name, url, _ in attempts]
+        groups = {}  # URL -> 策略位置（依URL第一次出現的順序）
+        for i, (_, url, _) in enumerate(attempts):
+            groups.setdefault(url, []).append(i)
+        ranked = []
+        for indices in groups.values():
+            ranked.extend(sorted(indices, key=lambda i: (-keys[i][0], keys[i][1])))
+        return [attempts[i] for i in ranked]
+
+    def record(self, url, name, success, seconds):
+        host = _host(url)
+        with self._lock:
+            self._load()
+            entry = self._stats.setdefault(host, {}).setdefault(
+                name, {'successes': 0, 'failures': 0, 'seconds': 0.0})
+            if success:
+                entry['successes'] += 1
+                entry['seconds'] += seconds
+            else:
+                entry['failures'] += 1
+            if entry['successes'] + entry['failures'] > MAX_ATTEMPTS_PER_STRATEGY:
+                entry['successes'] //= 2
+                entry['failures'] //= 2
+                entry['seconds'] /= 2
+            self._dirty = True
+
+    def track(self, name, url, fetch):
+        """包裝下載函數，記錄每次執行的結果與耗時（fetch 回傳None表示沒有實際嘗試，不記錄）"""
+        def tracked():
+            start = time.perf_counter()
+            result = False
+            try:
+                result = fetch()
+                return result
+            finally:
+                if result is not None:
+                    self.record(url, name, bool(result), time.perf_counter() - start)
+        return tracked
+
+    def flush(self):
+        with self._lock:
+            if not self._dirty:
+                return
+            _write_json(self.path, self._stats)
+            self._dirty = False
+
+
+class NegativeCache:
+    """URL → (狀態碼, 到期時間) 的失效URL快取"""
+
+    def __init__(self, path, ttl=DEFAULT_NEGATIVE_TTL):
+        self.path = Path(path)
+        self.ttl = ttl
+        self._lock = threading.Lock()
+        self._entries = None
+        self._dirty = False
+
+    def _load(self):
+        if self._entries is None:
+            self._entries = _read_json(self.path)
+
+    def is_gone(self, url):
+        """URL是否在有效期間內回應過404/410"""
+        with self._lock:
+            self._load()
+            entry = self._entries.get(url)
+            if entry is None:
+                return False
+            if entry['expires'] < time.time():
+                del self._entries[url]
+                self._dirty = True
+                return False
+            return True
+
+    def add(self, url, status):
+        with self._lock:
+            self._load()
+            self._entries[url] = {'status': status, 'expires': time.time() + self.ttl}
+            self._dirty = True
+
+    def flush(self):
+        with self._lock:
+            if not self._dirty:
+                return
+            _write_json(self.path, self._entries)
+            self._dirty = False
+
+
+_instances = {}
+_instances_lock = threading.Lock()
+
+
+def _shared(cls, directory, filename):
+    path = (Path(directory) / filename).resolve()
+    with _instances_lock:
+        if path not in _instances:
+            _instances[path] = cls(path)
+        return _instances[path]
+
+
+def get_strategy_stats(images_dir):
+    """同一個圖片目錄在整個行程中共用同一份策略統計"""
+    return _shared(StrategyStats, images_dir, STATS_FILENAME)
+
+
+def get_negative_cache(images_dir):
+    """同一個圖片目錄在整個行程中共用同一份失效URL快取"""
+    return _shared(NegativeCache, images_dir, NEGATIVE_CACHE_FILENAME)
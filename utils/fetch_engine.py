@@ -0,0 +1,301 @@
+"""
+圖片下載排程引擎 - 以asyncio排程，整批轉換共用一個同時下載上限與每個主機的上限
+每張圖片只是一個等待中的協程，實際的HTTP請求在大小等於同時下載上限的執行緒池中執行，
+所以排入上千張圖片也不會開出上千個執行緒
+
+對沖請求：主要的下載方式超過該主機首位元組延遲的百分位數仍未收到回應時，同時開始下一個URL不同的方式，
+先成功的結果勝出；較慢的一方註冊的中斷函數（關閉連線）立即被呼叫，讀取中途卡住的請求也會馬上結束。
+某個方式拋出例外時，其他仍在執行的方式同樣被中斷
+"""
+import asyncio
+import threading
+from collections import deque
+from concurrent.futures import ThreadPoolExecutor
+from urllib.parse import urlparse
+
+# 整批同時進行的請求數上限
+DEFAULT_MAX_IN_FLIGHT = 16
+# 同一個主機同時進行的請求數上限
+DEFAULT_PER_HOST = 6
+
+# 對沖延遲取首位元組延遲的這個百分位數，樣本不足時使用預設值，並限制在上下限之間
+HEDGE_PERCENTILE = 0.9
+HEDGE_MIN_SAMPLES = 5
+DEFAULT_HEDGE_DELAY = 2.0
+MIN_HEDGE_DELAY = 0.25
+MAX_HEDGE_DELAY = 10.0
+# 每個主機保留的延遲樣本數
+LATENCY_WINDOW = 100
+
+_current = threading.local()
+
+
+class _HedgeJob:
+    """同一張圖片互相競爭的下載方式共用的狀態：只有一方能寫入結果，勝負已定時通知其他方中斷"""
+
+    def __init__(self):
+        self._lock = threading.Lock()
+        self._claimed = False
+        self._aborts = {}  # 執行中的下載方式 -> 中斷函數
+        self.cancelled = threading.Event()
+
+    def run(self, fetch, started=None):
+        key = object()
+        _current.job = self
+        _current.key = key
+        _current.started = started
+        try:
+            return fetch()
+        finally:
+            # 結束後不再中斷它的連線（連線可能已經回到連線池）
+            with self._lock:
+                self._aborts.pop(key, None)
+            _current.job = None
+            _current.key = None
+            _current.started = None
+
+    def claim(self):
+        with self._lock:
+            if self._claimed or self.cancelled.is_set():
+                return False
+            self._claimed = True
+            return True
+
+    def add_abort(self, key, abort):
+        with self._lock:
+            if not self.cancelled.is_set():
+                self._aborts[key] = abort
+                return
+        abort()
+
+    def cancel(self):
+        """通知所有下載方式中斷，並呼叫仍在執行的方式的中斷函數"""
+        with self._lock:
+            self.cancelled.set()
+            aborts, self._aborts = list(self._aborts.values()), {}
+            # 持有鎖時呼叫，下載方式不會在這期間結束並歸還連線
+            for abort in aborts:
+                try:
+                    abort()
+                except Exception:
+                    pass
+
+
+def hedge_cancelled():
+    """目前的下載方式是否已經輸給同一張圖片的其他方式（應立即中斷）"""
+    job = getattr(_current, 'job', None)
+    return job is not None and job.cancelled.is_set()
+
+
+def response_started():
+    """
+    收到回應（標頭或第一段內容）時呼叫：停止這個下載方式的對沖計時並記錄首位元組延遲
+    之後的傳輸再慢也不會觸發對沖（不在引擎中執行時沒有作用）
+    """
+    started = getattr(_current, 'started', None)
+    if started is not None:
+        _current.started = None
+        started()
+
+
+def on_hedge_cancel(abort):
+    """
+    註冊目前下載方式的中斷函數（例如關閉進行中的連線）：其他方式勝出時由引擎立即呼叫，
+    不必等到下一段內容才發現；下載方式結束後自動取消註冊。abort 不可阻塞（不在引擎中執行時沒有作用）
+    """
+    job = getattr(_current, 'job', None)
+    if job is not None:
+        job.add_abort(_current.key, abort)
+
+
+def claim_result():
+    """寫入結果前呼叫：回傳False時表示其他方式已經勝出，不要寫入（不在引擎中執行時一律為True）"""
+    job = getattr(_current, 'job', None)
+    return job is None or job.claim()
+
+
+class FetchEngine:
+    """
+    共用的下載排程引擎（可作為context manager使用）
+
+    submit() 接受依序嘗試的下載方式 [(url, 下載函數), ...]，回傳 concurrent.futures.Future；
+    任何執行緒都可以排入工作並等待結果。
+    """
+
+    def __init__(self, max_in_flight=DEFAULT_MAX_IN_FLIGHT, per_host=DEFAULT_PER_HOST, hedge=True):
+        self.max_in_flight = max(1, max_in_flight)
+        self.per_host = max(1, per_host)
+        self.hedge = hedge
+        self.stats = {'submitted': 0, 'requests': 0, 'peak_in_flight': 0, 'hedged': 0, 'hedge_wins': 0}
+        self._latencies = {}  # 主機 -> 最近成功的耗時（秒）
+
+        self._lock = threading.Lock()
+        self._loop = None
+        self._thread = None
+        self._executor = None
+        self._global_slots = None
+        self._host_slots = {}
+        self._in_flight = 0
+
+    def start(self):
+        """啟動事件迴圈執行緒（submit 時會自動啟動）"""
+        with self._lock:
+            if self._loop is not None:
+                return
+            ready = threading.Event()
+            self._loop = asyncio.new_event_loop()
+            self._executor = ThreadPoolExecutor(max_workers=self.max_in_flight,
+                                                thread_name_prefix='fetch-engine')
+            self._thread = threading.Thread(target=self._run_loop, args=(ready,),
+                                            name='fetch-engine-loop', daemon=True)
+            self._thread.start()
+            ready.wait()
+
+    def _run_loop(self, ready):
+        asyncio.set_event_loop(self._loop)
+        self._global_slots = asyncio.Semaphore(self.max_in_flight)
+        self._loop.call_soon(ready.set)
+        self._loop.run_forever()
+
+    def submit(self, attempts):
+        """
+        排入一個下載工作
+
+        attempts: [(url, fetch), ...] 依序嘗試，fetch() 在工作執行緒中執行，
+                  回傳值為真時視為成功並停止嘗試
+        """
+        self.start()
+        with self._lock:
+            self.stats['submitted'] += 1
+        return asyncio.run_coroutine_threadsafe(self._run_attempts(list(attempts)), self._loop)
+
+    async def _run_attempts(self, attempts):
+        """
+        依序嘗試，直到某個方式成功
+
+        主要方式開始執行後超過對沖延遲仍未收到回應時，同時開始佇列中下一個URL不同的方式
+        （同一個URL的方式會寫入同一個暫存檔，不互相競爭）；已收到回應、只是傳輸較慢的下載不對沖
+        """
+        job = _HedgeJob()
+        queue = list(attempts)
+        running = {}  # task -> (url, 是否為對沖請求)
+        hedge_due = asyncio.Event()
+        result = False
+
+        def launch(url, fetch, hedged):
+            task = self._loop.create_task(
+                self._run_attempt(url, fetch, job, None if hedged or not self.hedge else hedge_due))
+            running[task] = (url, hedged)
+
+        try:
+            while queue or running:
+                if not running:
+                    hedge_due.clear()
+                    url, fetch = queue.pop(0)
+                    launch(url, fetch, hedged=False)
+
+                waiter = self._loop.create_task(hedge_due.wait())
+                done, _ = await asyncio.wait({*running, waiter}, return_when=asyncio.FIRST_COMPLETED)
+                if not waiter.done():
+                    waiter.cancel()
+
+                finished = [task for task in done if task is not waiter]
+                for task in finished:
+                    _, hedged = running.pop(task)
+                    result = task.result()
+                    if result:
+                        if hedged:
+                            self.stats['hedge_wins'] += 1
+                        return result
+
+                if hedge_due.is_set() and running and not finished:
+                    hedge_due.clear()
+                    running_urls = {url for url, _ in running.values()}
+                    for index, (url, fetch) in enumerate(queue):
+                        if url not in running_urls:
+                            del queue[index]
+                            launch(url, fetch, hedged=True)
+                            self.stats['hedged'] += 1
+                            break
+            return result
+        finally:
+            # 勝負已定或某個方式拋出例外：立即中斷其他仍在執行的方式（關閉連線），它們的結果與例外不再需要
+            if running:
+                job.cancel()
+                for loser in running:
+                    loser.add_done_callback(lambda t: t.cancelled() or t.exception())
+
+    async def _run_attempt(self, url, fetch, job, hedge_due):
+        host = urlparse(url).hostname or ''
+        # 先取得主機的名額再取得全域名額，等待某個主機時不會佔住其他主機可用的名額
+        async with self._host_slot(host):
+            async with self._global_slots:
+                # 取得名額、真正開始下載後才開始計時，收到回應時停止
+                timer = None
+                if hedge_due is not None:
+                    timer = self._loop.call_later(self.hedge_delay(host), hedge_due.set)
+                start = self._loop.time()
+
+                def first_byte():
+                    if timer is not None:
+                        timer.cancel()
+                    self._latencies.setdefault(host, deque(maxlen=LATENCY_WINDOW)).append(
+                        self._loop.time() - start)
+
+                def started():
+                    # 在工作執行緒中呼叫，交給事件迴圈處理
+                    self._loop.call_soon_threadsafe(first_byte)
+
+                try:
+                    return await self._run_in_executor(lambda: job.run(fetch, started))
+                finally:
+                    if timer is not None:
+                        timer.cancel()
+
+    def hedge_delay(self, host):
+        """主機首位元組延遲的百分位數（樣本不足時使用預設值）"""
+        samples = sorted(self._latencies.get(host, ()))
+        if len(samples) < HEDGE_MIN_SAMPLES:
+            return DEFAULT_HEDGE_DELAY
+        delay = samples[min(len(samples) - 1, int(len(samples) * HEDGE_PERCENTILE))]
+        return min(MAX_HEDGE_DELAY, max(MIN_HEDGE_DELAY, delay))
+
+    def _host_slot(self, host):
+        slot = self._host_slots.get(host)
+        if slot is None:
+            slot = self._host_slots[host] = asyncio.Semaphore(self.per_host)
+        return slot
+
+    async def _run_in_executor(self, fetch):
+        self._in_flight += 1
+        self.stats['requests'] += 1
+        self.stats['peak_in_flight'] = max(self.stats['peak_in_flight'], self._in_flight)
+        try:
+            return await self._loop.run_in_executor(self._executor, fetch)
+        finally:
+            self._in_flight -= 1
+
+    async def _drain(self):
+        """等待仍在執行的下載方式（例如輸掉、正在中斷的對沖請求）結束"""
+        tasks = [task for task in asyncio.all_tasks() if task is not asyncio.current_task()]
+        await asyncio.gather(*tasks, return_exceptions=True)
+
+    def close(self):
+        """停止事件迴圈並等待執行中的請求結束"""
+        with self._lock:
+            loop, thread, executor = self._loop, self._thread, self._executor
+            self._loop = self._thread = self._executor = None
+        if loop is None:
+            return
+        asyncio.run_coroutine_threadsafe(self._drain(), loop).result()
+        loop.call_soon_threadsafe(loop.stop)
+        thread.join()
+        executor.shutdown(wait=True)
+        loop.close()
+        self._host_slots = {}
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, exc_type, exc, tb):
+        self.close()
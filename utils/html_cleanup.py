@@ -0,0 +1,420 @@
+"""
+HTML清理引擎 - 以規則表在單次走訪中清理文章內容
+規則表在每個行程只編譯一次，走訪時為每個節點決定：保留、移出圖片後移除、或直接移除
+"""
+import re
+import time
+import hashlib
+
+from bs4.element import Tag, NavigableString
+
+# 節點處理動作（未命中任何規則的節點保留）
+DECOMPOSE = 'decompose'          # 連同子節點一起移除
+UNWRAP_IMAGES = 'unwrap_images'  # 先把需要保留的圖片移到節點前面，再移除節點
+
+# 規則命中img本身時的處理方式
+IMG_STRIP_ATTRS = 'strip_attrs'        # 只移除規則屬性，保留圖片
+IMG_KEEP_PRESERVED = 'keep_preserved'  # 需要保留的圖片不動，其餘移除
+
+# 需要保留的圖片：已被 _process_images 改寫為本地路徑
+PRESERVED_SRC_MARKER = '../../images/'
+
+# 廣告關鍵字
+AD_PATTERNS = [
+    "為什麼會看到廣告",
+    "廣告",
+    "advertisement",
+    "ads"
+]
+AD_TEXT_MAX_LENGTH = 20
+
+# 清理規則表（順序即原本逐項清理的先後順序，決定圖片最後的位置）
+CLEANUP_RULES = [
+    {
+        # 縮放控制元素 (zoom control)，包含圖片的交給 ui_controls 處理
+        'name': 'zoom_controls',
+        'action': DECOMPOSE,
+        'tags': ['div'],
+        'classes': ['zoom-control'],
+        'unless_contains': 'img',
+    },
+    {
+        # 放大按鈕
+        'name': 'expand_buttons',
+        'action': DECOMPOSE,
+        'tags': ['button'],
+        'attr_patterns': {'aria-label': 'Expand image'},
+    },
+    {
+        # rmiz相關的縮放元素，絕對保留圖片
+        'name': 'rmiz',
+        'action': UNWRAP_IMAGES,
+        'attrs': ['data-rmiz'],
+        'on_img': IMG_STRIP_ATTRS,
+    },
+    {
+        # SVG圖標 (通常是UI控制元素)
+        'name': 'svg_icons',
+        'action': DECOMPOSE,
+        'tags': ['svg'],
+    },
+    {
+        # ghost元素 (用於縮放的虛擬元素)
+        'name': 'rmiz_ghosts',
+        'action': DECOMPOSE,
+        'attrs': ['data-rmiz-ghost'],
+    },
+    {
+        # 直接包含廣告文字的元素
+        'name': 'ad_text',
+        'action': DECOMPOSE,
+        'text_patterns': AD_PATTERNS,
+    },
+    {
+        # 其他UI控制元素與廣告class（保護圖片）
+        'name': 'ui_controls',
+        'action': UNWRAP_IMAGES,
+        'classes': ['zoom.*control', '.*zoom.*', '.*ad.*', '.*advertisement.*'],
+        'attrs': ['data-rmiz-btn-zoom', 'data-rmiz-btn-zoom-icon'],
+        'on_img': IMG_KEEP_PRESERVED,
+    },
+]
+
+
+class TextPatternMatcher:
+    """
+    多關鍵字比對器
+    關鍵字先建成字典樹再編譯為單一正規表達式，每段文字只掃描一次，與關鍵字數量無關
+    """
+
+    def __init__(self, patterns, max_length=AD_TEXT_MAX_LENGTH):
+        self.patterns = tuple(p for p in patterns if p)
+        self.exact = frozenset(self.patterns)
+        self.max_length = max_length
+        self.regex = re.compile(self._trie_pattern(self.patterns)) if self.patterns else None
+
+    @staticmethod
+    def _trie_pattern(patterns):
+        """將關鍵字字典樹轉為正規表達式（同一層的分支開頭字元都不同）"""
+        trie = {}
+        for pattern in patterns:
+            node = trie
+            for char in pattern:
+                node = node.setdefault(char, {})
+            node[''] = True
+
+        def build(node):
+            # 較短的關鍵字已經完整比對成功，後面的分支不需要再比
+            if '' in node:
+                return ''
+            branches = [re.escape(char) + build(child) for char, child in sorted(node.items())]
+            if len(branches) == 1:
+                return branches[0]
+            return '(?:' + '|'.join(branches) + ')'
+
+        return build(trie)
+
+    def matches(self, text):
+        """文字完全等於關鍵字，或是短文字中包含任一關鍵字"""
+        if self.regex is None:
+            return False
+        if text in self.exact:
+            return True
+        return len(text) < self.max_length and self.regex.search(text) is not None
+
+
+class CompiledRule:
+    """編譯後的清理規則"""
+
+    def __init__(self, spec):
+        self.name = spec['name']
+        self.action = spec['action']
+        self.on_img = spec.get('on_img')
+        self.tags = frozenset(spec.get('tags', ()))
+        self.unless_contains = spec.get('unless_contains')
+
+        classes = spec.get('classes')
+        self.class_re = re.compile('|'.join(f'(?:{c})' for c in classes)) if classes else None
+        self.attrs = tuple(spec.get('attrs', ()))
+        self.attr_patterns = {name: re.compile(pattern)
+                              for name, pattern in spec.get('attr_patterns', {}).items()}
+
+        text_patterns = spec.get('text_patterns')
+        self.text_matcher = None
+        if text_patterns is not None:
+            self.text_matcher = TextPatternMatcher(
+                text_patterns, spec.get('text_max_length', AD_TEXT_MAX_LENGTH))
+
+    def matches(self, node):
+        """檢查節點是否符合此規則（與BeautifulSoup.find_all相同的比對方式）"""
+        if self.tags and node.name not in self.tags:
+            return False
+
+        # class 與 attrs 之間是「或」的關係（分別對應原本的多個選擇器）
+        selectors = self.class_re is not None or self.attrs
+        if selectors:
+            if not (self._class_matches(node) or self._has_attr(node)):
+                return False
+
+        for name, pattern in self.attr_patterns.items():
+            value = node.attrs.get(name)
+            if value is None or not pattern.search(value if isinstance(value, str) else ' '.join(value)):
+                return False
+
+        if self.text_matcher is not None and not self._has_matching_text(node):
+            return False
+
+        if self.unless_contains and node.find(self.unless_contains) is not None:
+            return False
+
+        return True
+
+    def _class_matches(self, node):
+        if self.class_re is None:
+            return False
+        classes = node.attrs.get('class')
+        if not classes:
+            return False
+        if isinstance(classes, str):
+            return bool(self.class_re.search(classes))
+        return (any(self.class_re.search(c) for c in classes)
+                or bool(self.class_re.search(' '.join(classes))))
+
+    def _has_attr(self, node):
+        return any(node.attrs.get(name) is not None for name in self.attrs)
+
+    def _has_matching_text(self, node):
+        """節點的直接文字子節點是否為廣告文字"""
+        for child in node.contents:
+            if not isinstance(child, NavigableString):
+                continue
+            if self.text_matcher.matches(child.strip()):
+                return True
+        return False
+
+
+class _ProfiledRule:
+    """記錄比對次數與耗時的規則包裝（只在效能分析時使用）"""
+
+    def __init__(self, rule):
+        self.rule = rule
+        self.name = rule.name
+        self.action = rule.action
+        self.on_img = rule.on_img
+        self.attrs = rule.attrs
+        self.seconds = 0.0
+        self.visited = 0
+
+    def matches(self, node):
+        start = time.perf_counter()
+        result = self.rule.matches(node)
+        self.seconds += time.perf_counter() - start
+        self.visited += 1
+        return result
+
+
+class CleanupEngine:
+    """單次走訪的HTML清理引擎"""
+
+    def __init__(self, rules=CLEANUP_RULES, extra_ad_patterns=()):
+        if extra_ad_patterns:
+            rules = [dict(spec, text_patterns=list(spec['text_patterns']) + list(extra_ad_patterns))
+                     if 'text_patterns' in spec else spec
+                     for spec in rules]
+        self.rules = [CompiledRule(spec) for spec in rules]
+        self.decompose_bits = 0
+        self.unwrap_bits = 0
+        for index, rule in enumerate(self.rules):
+            if rule.action == DECOMPOSE:
+                self.decompose_bits |= 1 << index
+            elif rule.action == UNWRAP_IMAGES:
+                self.unwrap_bits |= 1 << index
+
+    def clean(self, root, profile=None):
+        """
+        走訪一次文章子樹，依規則決定每個節點的處理方式後一次套用
+        結果與依序執行每條規則的 find_all 清理完全相同，只有逐項清理本身的缺陷不重現：
+        - 逐項清理以 set 記錄要保留的圖片，bs4 的 Tag 以內容判斷相等，標記完全相同的多張圖片只記錄一張，
+          其中一張被修改或移除後其他的也不再保留；這裡逐張判斷（轉換後每張保留的圖片路徑都不同，實際文章不會發生）
+        - 廣告文字直接位於 root 下時，逐項清理會移除 root 本身；這裡只處理 root 的子孫
+        - 廣告文字的祖先已被移除時，逐項清理會拋出例外
+
+        profile (CleanupProfile) 不為None時，記錄每條規則的耗時、比對節點數與移除節點數
+        """
+        rules = self.rules if profile is None else [_ProfiledRule(rule) for rule in self.rules]
+        to_decompose = []   # 最外層需要移除的節點 (節點, 造成移除的規則索引)
+        image_moves = []    # (圖片, 移到哪個節點之前)
+        strip_attrs = []    # (圖片, 要移除的屬性)
+
+        # matched: 祖先中符合規則的節點 (深度, 規則位元遮罩, 節點)
+        # unwrap: 祖先命中過的移出圖片規則（位元遮罩）
+        stack = [(child, 1, (), 0) for child in reversed(root.contents) if isinstance(child, Tag)]
+        while stack:
+            node, depth, matched, unwrap = stack.pop()
+
+            if node.name == 'img':
+                self._resolve_image(rules, node, depth, matched, to_decompose, image_moves, strip_attrs)
+                continue
+
+            mask = 0
+            for index, rule in enumerate(rules):
+                if rule.matches(node):
+                    mask |= 1 << index
+            if mask:
+                if not matched:
+                    # 逐項清理時，第一條符合的規則就會移除這個節點
+                    to_decompose.append((node, (mask & -mask).bit_length() - 1))
+                matched = matched + ((depth, mask, node),)
+                unwrap |= mask & self.unwrap_bits
+
+                # 在第一條移除規則之前沒有任何規則會把圖片移出，整個子樹都不會留下
+                kill = mask & self.decompose_bits
+                if kill and not unwrap & ((kill & -kill) - 1):
+                    continue
+
+            for child in reversed(node.contents):
+                if isinstance(child, Tag):
+                    stack.append((child, depth + 1, matched, unwrap))
+
+        apply_start = time.perf_counter()
+        for img, anchor in image_moves:
+            anchor.insert_before(img)
+        for img, attrs in strip_attrs:
+            for attr in attrs:
+                if attr in img.attrs:
+                    del img[attr]
+        for node, _ in to_decompose:
+            node.decompose()
+
+        if profile is not None:
+            removed_by = [0] * len(rules)
+            for _, index in to_decompose:
+                removed_by[index] += 1
+            for rule, removed in zip(rules, removed_by):
+                profile.record(rule.name, rule.seconds, rule.visited, removed)
+            profile.record('apply', time.perf_counter() - apply_start,
+                           changed=len(image_moves) + len(strip_attrs))
+
+        return {
+            'removed': len(to_decompose),
+            'images_moved': len(image_moves),
+        }
+
+    def _resolve_image(self, rules, img, depth, matched, to_decompose, image_moves, strip_attrs):
+        """模擬逐項清理時圖片的去留與最終位置"""
+        preserved = PRESERVED_SRC_MARKER in img.get('src', '')
+        parent_depth = depth - 1  # 目前所在的父節點深度（被移出後會往上）
+        anchor = None
+        stripped = []
+
+        for index, rule in enumerate(rules):
+            bit = 1 << index
+            ancestors = [(d, n) for d, m, n in matched if m & bit and d <= parent_depth]
+
+            # 先處理祖先（文件順序中祖先較早被處理）
+            if ancestors:
+                if rule.action == UNWRAP_IMAGES and preserved:
+                    outer_depth, anchor = ancestors[0]
+                    parent_depth = outer_depth - 1
+                else:
+                    return self._drop_image(img, index, matched, to_decompose)
+
+            # 再處理圖片本身
+            if rule.matches(img):
+                if rule.on_img == IMG_STRIP_ATTRS:
+                    stripped.extend(rule.attrs)
+                    # 原本以set記錄保留的圖片，屬性被修改後就不再被視為保留
+                    preserved = False
+                elif rule.on_img == IMG_KEEP_PRESERVED and preserved:
+                    pass
+                else:
+                    return self._drop_image(img, index, matched, to_decompose)
+
+        if anchor is not None:
+            image_moves.append((img, anchor))
+        if stripped:
+            strip_attrs.append((img, stripped))
+
+    def _drop_image(self, img, index, matched, to_decompose):
+        """圖片不保留：若沒有祖先會被移除，就直接移除圖片"""
+        if not matched:
+            to_decompose.append((img, index))
+
+    def remove_empty_divs(self, root, profile=None):
+        """移除空的div容器（無文字、無圖片、無視頻、無音頻、無src屬性的元素）"""
+        start = time.perf_counter()
+        text_types = root.interesting_string_types
+        media_tags = ('img', 'video', 'audio')
+
+        # 先序走訪收集節點，反向即可由下而上計算是否有內容
+        order = []
+        stack = [root]
+        while stack:
+            node = stack.pop()
+            order.append(node)
+            stack.extend(child for child in node.contents if isinstance(child, Tag))
+
+        has_content = {}
+        for node in reversed(order):
+            content = False
+            for child in node.contents:
+                if isinstance(child, Tag):
+                    if (has_content[id(child)] or child.name in media_tags
+                            or child.attrs.get('src') is not None):
+                        content = True
+                        break
+                elif self._is_text(child, text_types) and child.strip():
+                    content = True
+                    break
+            has_content[id(node)] = content
+
+        removed = 0
+        stack = [child for child in reversed(root.contents) if isinstance(child, Tag)]
+        while stack:
+            node = stack.pop()
+            if node.name == 'div' and not has_content[id(node)]:
+                node.decompose()
+                removed += 1
+                continue
+            stack.extend(child for child in reversed(node.contents) if isinstance(child, Tag))
+
+        if profile is not None:
+            profile.record('empty_divs', time.perf_counter() - start, len(order), removed)
+        return removed
+
+    @staticmethod
+    def _is_text(node, text_types):
+        """與Tag.get_text()相同的文字類型判斷"""
+        if isinstance(text_types, type):
+            return type(node) is text_types
+        if text_types is None:
+            return isinstance(node, NavigableString)
+        return type(node) in text_types
+
+
+def cleanup_fingerprint(extra_ad_patterns=()):
+    """清理規則的指紋（規則表或自訂關鍵字改變時，解析快取自動失效）"""
+    data = repr((CLEANUP_RULES, PRESERVED_SRC_MARKER, tuple(extra_ad_patterns or ())))
+    return hashlib.sha1(data.encode('utf-8')).hexdigest()
+
+
+def load_ad_patterns(path):
+    """讀取自訂廣告關鍵字檔案（每行一個，# 開頭為註解）"""
+    patterns = []
+    with open(path, 'r', encoding='utf-8') as f:
+        for line in f:
+            line = line.strip()
+            if line and not line.startswith('#'):
+                patterns.append(line)
+    return patterns
+
+
+_engines = {}
+
+
+def get_cleanup_engine(extra_ad_patterns=()):
+    """取得（每個行程只編譯一次的）清理引擎"""
+    key = tuple(extra_ad_patterns or ())
+    if key not in _engines:
+        _engines[key] = CleanupEngine(extra_ad_patterns=key)
+    return _engines[key]
@@ -0,0 +1,117 @@
+"""
+HTML輸入讀取 - 以mmap開啟儲存的網頁，從原始位元組判斷編碼
+解析器可以直接接收位元組，不需要先把整個檔案解碼成字串
+"""
+import re
+import mmap
+import codecs
+from pathlib import Path
+
+from utils.html_slicer import slice_tags
+
+DEFAULT_ENCODING = 'utf-8'
+
+# 只在檔案開頭尋找編碼宣告（與瀏覽器的prescan相同）
+SNIFF_BYTES = 4096
+
+_BOMS = [
+    (codecs.BOM_UTF8, 'utf-8-sig'),
+    (codecs.BOM_UTF16_LE, 'utf-16'),
+    (codecs.BOM_UTF16_BE, 'utf-16'),
+]
+
+# <meta charset="..."> 或 <meta http-equiv="Content-Type" content="text/html; charset=...">
+_META_CHARSET_RE = re.compile(
+    rb'<meta[^>]*?charset\s*=\s*["\']?\s*([A-Za-z0-9_.:\-]+)', re.IGNORECASE)
+
+# 與ASCII不相容的編碼不能直接以位元組擷取標籤
+_NON_ASCII_COMPATIBLE = ('utf-16', 'utf-16-le', 'utf-16-be', 'utf-32', 'utf-32-le', 'utf-32-be')
+
+_CR_RE = re.compile(rb'\r\n?')
+
+
+def sniff_encoding(head):
+    """從檔案開頭的位元組判斷編碼：BOM優先，其次是<meta charset>，都沒有時使用utf-8"""
+    for bom, encoding in _BOMS:
+        if head.startswith(bom):
+            return encoding
+
+    match = _META_CHARSET_RE.search(head[:SNIFF_BYTES])
+    if not match:
+        return DEFAULT_ENCODING
+    try:
+        name = codecs.lookup(match.group(1).decode('ascii')).name
+    except LookupError:
+        return DEFAULT_ENCODING
+    # 沒有BOM的utf-16宣告必定是錯的（能以ASCII讀到宣告）
+    if name in _NON_ASCII_COMPATIBLE:
+        return DEFAULT_ENCODING
+    return name
+
+
+def normalize_newlines(markup):
+    """
+    與文字模式讀檔相同的換行處理（str、bytes與mmap皆可）
+    mmap回傳bytes，替換與複製一次完成，不先另外複製整個檔案
+    """
+    if isinstance(markup, str):
+        return markup.replace('\r\n', '\n').replace('\r', '\n')
+    if isinstance(markup, bytes):
+        return markup.replace(b'\r\n', b'\n').replace(b'\r', b'\n')
+    if markup.find(b'\r') == -1:
+        return markup[:]
+    return _CR_RE.sub(b'\n', markup)
+
+
+class HtmlSource:
+    """以mmap開啟的HTML檔案（可作為context manager使用）"""
+
+    def __init__(self, html_file):
+        self.path = Path(html_file)
+        self._file = open(self.path, 'rb')
+        try:
+            # 空檔案無法mmap
+            self.data = mmap.mmap(self._file.fileno(), 0, access=mmap.ACCESS_READ)
+        except ValueError:
+            self.data = b''
+        self.encoding = sniff_encoding(self.data[:SNIFF_BYTES])
+
+    @property
+    def ascii_compatible(self):
+        """標籤與屬性是否能直接在位元組上比對"""
+        return codecs.lookup(self.encoding).name not in _NON_ASCII_COMPATIBLE
+
+    def read(self):
+        """回傳整個檔案的位元組"""
+        return self.data[:]
+
+    def text(self):
+        """解碼為字串（換行已正規化，直接從mmap解碼）"""
+        return normalize_newlines(codecs.decode(self.data, self.encoding, 'replace'))
+
+    def parse_tags(self, names):
+        """
+        只以指定的void標籤（如 img、meta）建立BeautifulSoup
+        只需要這些標籤的屬性時，解析器只收到標籤原文，不必把整個檔案複製成位元組
+        """
+        from bs4 import BeautifulSoup
+
+        if self.ascii_compatible:
+            return BeautifulSoup(slice_tags(self.data, names), 'html.parser', from_encoding=self.encoding)
+        return BeautifulSoup(slice_tags(self.text(), names), 'html.parser')
+
+    def close(self):
+        if isinstance(self.data, mmap.mmap):
+            self.data.close()
+        self._file.close()
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, exc_type, exc, tb):
+        self.close()
+
+
+def open_html(html_file):
+    """開啟HTML檔案，回傳HtmlSource"""
+    return HtmlSource(html_file)
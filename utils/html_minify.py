@@ -0,0 +1,193 @@
+"""
+PDF用HTML精簡 - 移除排版用不到的屬性、攤平沒有作用的包裝元素、合併相鄰的行內元素
+WeasyPrint 的選擇器比對與排版時間隨DOM大小成長，節點越少轉換越快
+Markdown 仍使用完整的 content_html，只有PDF使用精簡後的結果
+"""
+from bs4 import BeautifulSoup
+from bs4.element import Tag, NavigableString, Comment
+
+# 各元素保留的屬性（其餘的 class、data-*、loading 等屬性對PDF排版沒有作用）
+KEPT_ATTRIBUTES = {
+    'img': ('src', 'alt', 'width', 'height'),
+    'a': ('href',),
+    'td': ('colspan', 'rowspan'),
+    'th': ('colspan', 'rowspan'),
+    'ol': ('start', 'type', 'reversed'),
+    'li': ('value',),
+    'col': ('span',),
+    'colgroup': ('span',),
+}
+
+# 行內樣式中只影響互動、不影響PDF呈現的屬性（其餘如顏色、粗體、背景都保留）
+NON_RENDERING_STYLE_PROPERTIES = frozenset([
+    'cursor', 'pointer-events', 'user-select', '-webkit-user-select', '-webkit-tap-highlight-color',
+    'transition', 'transition-property', 'transition-duration', 'transition-delay',
+    'transition-timing-function', 'will-change',
+])
+
+# 區塊元素：只包含區塊元素的包裝div攤平後版面不變
+BLOCK_TAGS = frozenset([
+    'address', 'article', 'aside', 'blockquote', 'caption', 'dd', 'details', 'div', 'dl', 'dt',
+    'fieldset', 'figcaption', 'figure', 'footer', 'form', 'h1', 'h2', 'h3', 'h4', 'h5', 'h6',
+    'header', 'hr', 'li', 'main', 'nav', 'ol', 'p', 'pre', 'section', 'summary', 'table',
+    'tbody', 'td', 'tfoot', 'th', 'thead', 'tr', 'ul',
+])
+
+# 沒有屬性時可以攤平的區塊包裝元素（瀏覽器預設樣式沒有邊距）
+BLOCK_WRAPPER_TAGS = frozenset(['div', 'section'])
+
+# 相鄰且屬性相同時可以合併的行內元素
+MERGEABLE_INLINE_TAGS = frozenset([
+    'a', 'b', 'strong', 'i', 'em', 'u', 's', 'del', 'ins', 'mark', 'code', 'sub', 'sup', 'small',
+])
+
+# 空白有意義的元素
+PREFORMATTED_TAGS = frozenset(['pre', 'textarea'])
+
+
+def _filter_style(style):
+    """
+    移除不影響呈現的行內樣式：空的宣告、被後面同名宣告覆蓋的宣告與只影響互動的屬性
+    （"normal"之類的值可能是在覆蓋父元素的樣式，一律保留）
+    """
+    declarations = {}
+    for declaration in style.split(';'):
+        name, _, value = declaration.partition(':')
+        name, value = name.strip().lower(), value.strip()
+        if not name or not value or name in NON_RENDERING_STYLE_PROPERTIES:
+            continue
+        previous = declarations.get(name)
+        # 前面的 !important 不會被一般宣告覆蓋
+        if previous is not None and previous.endswith('important') and not value.endswith('important'):
+            continue
+        declarations.pop(name, None)
+        declarations[name] = value
+    return ';'.join(f"{name}:{value}" for name, value in declarations.items())
+
+
+def _strip_attributes(tag, referenced_ids):
+    """移除排版用不到的屬性，回傳移除的數量"""
+    if not tag.attrs:
+        return 0
+
+    kept_names = KEPT_ATTRIBUTES.get(tag.name, ())
+    attrs = {}
+    for name, value in tag.attrs.items():
+        if name in kept_names:
+            attrs[name] = value
+        elif name == 'id' and value in referenced_ids:
+            # 文章內連結的目標
+            attrs[name] = value
+        elif name == 'style':
+            style = _filter_style(value)
+            if style:
+                attrs[name] = style
+
+    removed = len(tag.attrs) - len(attrs)
+    if attrs != tag.attrs:
+        tag.attrs = attrs
+    return removed
+
+
+def _is_inside_preformatted(node):
+    return any(parent.name in PREFORMATTED_TAGS for parent in node.parents)
+
+
+def _only_block_children(tag):
+    """子節點是否全是區塊元素（或空白文字）"""
+    for child in tag.contents:
+        if isinstance(child, Tag):
+            if child.name not in BLOCK_TAGS:
+                return False
+        elif not isinstance(child, Comment) and child.strip():
+            return False
+    return True
+
+
+def _merge_inline_runs(tag):
+    """合併相鄰、名稱與屬性都相同的行內元素，回傳合併的數量"""
+    merged = 0
+    child = tag.contents[0] if tag.contents else None
+    while child is not None:
+        following = child.next_sibling
+        if (isinstance(child, Tag) and child.name in MERGEABLE_INLINE_TAGS
+                and isinstance(following, Tag) and following.name == child.name
+                and following.attrs == child.attrs):
+            for grandchild in list(following.contents):
+                child.append(grandchild.extract())
+            following.decompose()
+            merged += 1
+            continue
+        child = following
+    return merged
+
+
+def _is_block_or_edge(node):
+    return node is None or (isinstance(node, Tag) and node.name in BLOCK_TAGS)
+
+
+def _count_nodes(root):
+    return sum(1 for _ in root.descendants)
+
+
+def minify_html(html, parser='html.parser'):
+    """
+    精簡文章HTML供PDF轉換使用
+
+    Returns:
+        (精簡後的HTML, 統計資料 dict)
+    """
+    soup = BeautifulSoup(html, parser)
+    stats = {
+        'nodes_before': _count_nodes(soup),
+        'bytes_before': len(html.encode('utf-8')),
+        'attributes_removed': 0,
+        'wrappers_unwrapped': 0,
+        'inline_merged': 0,
+        'whitespace_removed': 0,
+    }
+
+    for comment in soup.find_all(string=lambda text: isinstance(text, Comment)):
+        comment.extract()
+
+    referenced_ids = {a['href'][1:] for a in soup.find_all('a', href=True)
+                      if a['href'].startswith('#')}
+
+    # 先序收集，反向即為由下而上（子元素先處理完才判斷父元素能否攤平）
+    tags = soup.find_all(True)
+    for tag in tags:
+        stats['attributes_removed'] += _strip_attributes(tag, referenced_ids)
+
+    top_level = {id(tag) for tag in soup.contents if isinstance(tag, Tag)}
+    for tag in reversed(tags):
+        # 最外層的文章容器保留，結果仍是單一元素
+        if tag.attrs or id(tag) in top_level:
+            continue
+        if tag.name == 'span' or (tag.name in BLOCK_WRAPPER_TAGS and _only_block_children(tag)):
+            tag.unwrap()
+            stats['wrappers_unwrapped'] += 1
+
+    for tag in soup.find_all(True):
+        stats['inline_merged'] += _merge_inline_runs(tag)
+
+    # 攤平與合併後相鄰的文字節點合併為一個
+    soup.smooth()
+
+    # 區塊元素之間只有空白的文字節點不影響排版
+    for text in soup.find_all(string=True):
+        if type(text) is not NavigableString or text.strip():
+            continue
+        parent = text.parent
+        if parent is None or (parent is not soup and parent.name not in BLOCK_TAGS):
+            continue
+        if not (_is_block_or_edge(text.previous_sibling) and _is_block_or_edge(text.next_sibling)):
+            continue
+        if _is_inside_preformatted(text):
+            continue
+        text.extract()
+        stats['whitespace_removed'] += 1
+
+    result = str(soup)
+    stats['nodes_after'] = _count_nodes(soup)
+    stats['bytes_after'] = len(result.encode('utf-8'))
+    return result, stats
@@ -0,0 +1,146 @@
+"""
+HTML解析引擎 - 可選擇的文章區塊定位引擎
+lxml、lexbor(selectolax) 只用來在整頁中找出文章內容區塊，BeautifulSoup的樹一律由 html.parser 建立，
+所以各引擎的轉換結果相同；引擎不可用時自動退回 html.parser
+"""
+import re
+import codecs
+from typing import Optional
+
+from bs4 import BeautifulSoup
+
+from utils.html_slicer import find_start_tag, slice_article
+
+# 可選擇的解析引擎（auto 會挑選目前環境中最快的可用引擎）
+PARSER_CHOICES = ['auto', 'lexbor', 'lxml', 'html.parser']
+DEFAULT_PARSER = 'html.parser'
+
+# 與 parse_html 相同的內容區塊搜尋規則
+_EDITOR_CONTENT_RE = re.compile('editor-content')
+_ARTICLE_CONTENT_RE = re.compile('article.*content')
+
+
+def _lxml_available() -> bool:
+    """檢查lxml是否可用"""
+    try:
+        import lxml  # noqa: F401
+        return True
+    except ImportError:
+        return False
+
+
+def _lexbor_available() -> bool:
+    """檢查selectolax(lexbor)是否可用"""
+    try:
+        from selectolax.lexbor import LexborHTMLParser  # noqa: F401
+        return True
+    except ImportError:
+        return False
+
+
+def resolve_parser(name: Optional[str] = None) -> str:
+    """將使用者指定的引擎名稱解析為實際可用的引擎"""
+    name = name or DEFAULT_PARSER
+    if name not in PARSER_CHOICES:
+        raise ValueError(f"不支援的解析引擎: {name} (可用: {', '.join(PARSER_CHOICES)})")
+
+    if name == 'auto':
+        if _lexbor_available():
+            return 'lexbor'
+        if _lxml_available():
+            return 'lxml'
+        return 'html.parser'
+
+    if name == 'lexbor' and not _lexbor_available():
+        print("警告：selectolax 未安裝，改用 html.parser")
+        return 'html.parser'
+
+    if name == 'lxml' and not _lxml_available():
+        print("警告：lxml 未安裝，改用 html.parser")
+        return 'html.parser'
+
+    return name
+
+
+def _class_matches(classes, pattern) -> bool:
+    """模擬BeautifulSoup class_=re.compile(...) 的比對方式（classes 為class屬性文字）"""
+    classes = (classes or '').split()
+    if not classes:
+        return False
+    return any(pattern.search(c) for c in classes) or bool(pattern.search(' '.join(classes)))
+
+
+def _lexbor_elements(markup):
+    """以lexbor建立DOM，回傳 tag → 依文件順序的各元素class屬性 的查詢函數"""
+    from selectolax.lexbor import LexborHTMLParser
+
+    tree = LexborHTMLParser(markup)
+    return lambda tag: [node.attributes.get('class') for node in tree.css(tag)]
+
+
+def _lxml_elements(markup):
+    """以lxml建立DOM，回傳 tag → 依文件順序的各元素class屬性 的查詢函數"""
+    import lxml.html
+
+    root = lxml.html.document_fromstring(markup)
+    return lambda tag: [node.get('class') for node in root.iter(tag)]
+
+
+_LOCATORS = {
+    'lexbor': _lexbor_elements,
+    'lxml': _lxml_elements,
+}
+
+
+def _locate_and_slice(markup, engine_markup, engine):
+    """
+    以 engine 建立整頁DOM找出文章內容區塊，再從原始 markup 擷取 parse_html 需要的部分：
+    <head>、第一個ld+json、(必要時的)h1 與文章內容區塊（只擷取一次）。
+    lexbor與lxml的樹都經過正規化（補上<tbody>、搬移錯誤巢狀的節點），只用來定位，
+    交給BeautifulSoup的一律是原始內容，結果與 html.parser 相同。
+    無法在原始內容中對應到區塊時回傳 None，由呼叫端改用完整解析。
+    """
+    elements = _LOCATORS[engine](engine_markup)
+    # 與 parse_html 相同的內容區塊搜尋順序
+    for tag, pattern in (('article', _EDITOR_CONTENT_RE), ('div', _ARTICLE_CONTENT_RE), ('main', None)):
+        for ordinal, classes in enumerate(elements(tag)):
+            if pattern is None or _class_matches(classes, pattern):
+                break
+        else:
+            continue
+        break
+    else:
+        return None
+
+    # 引擎的樹與原始標籤的對應有疑慮（例如class不符）時不使用
+    start = find_start_tag(markup, tag, ordinal, pattern)
+    if start is None:
+        return None
+    return slice_article(markup, container=(tag, start))
+
+
+def make_soup(markup, parser: Optional[str] = None, encoding: Optional[str] = None) -> BeautifulSoup:
+    """
+    以指定引擎定位文章區塊後建立BeautifulSoup；樹一律由 html.parser 建立，各引擎的結果相同
+
+    markup 可以是字串或位元組；位元組時以 encoding 解碼（由解析器處理，不另外複製一份字串）
+    """
+    engine = resolve_parser(parser)
+    options = {}
+    if isinstance(markup, bytes) and encoding:
+        options['from_encoding'] = encoding
+
+    if engine in _LOCATORS:
+        try:
+            engine_markup = markup
+            # lexbor與lxml 以utf-8讀取位元組
+            if options and codecs.lookup(encoding).name not in ('utf-8', 'utf-8-sig'):
+                engine_markup = markup.decode(encoding, 'replace')
+            reduced = _locate_and_slice(markup, engine_markup, engine)
+        except Exception as e:
+            print(f"警告：{engine} 解析失敗，改用 html.parser: {e}")
+            reduced = None
+        if reduced is not None:
+            return BeautifulSoup(reduced, 'html.parser', **options)
+
+    return BeautifulSoup(markup, 'html.parser', **options)
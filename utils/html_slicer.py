@@ -0,0 +1,268 @@
+"""
+文章區塊擷取 - 在建立DOM之前，直接從原始HTML找出文章內容區塊的範圍
+只把 <head> 與文章區塊交給解析器，省去 script、導覽列與推薦文章的解析成本
+可直接掃描字串、位元組或mmap（ASCII相容的編碼）
+"""
+import re
+
+# 與 parse_html 相同的內容區塊搜尋順序
+_EDITOR_CONTENT_RE = re.compile('editor-content')
+_ARTICLE_CONTENT_RE = re.compile('article.*content')
+
+# html.parser 視為原始文字的元素，內容中的 < 不是標籤
+_RAW_TEXT_TAGS = ('script', 'style')
+
+_ATTR_RE = re.compile(r'''([^\s/>"'=]+)(?:\s*=\s*(?:"([^"]*)"|'([^']*)'|([^\s>]+)))?''')
+
+# parse_html 會搜尋的 meta 標籤（屬性名稱, 值）
+_METADATA_KEYS = [
+    ('property', 'og:title'),
+    ('name', 'pubdate'),
+    ('name', 'lastmod'),
+    ('property', 'article:modified_time'),
+]
+
+
+class _Syntax:
+    """掃描用的常數與正規表示式（字串與位元組各一份）"""
+
+    def __init__(self, encode):
+        self.empty = encode('')
+        self.lt = encode('<')
+        self.comment_open = encode('<!--')
+        self.comment_close = encode('-->')
+        self.tag_open = re.compile(encode(r'<(/?)([a-zA-Z][^\s/>]*)'))
+        # 標籤剩餘部分：屬性直到 >（引號中的 > 不算）
+        self.tag_rest = re.compile(encode(r'((?:[^>"\']|"[^"]*"|\'[^\']*\')*)>'))
+        self.raw_text_end = {tag: re.compile(encode(rf'</{tag}\s*>'), re.IGNORECASE)
+                             for tag in _RAW_TEXT_TAGS}
+        self.body_open = encode('<body>')
+        self.body_close = encode('</body></html>')
+
+
+_STR_SYNTAX = _Syntax(lambda text: text)
+_BYTES_SYNTAX = _Syntax(lambda text: text.encode('ascii'))
+
+
+def _syntax_for(html):
+    return _STR_SYNTAX if isinstance(html, str) else _BYTES_SYNTAX
+
+
+def _parse_attrs(attrs_text):
+    """解析標籤屬性（名稱轉為小寫，與html.parser相同）"""
+    attrs = {}
+    for match in _ATTR_RE.finditer(attrs_text):
+        name = match.group(1).lower()
+        value = match.group(2)
+        if value is None:
+            value = match.group(3)
+        if value is None:
+            value = match.group(4) or ''
+        attrs.setdefault(name, value)
+    return attrs
+
+
+def _class_matches(attrs, pattern):
+    """模擬BeautifulSoup class_=re.compile(...) 的比對方式"""
+    classes = attrs.get('class', '').split()
+    if not classes:
+        return False
+    return any(pattern.search(c) for c in classes) or bool(pattern.search(' '.join(classes)))
+
+
+def _iter_tags(html, pos=0):
+    """依序產生 (名稱, 是否為結束標籤, 開始位置, 結束位置, 屬性文字)，略過註解與script內容"""
+    syntax = _syntax_for(html)
+    is_bytes = syntax is _BYTES_SYNTAX
+    while True:
+        lt = html.find(syntax.lt, pos)
+        if lt == -1:
+            return
+        if html[lt:lt + 4] == syntax.comment_open:
+            end = html.find(syntax.comment_close, lt + 4)
+            if end == -1:
+                return
+            pos = end + 3
+            continue
+
+        match = syntax.tag_open.match(html, lt)
+        if not match:
+            pos = lt + 1
+            continue
+        rest = syntax.tag_rest.match(html, match.end())
+        if not rest:
+            return
+
+        name, attrs_text = match.group(2), rest.group(1)
+        if is_bytes:
+            # 標籤名稱與比對用的屬性值都是ASCII
+            name, attrs_text = name.decode('latin-1'), attrs_text.decode('latin-1')
+        name = name.lower()
+        is_close = bool(match.group(1))
+        yield name, is_close, lt, rest.end(), attrs_text
+        pos = rest.end()
+
+        if not is_close and name in _RAW_TEXT_TAGS:
+            raw_end = syntax.raw_text_end[name].search(html, pos)
+            if not raw_end:
+                return
+            pos = raw_end.start()
+
+
+def _find_element_end(tags, name):
+    """從開始標籤之後找出對應的結束標籤（計算同名標籤的巢狀層數）"""
+    depth = 1
+    for tag_name, is_close, _, end, attrs_text in tags:
+        if tag_name != name:
+            continue
+        if is_close:
+            depth -= 1
+            if depth == 0:
+                return end
+        elif not attrs_text.rstrip().endswith('/'):
+            depth += 1
+    return None
+
+
+class _MetadataScan:
+    """記錄 parse_html 會讀取的 meta / ld+json / h1 第一次出現的位置"""
+
+    def __init__(self, html):
+        self.html = html
+        self.first_meta = {}    # meta鍵 -> 位置
+        self.first_h1 = None
+        self.ld_json = None     # 第一個ld+json script的(開始, 結束)
+
+    @property
+    def complete(self):
+        return (len(self.first_meta) == len(_METADATA_KEYS)
+                and self.ld_json is not None)
+
+    def feed(self, name, start, end, attrs_text):
+        if name == 'meta':
+            attrs = _parse_attrs(attrs_text)
+            for key in _METADATA_KEYS:
+                if key not in self.first_meta and attrs.get(key[0]) == key[1]:
+                    self.first_meta[key] = start
+        elif name == 'script' and self.ld_json is None:
+            if _parse_attrs(attrs_text).get('type') == 'application/ld+json':
+                close = _syntax_for(self.html).raw_text_end['script'].search(self.html, end)
+                if close:
+                    self.ld_json = (start, close.end())
+        elif name == 'h1' and self.first_h1 is None:
+            self.first_h1 = start
+
+
+def slice_tags(html, names):
+    """
+    依序串接指定名稱的開始標籤原文（與輸入同為str或bytes；mmap回傳bytes）
+    html.parser 同樣不在註解與script中尋找標籤，用於只需要void標籤屬性的場合
+    """
+    parts = [html[start:end] for name, is_close, start, end, _ in _iter_tags(html)
+             if not is_close and name in names]
+    return _syntax_for(html).empty.join(parts)
+
+
+def find_start_tag(html, name, ordinal, pattern=None):
+    """
+    第 ordinal 個（從0起算）名為 name 的開始標籤位置，pattern 不為None時該標籤的class必須符合
+    找不到或不符合時回傳None
+    """
+    count = 0
+    for tag_name, is_close, start, _, attrs_text in _iter_tags(html):
+        if is_close or tag_name != name:
+            continue
+        if count == ordinal:
+            if pattern is not None and not _class_matches(_parse_attrs(attrs_text), pattern):
+                return None
+            return start
+        count += 1
+    return None
+
+
+def slice_article(html, container=None):
+    """
+    回傳只包含 <head> 與文章內容區塊的精簡HTML（與輸入同為str或bytes）
+    無法安全擷取時（找不到區塊、標籤不平衡、需要的meta或標題不在擷取範圍內）回傳None
+
+    container=(標籤名稱, 開始標籤位置) 時使用呼叫端找到的內容區塊（例如lexbor），不自行搜尋
+    """
+    head_end = None
+    containers = {}     # 'article' / 'div' / 'main' -> 第一個符合的開始位置
+    scan = _MetadataScan(html)
+    stopped_early = False
+
+    for name, is_close, start, end, attrs_text in _iter_tags(html):
+        if is_close:
+            if name == 'head' and head_end is None:
+                head_end = end
+            continue
+
+        scan.feed(name, start, end, attrs_text)
+        if container is not None:
+            if start == container[1]:
+                containers[container[0]] = start
+                stopped_early = True
+                break
+            continue
+        if name == 'article' and 'article' not in containers:
+            if _class_matches(_parse_attrs(attrs_text), _EDITOR_CONTENT_RE):
+                containers['article'] = start
+                stopped_early = True
+                break
+        elif name == 'div' and 'div' not in containers:
+            if _class_matches(_parse_attrs(attrs_text), _ARTICLE_CONTENT_RE):
+                containers['div'] = start
+        elif name == 'main' and 'main' not in containers:
+            containers['main'] = start
+
+    if head_end is None:
+        return None
+
+    for container_tag in ('article', 'div', 'main'):
+        if container_tag in containers:
+            break
+    else:
+        return None
+
+    container_start = containers[container_tag]
+    tags = _iter_tags(html, container_start)
+    next(tags)
+    container_end = _find_element_end(tags, container_tag)
+    if container_end is None:
+        return None
+
+    # 提早結束了掃描時，區塊之後仍可能有parse_html會讀到的元素
+    if stopped_early and not scan.complete:
+        for name, is_close, start, end, attrs_text in _iter_tags(html, container_end):
+            if not is_close:
+                scan.feed(name, start, end, attrs_text)
+
+    def in_slice(position):
+        return position < head_end or container_start <= position < container_end
+
+    # 第一個meta必須在擷取範圍內，否則會讀到不同的值
+    for position in scan.first_meta.values():
+        if not in_slice(position):
+            return None
+
+    # 作者資訊可能不在<head>內
+    extras = []
+    if scan.ld_json is not None and not in_slice(scan.ld_json[0]):
+        start, end = scan.ld_json
+        extras.append(html[start:end])
+
+    # 沒有og:title時，標題由第一個h1提供
+    if ('property', 'og:title') not in scan.first_meta and scan.first_h1 is not None:
+        if not in_slice(scan.first_h1):
+            tags = _iter_tags(html, scan.first_h1)
+            next(tags)
+            h1_end = _find_element_end(tags, 'h1')
+            if h1_end is None:
+                return None
+            extras.append(html[scan.first_h1:h1_end])
+
+    syntax = _syntax_for(html)
+    parts = [html[:head_end], syntax.body_open, *extras,
+             html[container_start:container_end], syntax.body_close]
+    return syntax.empty.join(parts)
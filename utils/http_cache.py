@@ -0,0 +1,144 @@
+"""
+HTTP條件式請求快取 - 以SQLite記錄每個URL的 ETag / Last-Modified 與內容雜湊
+重新轉換時送出 If-None-Match / If-Modified-Since，伺服器回應304時直接使用已下載的檔案，
+每張圖片只需要幾百位元組的請求與回應，不必重新下載整個檔案
+"""
+import time
+import sqlite3
+import threading
+from pathlib import Path
+
+from utils.image_store import file_digest
+
+CACHE_FILENAME = ".http_cache.sqlite3"
+
+# 下載或確認未變更後這段時間內視為最新，不送出條件式請求（中斷的批次重新執行時直接略過）；
+# 超過後即使檔案完整也要向伺服器確認
+FRESH_SECONDS = 10 * 60
+
+_SCHEMA = """
+CREATE TABLE IF NOT EXISTS entries (
+    url TEXT PRIMARY KEY,
+    etag TEXT,
+    last_modified TEXT,
+    sha256 TEXT NOT NULL,
+    size INTEGER NOT NULL,
+    path TEXT NOT NULL,
+    fetched_at REAL NOT NULL
+)
+"""
+
+
+class HttpCache:
+    """URL → (驗證資訊, 內容雜湊, 上次儲存位置) 的持久快取"""
+
+    def __init__(self, db_path):
+        self.db_path = Path(db_path)
+        self.revalidated = 0  # 伺服器回應304、沿用既有檔案的次數
+        self.fresh_seconds = FRESH_SECONDS
+        self.bytes_saved = 0
+        self._lock = threading.Lock()
+        self._conn = None
+
+    def _connect(self):
+        if self._conn is None:
+            self.db_path.parent.mkdir(parents=True, exist_ok=True)
+            # 下載引擎的工作執行緒都會使用，存取時以 _lock 保護
+            self._conn = sqlite3.connect(str(self.db_path), check_same_thread=False)
+            # 每筆記錄立即提交，中斷的批次重新執行時仍能辨識已完成的圖片
+            self._conn.execute("PRAGMA journal_mode=WAL")
+            self._conn.execute("PRAGMA synchronous=NORMAL")
+            self._conn.execute(_SCHEMA)
+        return self._conn
+
+    def lookup(self, url):
+        """URL的快取項目 {etag, last_modified, sha256, size, path, fetched_at}，沒有時回傳None"""
+        with self._lock:
+            row = self._connect().execute(
+                "SELECT etag, last_modified, sha256, size, path, fetched_at FROM entries WHERE url = ?",
+                (url,)).fetchone()
+        if row is None:
+            return None
+        etag, last_modified, sha256, size, path, fetched_at = row
+        return {'etag': etag, 'last_modified': last_modified, 'sha256': sha256,
+                'size': size, 'path': Path(path), 'fetched_at': fetched_at}
+
+    def needs_revalidation(self, url):
+        """URL有驗證資訊且已超過 fresh_seconds，既有檔案要先以條件式請求確認才能沿用"""
+        entry = self.lookup(url)
+        if entry is None or not self.conditional_headers(entry):
+            return False
+        return time.time() - entry['fetched_at'] >= self.fresh_seconds
+
+    def find_cached_file(self, entry, candidates=()):
+        """內容與快取項目一致的檔案（依序檢查candidates與上次儲存位置），沒有時回傳None"""
+        for path in [*candidates, entry['path']]:
+            if path is None:
+                continue
+            path = Path(path)
+            try:
+                if path.stat().st_size != entry['size']:
+                    continue
+            except OSError:
+                continue
+            if file_digest(path) == entry['sha256']:
+                return path
+        return None
+
+    def conditional_headers(self, entry):
+        """依快取項目產生條件式請求的標頭"""
+        headers = {}
+        if entry.get('etag'):
+            headers['If-None-Match'] = entry['etag']
+        if entry.get('last_modified'):
+            headers['If-Modified-Since'] = entry['last_modified']
+        return headers
+
+    def matches(self, url, path):
+        """path 的大小與內容雜湊是否和URL上次下載的內容一致"""
+        entry = self.lookup(url)
+        if entry is None:
+            return False
+        try:
+            if Path(path).stat().st_size != entry['size']:
+                return False
+        except OSError:
+            return False
+        return file_digest(path) == entry['sha256']
+
+    def record(self, url, response_headers, path, sha256, size):
+        """
+        記錄剛下載的內容
+        回應沒有 ETag 也沒有 Last-Modified 時無法送出條件式請求，但雜湊與大小仍用來判斷既有檔案是否完整
+        """
+        etag = response_headers.get('ETag')
+        last_modified = response_headers.get('Last-Modified')
+        with self._lock:
+            conn = self._connect()
+            conn.execute(
+                "INSERT OR REPLACE INTO entries (url, etag, last_modified, sha256, size, path, fetched_at)"
+                " VALUES (?, ?, ?, ?, ?, ?, ?)",
+                (url, etag, last_modified, sha256, size, str(Path(path).resolve()), time.time()))
+            conn.commit()
+
+    def mark_revalidated(self, url, size):
+        """伺服器確認未變更，重新計算這個URL的新鮮期間"""
+        with self._lock:
+            self.revalidated += 1
+            self.bytes_saved += size
+            conn = self._connect()
+            conn.execute("UPDATE entries SET fetched_at = ? WHERE url = ?", (time.time(), url))
+            conn.commit()
+
+
+_caches = {}
+_caches_lock = threading.Lock()
+
+
+def get_http_cache(images_dir):
+    """同一個圖片目錄在整個行程中共用同一個快取實例"""
+    images_dir = Path(images_dir).resolve()
+    with _caches_lock:
+        if images_dir not in _caches:
+            _caches[images_dir] = HttpCache(images_dir / CACHE_FILENAME)
+        return _caches[images_dir]
@@ -0,0 +1,110 @@
+"""
+共用HTTP連線 - 整個行程共用同一個 requests.Session 與連線池
+不同文章、轉換器與進階下載器之間重複使用已建立的連線（不必每篇文章重新TLS交握），
+並統計建立的連線數與請求數，確認連線確實被重複使用
+"""
+import threading
+from concurrent.futures import ThreadPoolExecutor
+
+import requests
+from requests.adapters import HTTPAdapter
+from urllib3.connectionpool import HTTPConnectionPool, HTTPSConnectionPool
+
+# 方格子的圖片主機
+VOCUS_IMAGE_HOSTS = ('images.vocus.cc', 'resize-image.vocus.cc')
+
+# 每個主機保留的連線數（至少要和同一個主機同時下載的數量一樣大）
+DEFAULT_POOL_MAXSIZE = 16
+# 保留連線池的主機數
+DEFAULT_POOL_CONNECTIONS = 16
+# 預先連線的請求逾時（秒）
+PREWARM_TIMEOUT = 10
+
+_lock = threading.Lock()
+_session = None
+_pool_maxsize = 0
+_stats = {'requests': 0, 'connections': 0}
+
+
+def _count(key):
+    with _lock:
+        _stats[key] += 1
+
+
+class _CountingHTTPConnectionPool(HTTPConnectionPool):
+    def _new_conn(self):
+        _count('connections')
+        return super()._new_conn()
+
+
+class _CountingHTTPSConnectionPool(HTTPSConnectionPool):
+    def _new_conn(self):
+        _count('connections')
+        return super()._new_conn()
+
+
+class _PooledAdapter(HTTPAdapter):
+    """統計請求數與新建連線數的HTTPAdapter"""
+
+    def init_poolmanager(self, *args, **kwargs):
+        super().init_poolmanager(*args, **kwargs)
+        self.poolmanager.pool_classes_by_scheme = {
+            'http': _CountingHTTPConnectionPool,
+            'https': _CountingHTTPSConnectionPool,
+        }
+
+    def send(self, request, **kwargs):
+        _count('requests')
+        return super().send(request, **kwargs)
+
+
+def get_session(pool_maxsize=DEFAULT_POOL_MAXSIZE):
+    """
+    取得整個行程共用的Session
+
+    adapter 只在建立Session時掛載一次（之後重新掛載會丟掉已建立的連線），
+    連線池大小取第一次呼叫的 pool_maxsize 與預設值中較大的一方
+    """
+    global _session, _pool_maxsize
+    with _lock:
+        if _session is None:
+            _pool_maxsize = max(pool_maxsize, DEFAULT_POOL_MAXSIZE)
+            adapter = _PooledAdapter(pool_connections=DEFAULT_POOL_CONNECTIONS, pool_maxsize=_pool_maxsize)
+            _session = requests.Session()
+            _session.mount('https://', adapter)
+            _session.mount('http://', adapter)
+        return _session
+
+
+def _head(session, url):
+    with session.head(url, timeout=PREWARM_TIMEOUT, allow_redirects=False):
+        pass  # 任何狀態碼都表示連線已建立，關閉回應後連線回到連線池
+
+
+def prewarm(hosts=VOCUS_IMAGE_HOSTS, connections=2, scheme='https'):
+    """
+    預先建立連線（TCP與TLS交握），之後的請求可以直接使用
+    每個主機同時送出 connections 個HEAD請求，各自佔用一條連線；回傳新建立的連線數
+    """
+    session = get_session()
+    before = connection_stats()['connections']
+    with ThreadPoolExecutor(max_workers=max(1, connections)) as executor:
+        for host in hosts:
+            url = f"{scheme}://{host}/"
+            futures = [executor.submit(_head, session, url) for _ in range(connections)]
+            errors = [future.exception() for future in futures if future.exception() is not None]
+            if errors:
+                print(f"警告：無法預先連線到 {host}: {errors[0]}")
+    return connection_stats()['connections'] - before
+
+
+def connection_stats():
+    """目前累計的 {requests, connections}"""
+    with _lock:
+        return dict(_stats)
+
+
+def reset_connection_stats():
+    with _lock:
+        for key in _stats:
+            _stats[key] = 0
@@ -0,0 +1,192 @@
+"""
+圖片封存 - 線上轉換時記錄每個圖片URL的內容，之後可以完全離線重播
+封存可以是目錄（index.json 與以內容雜湊命名的 blobs/），也可以是單一檔案（.zip，內容相同）；
+離線模式下圖片只從封存取得，封存中沒有的圖片回報為缺少，不會連線到圖片主機
+"""
+import os
+import json
+import time
+import zipfile
+import tempfile
+import threading
+from pathlib import Path
+
+from utils.image_store import file_digest, link_or_copy
+
+INDEX_FILENAME = "index.json"
+BLOBS_DIRNAME = "blobs"
+# 單一檔案封存的副檔名
+BUNDLE_SUFFIX = ".zip"
+
+
+def _write_json(path, data):
+    """先寫入暫存檔再改名"""
+    path.parent.mkdir(parents=True, exist_ok=True)
+    fd, tmp_path = tempfile.mkstemp(dir=path.parent, suffix='.tmp')
+    try:
+        with os.fdopen(fd, 'w', encoding='utf-8') as f:
+            json.dump(data, f, ensure_ascii=False)
+        os.replace(tmp_path, path)
+    except Exception:
+        if os.path.exists(tmp_path):
+            os.unlink(tmp_path)
+        raise
+
+
+class ImageArchive:
+    """
+    URL → 圖片內容 的封存
+
+    extract() 把任一已記錄URL的內容寫到指定位置；record() 記錄下載完成的圖片，flush() 寫入磁碟。
+    單一檔案封存每次 flush() 附加新的內容與一段索引（index-*.json），讀取時合併所有索引
+    """
+
+    def __init__(self, path):
+        self.path = Path(path)
+        self.is_bundle = self.path.suffix.lower() == BUNDLE_SUFFIX
+        self.extracted = 0
+        self.recorded = 0
+        self._lock = threading.Lock()
+        self._index = None
+        self._digests = set()
+        self._zip = None
+        self._pending = {}  # 單一檔案封存尚未寫入的內容：雜湊 → 檔案路徑
+        self._new_entries = {}
+        self._dirty = False
+
+    def _load_index(self):
+        if self._index is not None:
+            return
+        self._index = {}
+        if self.is_bundle:
+            if not self.path.exists():
+                return
+            bundle = self._reader()
+            # 依寫入順序合併，較新的記錄優先
+            for name in sorted(n for n in bundle.namelist() if n.startswith('index') and n.endswith('.json')):
+                self._index.update(json.loads(bundle.read(name).decode('utf-8')))
+        else:
+            try:
+                with open(self.path / INDEX_FILENAME, 'r', encoding='utf-8') as f:
+                    self._index = json.load(f)
+            except (OSError, ValueError):
+                pass
+        self._digests = {entry['sha256'] for entry in self._index.values()}
+
+    def _reader(self):
+        if self._zip is None:
+            self._zip = zipfile.ZipFile(self.path, 'r')
+        return self._zip
+
+    def _close_reader(self):
+        if self._zip is not None:
+            self._zip.close()
+            self._zip = None
+
+    def __len__(self):
+        with self._lock:
+            self._load_index()
+            return len(self._index)
+
+    def lookup(self, url):
+        """已記錄URL的 {'sha256', 'size'}，沒有時回傳None"""
+        if not url:
+            return None
+        with self._lock:
+            self._load_index()
+            return self._index.get(url)
+
+    def extract(self, urls, save_path):
+        """若任一URL已記錄，將內容寫到 save_path 並回傳該URL，否則回傳None"""
+        save_path = Path(save_path)
+        for url in urls:
+            entry = self.lookup(url)
+            if entry is None:
+                continue
+            digest = entry['sha256']
+            if self.is_bundle:
+                if not self._extract_member(digest, save_path):
+                    continue
+            else:
+                blob = self.path / BLOBS_DIRNAME / digest[:2] / digest
+                if not blob.exists():
+                    continue
+                link_or_copy(blob, save_path)
+            with self._lock:
+                self.extracted += 1
+            return url
+        return None
+
+    def _extract_member(self, digest, save_path):
+        """從單一檔案封存取出內容（先寫入暫存檔再改名）"""
+        save_path.parent.mkdir(parents=True, exist_ok=True)
+        with self._lock:
+            bundle = self._reader()
+            try:
+                data = bundle.read(f"{BLOBS_DIRNAME}/{digest}")
+            except KeyError:
+                return False
+        fd, tmp_path = tempfile.mkstemp(dir=save_path.parent, suffix='.tmp')
+        try:
+            with os.fdopen(fd, 'wb') as f:
+                f.write(data)
+            os.replace(tmp_path, save_path)
+        except Exception:
+            if os.path.exists(tmp_path):
+                os.unlink(tmp_path)
+            raise
+        return True
+
+    def record(self, urls, local_path):
+        """記錄剛下載完成的圖片（所有URL指向同一份內容）"""
+        digest = file_digest(local_path)
+        entry = {'sha256': digest, 'size': Path(local_path).stat().st_size}
+        with self._lock:
+            self._load_index()
+            if digest not in self._digests:
+                if self.is_bundle:
+                    self._pending[digest] = Path(local_path)
+                else:
+                    link_or_copy(local_path, self.path / BLOBS_DIRNAME / digest[:2] / digest)
+                self._digests.add(digest)
+            for url in urls:
+                if url and self._index.get(url) != entry:
+                    self._index[url] = entry
+                    self._new_entries[url] = entry
+                    self._dirty = True
+                    self.recorded += 1
+
+    def flush(self):
+        """將新記錄寫入封存"""
+        with self._lock:
+            if not self._dirty:
+                return
+            if self.is_bundle:
+                self._close_reader()
+                self.path.parent.mkdir(parents=True, exist_ok=True)
+                # 圖片本身已壓縮，不再壓縮
+                with zipfile.ZipFile(self.path, 'a', compression=zipfile.ZIP_STORED) as bundle:
+                    names = set(bundle.namelist())
+                    for digest, source in self._pending.items():
+                        if f"{BLOBS_DIRNAME}/{digest}" not in names:
+                            bundle.write(source, f"{BLOBS_DIRNAME}/{digest}")
+                    bundle.writestr(f"index-{time.time_ns()}.json",
+                                    json.dumps(self._new_entries, ensure_ascii=False))
+                self._pending = {}
+            else:
+                _write_json(self.path / INDEX_FILENAME, self._index)
+            self._new_entries = {}
+            self._dirty = False
+
+
+_archives = {}
+_archives_lock = threading.Lock()
+
+
+def get_image_archive(path):
+    """同一個封存在整個行程中共用同一個實例"""
+    path = Path(path).resolve()
+    with _archives_lock:
+        if path not in _archives:
+            _archives[path] = ImageArchive(path)
+        return _archives[path]
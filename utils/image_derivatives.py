@@ -0,0 +1,183 @@
+"""
+PDF用圖片衍生檔 - 在行程池中把下載的圖片轉成適合嵌入PDF的版本
+縮小到頁面解析度、GIF只取第一格、WebP與顏色豐富的PNG轉為JPEG，
+結果以原圖內容雜湊快取；Markdown仍然引用原圖
+"""
+import os
+import tempfile
+from pathlib import Path
+from concurrent.futures import ProcessPoolExecutor
+from concurrent.futures.process import BrokenProcessPool
+
+try:
+    from PIL import Image
+    PIL_AVAILABLE = True
+except ImportError:
+    PIL_AVAILABLE = False
+
+from utils.image_store import file_digest
+
+# 轉換邏輯改變時需要遞增（舊的衍生檔不再使用）
+DERIVATIVE_VERSION = 1
+
+DERIVED_DIRNAME = ".derived"
+
+# A4寬度扣除左右各2cm邊界後的內容寬度（英吋）
+PAGE_CONTENT_WIDTH_INCHES = (21.0 - 4.0) / 2.54
+DEFAULT_PDF_IMAGE_DPI = 200
+DEFAULT_JPEG_QUALITY = 85
+
+# 顏色數在這個範圍內的PNG/GIF（截圖、圖表）保留為PNG，轉成JPEG文字邊緣會模糊
+MAX_PALETTE_COLORS = 256
+
+# 原圖不需要轉換時留下的標記副檔名
+_ORIGINAL_MARKER = '.orig'
+
+
+def max_width_for_dpi(dpi):
+    """頁面內容寬度在指定解析度下的像素數"""
+    return int(PAGE_CONTENT_WIDTH_INCHES * dpi)
+
+
+def _cache_stem(digest, max_width, quality):
+    return f"{digest}-w{max_width}-q{quality}-v{DERIVATIVE_VERSION}"
+
+
+def _cached_result(cache_dir, source, digest, max_width, quality):
+    """已快取的結果（衍生檔路徑或原圖），沒有時回傳None"""
+    folder = Path(cache_dir) / digest[:2]
+    stem = _cache_stem(digest, max_width, quality)
+    for ext in ('.jpg', '.png'):
+        path = folder / f"{stem}{ext}"
+        if path.exists():
+            return path
+    if (folder / f"{stem}{_ORIGINAL_MARKER}").exists():
+        return Path(source)
+    return None
+
+
+def _mark_original(cache_dir, digest, max_width, quality):
+    """記錄這張圖片PDF沿用原圖（不需要轉換或無法轉換，例如SVG）"""
+    folder = Path(cache_dir) / digest[:2]
+    folder.mkdir(parents=True, exist_ok=True)
+    (folder / f"{_cache_stem(digest, max_width, quality)}{_ORIGINAL_MARKER}").touch()
+
+
+def _has_transparency(img):
+    if img.mode in ('RGBA', 'LA'):
+        return img.getchannel('A').getextrema()[0] < 255
+    return img.mode == 'P' and 'transparency' in img.info
+
+
+def _save_atomic(img, path, **params):
+    path.parent.mkdir(parents=True, exist_ok=True)
+    fd, tmp_path = tempfile.mkstemp(dir=path.parent, suffix='.tmp')
+    os.close(fd)
+    try:
+        img.save(tmp_path, **params)
+        os.replace(tmp_path, path)
+    except Exception:
+        if os.path.exists(tmp_path):
+            os.unlink(tmp_path)
+        raise
+
+
+def make_derivative(source, digest, cache_dir, max_width, quality=DEFAULT_JPEG_QUALITY):
+    """
+    產生一張圖片的PDF用衍生檔（在行程池中執行），回傳要嵌入PDF的檔案路徑字串
+
+    寬度不超過 max_width 的JPEG以及不需要轉換的圖片回傳原圖路徑
+    """
+    folder = Path(cache_dir) / digest[:2]
+    stem = _cache_stem(digest, max_width, quality)
+
+    with Image.open(source) as img:
+        source_format = img.format
+        img.seek(0)  # 動畫只取第一格
+        img.load()
+        oversized = img.width > max_width
+
+        keep_original = False
+        if not oversized:
+            if source_format == 'JPEG':
+                keep_original = True
+            elif source_format == 'PNG':
+                # 尺寸合適的PNG只有在顏色豐富（照片）時才值得轉為JPEG
+                keep_original = (img.mode == 'P' or _has_transparency(img)
+                                 or img.getcolors(MAX_PALETTE_COLORS) is not None)
+        if keep_original:
+            _mark_original(cache_dir, digest, max_width, quality)
+            return str(source)
+
+        frame = img.copy()
+
+    if frame.mode not in ('RGB', 'RGBA'):
+        frame = frame.convert('RGBA' if _has_transparency(frame) else 'RGB')
+    if oversized:
+        height = max(1, round(frame.height * max_width / frame.width))
+        frame = frame.resize((max_width, height), Image.LANCZOS)
+
+    if _has_transparency(frame):
+        frame = frame.convert('RGBA')
+        target = folder / f"{stem}.png"
+        _save_atomic(frame, target, format='PNG', optimize=True)
+    elif frame.convert('RGB').getcolors(MAX_PALETTE_COLORS) is not None:
+        # 顏色少的截圖與圖表保留為PNG（調色盤模式）
+        frame = frame.convert('RGB').quantize(MAX_PALETTE_COLORS)
+        target = folder / f"{stem}.png"
+        _save_atomic(frame, target, format='PNG', optimize=True)
+    else:
+        frame = frame.convert('RGB')
+        target = folder / f"{stem}.jpg"
+        _save_atomic(frame, target, format='JPEG', quality=quality, optimize=True)
+    return str(target)
+
+
+def build_derivatives(sources, images_dir, dpi=DEFAULT_PDF_IMAGE_DPI, quality=DEFAULT_JPEG_QUALITY,
+                      workers=None, log=print):
+    """
+    為一組圖片產生PDF用衍生檔，回傳 {原圖路徑: 要嵌入PDF的檔案路徑}
+
+    已快取的結果直接使用，其餘在行程池中轉換；轉換失敗的圖片（SVG等Pillow無法讀取的格式）沿用原圖，
+    結果同樣以內容雜湊快取，之後不再送進行程池
+    """
+    if not PIL_AVAILABLE:
+        log("未安裝Pillow，PDF直接使用原圖")
+        return {}
+
+    cache_dir = Path(images_dir) / DERIVED_DIRNAME
+    max_width = max_width_for_dpi(dpi)
+    results = {}
+    todo = []
+    for source in sources:
+        source = Path(source)
+        if not source.exists():
+            continue
+        digest = file_digest(source)
+        cached = _cached_result(cache_dir, source, digest, max_width, quality)
+        if cached is not None:
+            results[source] = cached
+        else:
+            todo.append((source, digest))
+
+    if todo:
+        workers = workers or min(len(todo), os.cpu_count() or 1)
+        with ProcessPoolExecutor(max_workers=workers) as pool:
+            futures = {
+                pool.submit(make_derivative, str(source), digest, str(cache_dir), max_width, quality): source
+                for source, digest in todo
+            }
+            digests = dict(todo)
+            for future, source in futures.items():
+                try:
+                    results[source] = Path(future.result())
+                except Exception as e:
+                    log(f"  → 無法轉換圖片 {source.name}，PDF使用原圖: {e}")
+                    # 行程池本身的問題與圖片內容無關，不快取
+                    if not isinstance(e, BrokenProcessPool):
+                        _mark_original(cache_dir, digests[source], max_width, quality)
+                    results[source] = source
+
+    converted = sum(1 for source, target in results.items() if target != source)
+    log(f"PDF用圖片: {converted} 個使用衍生檔（{len(todo)} 個新轉換，{len(results) - len(todo)} 個使用快取）")
+    return results
@@ -0,0 +1,555 @@
+"""
+圖片下載引擎 - 轉換器與進階下載器共用
+下載方式是可替換的 Strategy（名稱、取得URL的方式與請求頭），兩者共用連線池、節流、條件式請求快取、
+圖片儲存區、策略排序與失效URL快取；回應在寫入前驗證，之後逐段串流寫入可續傳的 .part 檔
+"""
+import os
+import socket
+from pathlib import Path
+from functools import partial
+from concurrent.futures import Future, as_completed
+
+import requests
+
+from utils.fetch_engine import FetchEngine, hedge_cancelled, claim_result, response_started, on_hedge_cancel
+from utils.http_session import get_session, connection_stats
+from utils.image_store import get_image_store, link_or_copy
+from utils.http_cache import get_http_cache
+from utils.partial_download import PartialDownload
+from utils.image_variants import (variant_url, variant_path, variant_candidates, content_type_format,
+                                  COMPACT_ACCEPT)
+from utils.image_validation import (check_image_response, peek, sniff_image_format, sniff_file_format,
+                                    MIN_IMAGE_BYTES)
+from utils.rate_limiter import get_rate_limiter, HostUnavailable
+from utils.download_strategy import get_strategy_stats, get_negative_cache, GONE_STATUS_CODES
+from utils.image_archive import get_image_archive
+
+# 沒有共用的排程引擎時，同時下載的圖片數
+DEFAULT_WORKERS = 4
+# 串流寫入時每次讀取的位元組數
+CHUNK_SIZE = 8192
+
+
+def _abort_response(response):
+    """
+    由其他執行緒中斷進行中的回應：直接關閉底層 socket，讀取中途卡住的 recv 立即返回錯誤，
+    連線不會回到連線池（回應已讀完並歸還連線時沒有作用）
+    """
+    connection = getattr(response.raw, 'connection', None)
+    sock = getattr(connection, 'sock', None)
+    if sock is None:
+        return
+    try:
+        # 略過 SSL 層的 shutdown，不與讀取中的執行緒競爭 SSL 物件
+        socket.socket.shutdown(sock, socket.SHUT_RDWR)
+    except OSError:
+        pass
+
+
+# 模擬Chrome請求圖片
+CHROME_IMAGE_HEADERS = {
+    'User-Agent': 'Mozilla/5.0 (Macintosh; Intel Mac OS X 10_15_7) AppleWebKit/537.36 (KHTML, like Gecko) Chrome/120.0.0.0 Safari/537.36',
+    'Accept': 'image/avif,image/webp,image/apng,image/svg+xml,image/*,*/*;q=0.8',
+    'Accept-Language': 'zh-TW,zh;q=0.9,en;q=0.8',
+    'Accept-Encoding': 'gzip, deflate, br',
+    'Referer': 'https://vocus.cc/',
+    'Sec-Ch-Ua': '"Not_A Brand";v="8", "Chromium";v="120", "Google Chrome";v="120"',
+    'Sec-Ch-Ua-Mobile': '?0',
+    'Sec-Ch-Ua-Platform': '"macOS"',
+    'Sec-Fetch-Dest': 'image',
+    'Sec-Fetch-Mode': 'no-cors',
+    'Sec-Fetch-Site': 'same-site',
+    'Connection': 'keep-alive'
+}
+
+# 模擬從網頁直接訪問
+WEB_PAGE_HEADERS = {
+    'User-Agent': 'Mozilla/5.0 (Macintosh; Intel Mac OS X 10_15_7) AppleWebKit/537.36 (KHTML, like Gecko) Chrome/120.0.0.0 Safari/537.36',
+    'Accept': 'text/html,application/xhtml+xml,application/xml;q=0.9,image/avif,image/webp,image/apng,*/*;q=0.8',
+    'Accept-Language': 'zh-TW,zh;q=0.9,en;q=0.8',
+    'Accept-Encoding': 'gzip, deflate, br',
+    'Cache-Control': 'no-cache',
+    'Pragma': 'no-cache',
+    'Upgrade-Insecure-Requests': '1'
+}
+
+SAFARI_IMAGE_HEADERS = {
+    'User-Agent': 'Mozilla/5.0 (Macintosh; Intel Mac OS X 10_15_7) AppleWebKit/605.1.15 (KHTML, like Gecko) Version/17.0 Safari/605.1.15',
+    'Accept': 'image/png,image/svg+xml,image/*;q=0.8,video/*;q=0.8,*/*;q=0.5',
+    'Accept-Language': 'zh-tw',
+    'Accept-Encoding': 'gzip, deflate, br',
+    'Referer': 'https://vocus.cc/',
+    'Connection': 'keep-alive'
+}
+
+FIREFOX_IMAGE_HEADERS = {
+    'User-Agent': 'Mozilla/5.0 (Macintosh; Intel Mac OS X 10.15; rv:120.0) Gecko/20100101 Firefox/120.0',
+    'Accept': 'image/avif,image/webp,*/*',
+    'Accept-Language': 'zh-TW,zh;q=0.8,en-US;q=0.5,en;q=0.3',
+    'Accept-Encoding': 'gzip, deflate, br',
+    'Referer': 'https://vocus.cc/',
+    'DNT': '1',
+    'Connection': 'keep-alive',
+    'Sec-Fetch-Dest': 'image',
+    'Sec-Fetch-Mode': 'no-cors',
+    'Sec-Fetch-Site': 'same-site'
+}
+
+CURL_HEADERS = {
+    'User-Agent': 'curl/7.68.0',
+    'Accept': '*/*',
+    'Connection': 'keep-alive'
+}
+
+
+class Strategy:
+    """
+    一種下載方式
+
+    url_for(img_info) 回傳這個方式要下載的URL（不適用時回傳None）；
+    headers 為請求頭，accept 取代請求頭中的 Accept
+    """
+
+    def __init__(self, name, url_for, headers=None, accept=None):
+        self.name = name
+        self.url_for = url_for
+        self.headers = headers or CHROME_IMAGE_HEADERS
+        self.accept = accept
+
+
+def original_url(img_info):
+    """images.vocus.cc 上的原始URL"""
+    url = img_info.get('url')
+    return url if url and 'images.vocus.cc' in url else None
+
+
+def page_url(img_info):
+    """文章中的圖片URL"""
+    return img_info.get('url') or None
+
+
+def resize_url(img_info):
+    """文章中 resize-image.vocus.cc 的URL"""
+    return img_info.get('resize_url') or None
+
+
+# 轉換器：原始URL、Resize URL與模擬網頁訪問
+CONVERTER_STRATEGIES = (
+    Strategy("原始URL", original_url),
+    Strategy("Resize URL", resize_url),
+    Strategy("網頁模式", page_url, WEB_PAGE_HEADERS),
+)
+
+# 進階下載器：以不同瀏覽器與curl的請求頭下載同一個URL
+ADVANCED_STRATEGIES = (
+    Strategy("Chrome", page_url, CHROME_IMAGE_HEADERS),
+    Strategy("Safari", page_url, SAFARI_IMAGE_HEADERS),
+    Strategy("Firefox", page_url, FIREFOX_IMAGE_HEADERS),
+    Strategy("curl", page_url, CURL_HEADERS),
+)
+
+
+class ImageDownloader:
+    """
+    以一組下載策略下載圖片
+
+    img_info 需要 'url' 與 'local_path'（Path），可以有 'resize_url'；
+    指定 max_image_width 時縮圖依實際格式命名，完成後 'local_path' 改為實際儲存的路徑；
+    download_all() 排入排程引擎並行下載，回傳 (成功數, 失敗數)；
+    begin() 建立可以邊發現圖片邊開始下載的 DownloadBatch；
+    指定 offline_archive 時不連線，只從封存取得圖片
+    """
+
+    def __init__(self, images_dir="images", strategies=CONVERTER_STRATEGIES, use_image_store=True,
+                 use_http_cache=True, max_image_width=None, offline_archive=None, record_archive=None):
+        self.images_dir = Path(images_dir)
+        self.strategies = list(strategies)
+        self.max_image_width = max_image_width  # 先下載這個寬度的縮圖（None時下載原圖）
+        # 離線模式：圖片只從這個封存取得，不連線到圖片主機
+        self.offline_archive = get_image_archive(offline_archive) if offline_archive else None
+        # 把下載完成的圖片記錄到這個封存，供之後離線重播
+        self.record_archive = get_image_archive(record_archive) if record_archive else None
+        # 以內容雜湊保存圖片，跨文章重複的圖片只下載與儲存一次
+        self.image_store = get_image_store(self.images_dir) if use_image_store else None
+        # 記錄圖片的ETag/Last-Modified，重新下載時送出條件式請求
+        self.http_cache = get_http_cache(self.images_dir) if use_http_cache else None
+        # 各主機上下載策略的表現（先嘗試最好的策略）與回應404/410的URL
+        self.strategy_stats = get_strategy_stats(self.images_dir)
+        self.negative_cache = get_negative_cache(self.images_dir)
+
+    def begin(self, engine=None, workers=DEFAULT_WORKERS, hedge=True):
+        """
+        開始一批下載，之後以 add() 逐張排入（排入時立即開始下載），wait() 等待全部完成
+
+        有共用的排程引擎時排入整批共用的佇列，否則以 workers 為上限建立自己的引擎
+        """
+        return DownloadBatch(self, engine, workers, hedge)
+
+    def download_all(self, images, engine=None, workers=DEFAULT_WORKERS, hedge=True, progress=None):
+        """
+        下載所有圖片，回傳 (成功數, 失敗數)
+        progress(成功數, 總數) 在開始時與每張圖片完成後呼叫
+        """
+        batch = self.begin(engine, max(1, min(workers, len(images) or 1)), hedge)
+        for img_info in images:
+            batch.add(img_info)
+        return batch.wait(progress)
+
+    def _variant_url(self, img_info):
+        """這張圖片要下載的縮圖URL（沒有指定寬度、無法產生或已知不存在時回傳None）"""
+        resized_url = variant_url(img_info, self.max_image_width)
+        if resized_url and not self.negative_cache.is_gone(resized_url):
+            return resized_url
+        return None
+
+    def _accepted_urls(self, img_info):
+        """
+        內容可以直接作為這張圖片的URL：有縮圖時只接受這個寬度的縮圖
+        （既有的原圖或其他寬度的縮圖不算數，--max-image-width 在重新執行時同樣有效），否則接受原圖
+        """
+        resized_url = self._variant_url(img_info)
+        if resized_url:
+            return [resized_url]
+        return [url for url in (img_info['url'], img_info.get('resize_url')) if url]
+
+    def _find_valid_file(self, img_info, urls):
+        """已是某個URL記錄過的完整內容（比對大小與雜湊）的本地檔案，沒有時回傳None"""
+        local_path = img_info['local_path']
+        # 縮圖以實際格式的副檔名儲存
+        candidates = variant_candidates(local_path) if self._variant_url(img_info) else [local_path]
+        for path in candidates:
+            if not path.exists():
+                continue
+            for url in urls:
+                if self.http_cache is not None and self.http_cache.matches(url, path):
+                    return path
+                blob = self.image_store.lookup(url) if self.image_store is not None else None
+                if blob is not None and os.path.samefile(blob, path):
+                    return path
+        return None
+
+    def _name_by_format(self, img_info):
+        """從儲存區或封存取得的縮圖改用實際格式的副檔名（更新 img_info['local_path']）"""
+        local_path = img_info['local_path']
+        target = variant_path(local_path, sniff_file_format(local_path))
+        if target != local_path:
+            os.replace(local_path, target)
+            img_info['local_path'] = target
+
+    def attempts(self, session, img_info, log=print):
+        """
+        一張圖片依序嘗試的下載方式 [(url, 下載函數), ...]，可直接交給 FetchEngine.submit()
+        已知不存在的URL不嘗試，同一個URL的策略之間依各主機上的成功率與耗時排序
+        """
+        attempts = []
+        for strategy in self.strategies:
+            url = strategy.url_for(img_info)
+            if url:
+                attempts.append((strategy.name, url, partial(
+                    self.fetch, session, url, img_info['local_path'], strategy=strategy.name,
+                    headers=strategy.headers, accept=strategy.accept, log=log)))
+
+        gone = {url for _, url, _ in attempts if self.negative_cache.is_gone(url)}
+        for url in sorted(gone):
+            log(f"  → 已知不存在（404/410），略過: {url}")
+        attempts = [attempt for attempt in attempts if attempt[1] not in gone]
+
+        attempts = self.strategy_stats.order(attempts)
+
+        # 尺寸策略：縮圖固定最先嘗試，失敗時依序退回上面的策略
+        resized_url = self._variant_url(img_info)
+        if resized_url:
+            attempts.insert(0, ("縮圖", resized_url, partial(
+                self.fetch, session, resized_url, img_info['local_path'],
+                strategy=f"縮圖 {self.max_image_width}px", accept=COMPACT_ACCEPT, negotiated=True, log=log)))
+
+        return [(url, self._remember_url(img_info, url, self.strategy_stats.track(name, url, fetch)))
+                for name, url, fetch in attempts]
+
+    def _remember_url(self, img_info, url, fetch):
+        """成功時記下實際下載的URL（圖片儲存區只記錄這個URL）與實際儲存的路徑"""
+        def run():
+            result = fetch()
+            if result:
+                img_info['downloaded_url'] = url
+                img_info['local_path'] = result
+            return result
+        return run
+
+    def fetch(self, session, url, save_path, strategy="", headers=None, accept=None, negotiated=False,
+              log=print):
+        """
+        以一種方式下載一張圖片（accept 取代請求頭中的 Accept）
+        成功時回傳實際儲存的路徑，失敗時回傳False；
+        沒有實際嘗試（主機暫停中、URL已知不存在、其他方式已先完成）時回傳None
+        negotiated: 格式由伺服器協商決定，依檔案簽章或 Content-Type 改用對應的副檔名儲存
+        """
+        headers = headers or CHROME_IMAGE_HEADERS
+        if accept:
+            headers = {**headers, 'Accept': accept}
+
+        # 之前下載過且檔案仍在時送出條件式請求
+        cache = self.http_cache
+        cached_file = None
+        if cache is not None:
+            entry = cache.lookup(url)
+            if entry is not None:
+                store_blob = self.image_store.blob(entry['sha256']) if self.image_store else None
+                cached_file = cache.find_cached_file(entry, [save_path, store_blob])
+                conditional = cache.conditional_headers(entry)
+                if cached_file is not None and conditional:
+                    headers = {**headers, **conditional}
+                else:
+                    cached_file = None
+
+        # 上次中斷時留下的 .part 檔以Range請求接續
+        part = PartialDownload(save_path, url)
+        if part.offset and cached_file is None:
+            headers = {**headers, **part.request_headers()}
+
+        # 同一張圖片先前的策略已確認URL不存在（回傳None，不列入策略統計）
+        if self.negative_cache.is_gone(url):
+            return None
+
+        limiter = get_rate_limiter()
+        try:
+            log(f"  → 嘗試 {strategy}: {url}")
+            response = limiter.get(session, url, headers=headers, stream=True, log=log)
+            response_started()  # 已收到標頭，之後傳輸較慢也不對沖
+            # 其他方式勝出時立即關閉這條連線，不等讀取中的內容
+            on_hedge_cancel(partial(_abort_response, response))
+            if response.status_code == 416:
+                # 暫存檔與伺服器上的內容對不上，下次從頭下載
+                part.discard()
+            if response.status_code == 304 and cached_file is not None:
+                response.close()
+                if not claim_result():
+                    return None
+                if negotiated:
+                    save_path = variant_path(save_path, sniff_file_format(cached_file))
+                if Path(cached_file).resolve() != Path(save_path).resolve():
+                    link_or_copy(cached_file, save_path)
+                cache.mark_revalidated(url, entry['size'])
+                log(f"    → 未變更 (304)，沿用已下載的檔案: {save_path}")
+                return save_path
+            response.raise_for_status()
+
+            # 檢查內容類型
+            content_type = response.headers.get('content-type', '')
+            if 'image' not in content_type and 'octet-stream' not in content_type:
+                log(f"    → 回應不是圖片: {content_type}")
+                return False
+
+            # 寫入前先檢查長度與檔案簽章，不是圖片時立即中斷
+            resuming = part.is_continuation(response)
+            error, chunks = check_image_response(
+                response, response.iter_content(chunk_size=CHUNK_SIZE), resuming=resuming)
+            if error:
+                response.close()
+                log(f"    → {error}")
+                return False
+            target = save_path
+            if negotiated:
+                head, chunks = peek(chunks)
+                image_format = (None if resuming else sniff_image_format(head)) or content_type_format(content_type)
+                target = variant_path(save_path, image_format)
+
+            # 儲存圖片到 .part 檔（同時計算內容雜湊供條件式請求快取使用）
+            resume_from = part.offset
+            with part.open(response) as f:
+                if part.offset:
+                    log(f"    → 從 {resume_from:,} bytes 接續下載")
+                host_limiter = limiter.for_url(url)
+                for chunk in chunks:
+                    if hedge_cancelled():
+                        # 同一張圖片的其他下載方式已經成功
+                        response.close()
+                        log(f"    → 其他方式已先完成，中斷 {strategy}")
+                        return None
+                    if chunk:
+                        f.write(chunk)
+                        part.digest.update(chunk)
+                        host_limiter.consume_bytes(len(chunk))
+
+            # 檢查檔案大小
+            file_size = part.size()
+            if file_size < MIN_IMAGE_BYTES:  # 沒有Content-Length時才會在這裡發現
+                part.discard()  # 刪除無效檔案
+                log(f"    → 檔案太小，可能是錯誤: {file_size} bytes")
+                return False
+
+            # 完整下載後才改名到目標位置（對沖請求中只有先完成的一方寫入）
+            if not claim_result():
+                part.discard()
+                return None
+            part.commit(target)
+            if cache is not None:
+                cache.record(url, response.headers, target, part.digest.hexdigest(), file_size)
+            log(f"    → 成功！儲存至: {target} ({file_size:,} bytes)")
+            return target
+
+        except HostUnavailable as e:
+            # 主機暫停中不是策略本身的問題（回傳None，不列入策略統計）
+            log(f"    → 略過: {e}")
+            return None
+        except requests.exceptions.HTTPError as e:
+            log(f"    → HTTP錯誤: {e}")
+            if e.response is not None and e.response.status_code in GONE_STATUS_CODES:
+                self.negative_cache.add(url, e.response.status_code)
+        except Exception as e:
+            if hedge_cancelled():
+                # 連線被勝出的一方關閉，不是這個方式失敗（回傳None，不列入策略統計）
+                log(f"    → 其他方式已先完成，中斷 {strategy}")
+                return None
+            if isinstance(e, requests.exceptions.Timeout):
+                log("    → 請求超時")
+            else:
+                log(f"    → 錯誤: {str(e)}")
+
+        return False
+
+
+class DownloadBatch:
+    """
+    一批圖片下載（由 ImageDownloader.begin() 建立）
+
+    add() 在呼叫端執行緒決定略過、從儲存區連結或排入排程引擎（需要重新確認的圖片一律排入），下載在背景進行；
+    wait() 依完成順序統計結果、輸出每張圖片的訊息並寫入各項記錄
+    """
+
+    def __init__(self, downloader, engine, workers, hedge):
+        self.downloader = downloader
+        self.private_engine = engine is None
+        if self.private_engine:
+            engine = FetchEngine(max_in_flight=max(1, workers), per_host=max(1, workers), hedge=hedge)
+        self.engine = engine
+        # 共用的連線池（每個主機的連線數至少要和同一個主機同時下載的數量一樣大）
+        self.session = get_session(pool_maxsize=engine.per_host)
+        self.stats_before = connection_stats()
+        cache = downloader.http_cache
+        self.revalidated_before = cache.revalidated if cache is not None else 0
+        self.pending = {}
+        self.reused_count = 0
+        self.skipped_count = 0
+        self.archived_count = 0
+        self.missing = []  # 離線模式下封存中沒有的圖片URL
+
+    def __len__(self):
+        return len(self.pending)
+
+    def add(self, img_info):
+        """排入一張圖片，回傳它的 Future"""
+        downloader = self.downloader
+        store = downloader.image_store
+        log_lines = []
+        image_urls = downloader._accepted_urls(img_info)
+        negotiated = downloader._variant_url(img_info) is not None
+        # 記錄已過新鮮期間的URL先以條件式請求確認（304時仍沿用既有檔案或儲存區的內容）
+        revalidate = (downloader.http_cache is not None and downloader.offline_archive is None
+                      and any(downloader.http_cache.needs_revalidation(url) for url in image_urls))
+        valid_file = None if revalidate else downloader._find_valid_file(img_info, image_urls)
+        if revalidate:
+            future = self.engine.submit(downloader.attempts(self.session, img_info, log_lines.append))
+        elif valid_file is not None:
+            # 上次已完整下載（中斷後重新執行的批次從這裡接續）
+            img_info['local_path'] = valid_file
+            log_lines.append(f"  → 圖片已存在且完整，略過: {valid_file}")
+            future = Future()
+            future.set_result(True)
+            self.skipped_count += 1
+        elif store is not None and store.materialize(image_urls, img_info['local_path']):
+            # 已知的URL直接從圖片儲存區連結，不需要下載
+            if negotiated:
+                downloader._name_by_format(img_info)
+            log_lines.append(f"  → 使用已儲存的圖片: {img_info['local_path']}")
+            future = Future()
+            future.set_result(True)
+            self.reused_count += 1
+        elif downloader.offline_archive is not None:
+            # 離線模式：只從封存取得，沒有時回報為缺少（不連線）
+            future = Future()
+            archived_url = downloader.offline_archive.extract(image_urls, img_info['local_path'])
+            if archived_url:
+                if negotiated:
+                    downloader._name_by_format(img_info)
+                log_lines.append(f"  → 從封存取得: {img_info['local_path']}")
+                img_info['downloaded_url'] = archived_url
+                self.archived_count += 1
+            else:
+                log_lines.append(f"  → 封存中沒有這張圖片: {img_info['url']}")
+                self.missing.append(img_info['url'])
+            future.set_result(bool(archived_url))
+        else:
+            future = self.engine.submit(downloader.attempts(self.session, img_info, log_lines.append))
+        self.pending[future] = (img_info, log_lines)
+        return future
+
+    def wait(self, progress=None):
+        """等待所有圖片完成，回傳 (成功數, 失敗數)"""
+        downloader = self.downloader
+        store = downloader.image_store
+        total = len(self.pending)
+        success_count = 0
+        fail_count = 0
+
+        if progress:
+            progress(0, total)
+
+        if self.engine.max_in_flight > 1:
+            print(f"同時下載數: {self.engine.max_in_flight}（每個主機 {self.engine.per_host}）")
+
+        try:
+            # 在呼叫端執行緒依完成順序統計，進度只會遞增
+            for future in as_completed(self.pending):
+                img_info, log_lines = self.pending[future]
+                download_success = future.result()
+                downloaded_url = img_info.pop('downloaded_url', None)
+                if download_success and store is not None:
+                    # 新下載的圖片放入儲存區（內容重複時改為指向既有內容），只記錄實際下載的URL
+                    store.add(img_info['local_path'], [downloaded_url] if downloaded_url else [])
+                if download_success and downloader.record_archive is not None:
+                    # 以文章中的URL記錄（略過或從儲存區連結的圖片也記錄，封存才完整）
+                    downloader.record_archive.record([img_info['url'], downloaded_url], img_info['local_path'])
+                if not download_success and downloader.offline_archive is None:
+                    log_lines.append(f"  → 所有策略都失敗了，請手動下載: {img_info['url']}")
+                    log_lines.append(f"  → 目標位置: {img_info['local_path']}")
+                # 每張圖片的訊息集中輸出，避免不同執行緒的訊息交錯
+                print("\n".join(log_lines))
+
+                if download_success:
+                    success_count += 1
+                else:
+                    fail_count += 1
+
+                if progress:
+                    progress(success_count, total)
+        finally:
+            if self.private_engine:
+                self.engine.close()
+            if store is not None:
+                store.flush()
+            downloader.strategy_stats.flush()
+            downloader.negative_cache.flush()
+            if downloader.record_archive is not None:
+                downloader.record_archive.flush()
+
+        print(f"\n下載完成：成功 {success_count} 個，失敗 {fail_count} 個")
+        if self.reused_count:
+            print(f"使用已儲存的圖片 {self.reused_count} 個（不需下載）")
+        if self.skipped_count:
+            print(f"已存在且完整的圖片 {self.skipped_count} 個（略過）")
+        if self.archived_count:
+            print(f"從封存取得的圖片 {self.archived_count} 個")
+        if self.missing:
+            print(f"離線模式：封存中沒有 {len(self.missing)} 張圖片（未連線下載）")
+            for url in self.missing:
+                print(f"  - {url}")
+        if downloader.record_archive is not None:
+            print(f"圖片封存: {downloader.record_archive.path}（{len(downloader.record_archive)} 個URL）")
+        cache = downloader.http_cache
+        if cache is not None and cache.revalidated > self.revalidated_before:
+            print(f"圖片未變更 {cache.revalidated - self.revalidated_before} 個（伺服器回應304，沿用既有檔案）")
+        stats_after = connection_stats()
+        print(f"HTTP請求 {stats_after['requests'] - self.stats_before['requests']} 次，"
+              f"新建連線 {stats_after['connections'] - self.stats_before['connections']} 次")
+        return success_count, fail_count
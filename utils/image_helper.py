@@ -5,11 +5,17 @@
 """
 
 import os
+import sys
 import shutil
 from pathlib import Path
 from urllib.parse import urlparse, unquote
 import re
 
+# 加入專案根目錄
+sys.path.append(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from utils.html_input import open_html
+
 
 def copy_downloaded_images(html_file, source_folder, target_base="images"):
     """
@@ -20,15 +26,12 @@ def copy_downloaded_images(html_file, source_folder, target_base="images"):
     - source_folder: 包含已下載圖片的資料夾
     - target_base: 目標基礎目錄
     """
-    from bs4 import BeautifulSoup
     import json
     from datetime import datetime
     
-    # 讀取HTML提取發布日期
-    with open(html_file, 'r', encoding='utf-8') as f:
-        html_content = f.read()
-    
-    soup = BeautifulSoup(html_content, 'html.parser')
+    # 讀取HTML提取發布日期（只需要meta標籤）
+    with open_html(html_file) as source:
+        soup = source.parse_tags(('meta',))
     
     # 提取發布日期（包含時間）
     publish_date = None
@@ -75,12 +78,11 @@ def extract_image_urls(html_file, output_file=None):
     - html_file: HTML檔案路徑
     - output_file: 輸出的URL列表檔案（如果為None，將輸出到對應的圖片資料夾）
     """
-    from bs4 import BeautifulSoup
-    
-    with open(html_file, 'r', encoding='utf-8') as f:
-        html_content = f.read()
+    from datetime import datetime
     
-    soup = BeautifulSoup(html_content, 'html.parser')
+    # 只需要meta與img標籤
+    with open_html(html_file) as source:
+        soup = source.parse_tags(('meta', 'img'))
     
     # 提取發布日期（包含時間）
     publish_date = None
@@ -0,0 +1,158 @@
+"""
+圖片內容定址儲存 - 以內容雜湊保存圖片，各文章的圖片檔是指向同一份內容的硬連結
+作者在多篇文章重複使用的logo、橫幅與簽名圖只會下載與儲存一次；
+已知的URL直接從儲存區連結，完全不需要下載
+"""
+import os
+import json
+import shutil
+import hashlib
+import tempfile
+import threading
+from pathlib import Path
+
+STORE_DIRNAME = ".store"
+
+
+def file_digest(path):
+    """計算檔案內容的SHA-256"""
+    digest = hashlib.sha256()
+    with open(path, 'rb') as f:
+        for chunk in iter(lambda: f.read(1024 * 1024), b''):
+            digest.update(chunk)
+    return digest.hexdigest()
+
+
+def link_or_copy(source, target):
+    """以硬連結（不支援時改為複製）原子地建立target"""
+    target = Path(target)
+    target.parent.mkdir(parents=True, exist_ok=True)
+    fd, tmp_path = tempfile.mkstemp(dir=target.parent, suffix='.tmp')
+    os.close(fd)
+    os.unlink(tmp_path)
+    try:
+        try:
+            os.link(source, tmp_path)
+        except OSError:
+            # 檔案系統不支援硬連結或跨裝置時
+            shutil.copy2(source, tmp_path)
+        os.replace(tmp_path, target)
+    except Exception:
+        if os.path.exists(tmp_path):
+            os.unlink(tmp_path)
+        raise
+
+
+class ImageStore:
+    """以內容雜湊保存圖片的儲存區，並記錄 URL → 雜湊 的對應"""
+
+    def __init__(self, images_dir):
+        self.root = Path(images_dir) / STORE_DIRNAME
+        self.blobs_dir = self.root / "blobs"
+        self.index_path = self.root / "url_index.json"
+        self.reused = 0       # 不需下載、直接連結的圖片數
+        self.deduplicated = 0  # 下載後發現內容已存在的圖片數
+        self.bytes_saved = 0
+        self._lock = threading.Lock()
+        self._index = None
+        self._dirty = False
+
+    def _blob_path(self, digest):
+        return self.blobs_dir / digest[:2] / digest
+
+    def blob(self, digest):
+        """內容雜湊在儲存區中的路徑，沒有時回傳None"""
+        blob = self._blob_path(digest)
+        return blob if blob.exists() else None
+
+    def _load_index(self):
+        if self._index is not None:
+            return
+        try:
+            with open(self.index_path, 'r', encoding='utf-8') as f:
+                self._index = json.load(f)
+        except (OSError, ValueError):
+            self._index = {}
+
+    def lookup(self, url):
+        """已知URL的內容在儲存區中的路徑，沒有時回傳None"""
+        if not url:
+            return None
+        with self._lock:
+            self._load_index()
+            digest = self._index.get(url)
+        if digest is None:
+            return None
+        return self.blob(digest)
+
+    def materialize(self, urls, local_path):
+        """若任一URL已在儲存區中，將內容連結到local_path並回傳True"""
+        for url in urls:
+            blob = self.lookup(url)
+            if blob is None:
+                continue
+            link_or_copy(blob, local_path)
+            with self._lock:
+                self.reused += 1
+                self.bytes_saved += blob.stat().st_size
+            return True
+        return False
+
+    def add(self, local_path, urls):
+        """
+        將剛下載的檔案放入儲存區並記錄URL
+        內容已存在時，local_path 改為指向既有內容的硬連結
+        """
+        digest = file_digest(local_path)
+        blob = self._blob_path(digest)
+        blob.parent.mkdir(parents=True, exist_ok=True)
+
+        with self._lock:
+            if blob.exists():
+                self.deduplicated += 1
+                self.bytes_saved += blob.stat().st_size
+                duplicate = True
+            else:
+                link_or_copy(local_path, blob)
+                duplicate = False
+
+        if duplicate:
+            link_or_copy(blob, local_path)
+
+        with self._lock:
+            self._load_index()
+            for url in urls:
+                if url and self._index.get(url) != digest:
+                    self._index[url] = digest
+                    self._dirty = True
+        return digest
+
+    def flush(self):
+        """將URL索引寫入磁碟（先寫入暫存檔再改名）"""
+        with self._lock:
+            if not self._dirty:
+                return
+            self.root.mkdir(parents=True, exist_ok=True)
+            fd, tmp_path = tempfile.mkstemp(dir=self.root, suffix='.tmp')
+            try:
+                with os.fdopen(fd, 'w', encoding='utf-8') as f:
+                    json.dump(self._index, f, ensure_ascii=False)
+                os.replace(tmp_path, self.index_path)
+            except Exception:
+                if os.path.exists(tmp_path):
+                    os.unlink(tmp_path)
+                raise
+            self._dirty = False
+
+
+_stores = {}
+_stores_lock = threading.Lock()
+
+
+def get_image_store(images_dir):
+    """同一個圖片目錄在整個行程中共用同一個儲存區實例"""
+    images_dir = Path(images_dir).resolve()
+    with _stores_lock:
+        if images_dir not in _stores:
+            _stores[images_dir] = ImageStore(images_dir)
+        return _stores[images_dir]
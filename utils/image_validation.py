@@ -0,0 +1,93 @@
+"""
+圖片回應的提前驗證 - 寫入任何內容之前先檢查 Content-Length 與第一段內容的檔案簽章
+被節流或出錯時伺服器常以 octet-stream 回傳HTML錯誤頁，這時立即中斷下載，不浪費頻寬與磁碟寫入
+"""
+from itertools import chain
+
+# 小於這個大小的回應多半是錯誤頁面
+MIN_IMAGE_BYTES = 100
+# 判斷格式需要的開頭位元組數（SVG前面可能有XML宣告與註解）
+SNIFF_BYTES = 512
+
+_SIGNATURES = [
+    (b'\xff\xd8\xff', 'jpeg'),
+    (b'\x89PNG\r\n\x1a\n', 'png'),
+    (b'GIF87a', 'gif'),
+    (b'GIF89a', 'gif'),
+    (b'\x00\x00\x01\x00', 'ico'),
+    (b'BM', 'bmp'),
+]
+
+# ISO BMFF 的 ftyp 品牌
+_AVIF_BRANDS = (b'avif', b'avis')
+
+
+def sniff_image_format(head):
+    """依開頭位元組判斷圖片格式，不是圖片時回傳None"""
+    for signature, name in _SIGNATURES:
+        if head.startswith(signature):
+            return name
+    if head[:4] == b'RIFF' and head[8:12] == b'WEBP':
+        return 'webp'
+    if head[4:8] == b'ftyp' and head[8:12] in _AVIF_BRANDS:
+        return 'avif'
+
+    text = head.lstrip().lower()
+    if text.startswith((b'<?xml', b'<svg', b'<!--', b'<!doctype svg')):
+        if b'<svg' in text and b'<html' not in text:
+            return 'svg'
+    return None
+
+
+def sniff_file_format(path):
+    """依檔案開頭判斷圖片格式，無法讀取或不是圖片時回傳None"""
+    try:
+        with open(path, 'rb') as f:
+            return sniff_image_format(f.read(SNIFF_BYTES))
+    except OSError:
+        return None
+
+
+def content_length(headers):
+    """回應的 Content-Length，沒有或無法解析時回傳None"""
+    try:
+        return int(headers.get('Content-Length'))
+    except (TypeError, ValueError):
+        return None
+
+
+def peek(chunks, size=SNIFF_BYTES):
+    """
+    從串流讀取至少 size 個位元組（或到結尾）作為開頭
+    回傳 (開頭位元組, 包含開頭在內的完整串流)，之後照常逐段寫入
+    """
+    chunks = iter(chunks)
+    head = []
+    length = 0
+    for chunk in chunks:
+        if not chunk:
+            continue
+        head.append(chunk)
+        length += len(chunk)
+        if length >= size:
+            break
+    return b''.join(head), chain(head, chunks)
+
+
+def check_image_response(response, chunks, resuming=False):
+    """
+    寫入前驗證圖片回應，回傳 (錯誤訊息或None, 完整串流)
+
+    接續下載（resuming）時開頭不是檔案起點，只檢查長度
+    """
+    length = content_length(response.headers)
+    if not resuming and length is not None and length < MIN_IMAGE_BYTES:
+        return f"檔案太小，可能是錯誤: {length} bytes", None
+    if resuming:
+        return None, chunks
+
+    head, chunks = peek(chunks)
+    if sniff_image_format(head) is None:
+        preview = head[:40].decode('utf-8', 'replace').replace('\n', ' ')
+        return f"內容不是圖片: {preview!r}", None
+    return None, chunks
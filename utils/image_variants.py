@@ -0,0 +1,66 @@
+"""
+圖片尺寸策略 - 向 resize-image.vocus.cc 要求符合版面寬度的縮圖
+A4頁面以列印解析度輸出時不需要數千像素寬的原圖；縮圖失敗時仍會退回下載原圖
+縮圖的格式由伺服器協商決定，以實際格式的副檔名儲存（可能和文章中原圖的副檔名不同）
+"""
+from pathlib import Path
+from urllib.parse import urlparse, parse_qsl, urlencode, urlunparse
+
+RESIZE_ENDPOINT = "https://resize-image.vocus.cc/resize"
+
+# 要求縮圖時接受的格式：WebP與JPEG比PNG精簡許多
+# （不要求AVIF，WeasyPrint透過Pillow解碼時通常不支援）
+COMPACT_ACCEPT = "image/webp,image/jpeg;q=0.9,image/png;q=0.8,image/*;q=0.5"
+
+# 縮圖格式 -> 儲存時的副檔名
+FORMAT_EXTENSIONS = {'jpeg': '.jpg', 'png': '.png', 'gif': '.gif', 'webp': '.webp', 'avif': '.avif'}
+_SUFFIX_FORMATS = {'.jpg': 'jpeg', '.jpeg': 'jpeg', '.png': 'png', '.gif': 'gif', '.webp': 'webp', '.avif': 'avif'}
+_CONTENT_TYPE_FORMATS = {'image/jpeg': 'jpeg', 'image/jpg': 'jpeg', 'image/pjpeg': 'jpeg', 'image/png': 'png',
+                         'image/gif': 'gif', 'image/webp': 'webp', 'image/avif': 'avif'}
+
+
+def variant_url(img_info, max_width):
+    """
+    指定寬度的縮圖URL，無法產生時回傳None
+
+    有 resize_url 時沿用其參數只替換寬度，否則以原始的 images.vocus.cc URL 組出縮圖URL
+    """
+    if not max_width:
+        return None
+
+    resize_url = img_info.get('resize_url')
+    if resize_url:
+        parsed = urlparse(resize_url)
+        query = [(key, value) for key, value in parse_qsl(parsed.query, keep_blank_values=True)
+                 if key != 'width']
+        query.append(('width', str(max_width)))
+        return urlunparse(parsed._replace(query=urlencode(query)))
+
+    original_url = img_info.get('url')
+    if original_url and 'images.vocus.cc' in original_url:
+        return f"{RESIZE_ENDPOINT}?{urlencode([('url', original_url), ('width', str(max_width))])}"
+
+    return None
+
+
+def content_type_format(content_type):
+    """Content-Type 對應的圖片格式，不是已知的圖片格式時回傳None"""
+    media_type = (content_type or '').split(';', 1)[0].strip().lower()
+    return _CONTENT_TYPE_FORMATS.get(media_type)
+
+
+def variant_path(local_path, image_format):
+    """以實際格式的副檔名儲存縮圖的路徑（格式不明或副檔名已相符時沿用 local_path）"""
+    local_path = Path(local_path)
+    extension = FORMAT_EXTENSIONS.get(image_format)
+    if extension is None or _SUFFIX_FORMATS.get(local_path.suffix.lower()) == image_format:
+        return local_path
+    return local_path.with_suffix(extension)
+
+
+def variant_candidates(local_path):
+    """縮圖可能的儲存路徑（local_path 與各格式的副檔名），供重新執行時尋找已下載的縮圖"""
+    local_path = Path(local_path)
+    return [local_path] + [path for path in (variant_path(local_path, image_format)
+                                             for image_format in FORMAT_EXTENSIONS)
+                           if path != local_path]
@@ -0,0 +1,125 @@
+"""
+手動編號修正 - 偵測同一個列表中被圖片打斷後重新從「1.」開始的編號
+以一次由下而上的走訪完成，每個節點的文字長度只計算一次
+"""
+import re
+import time
+
+from bs4.element import Tag, NavigableString
+
+# 段落開頭的手動編號，例如「1. 」「2．」（排除「1.5 億」這類小數）
+NUMBER_MARKER_RE = re.compile(r'^(\s*)(\d{1,3})([.．])(?!\d)')
+
+# 可能是列表項目的區塊元素
+ITEM_TAGS = frozenset(['p', 'li', 'div', 'h1', 'h2', 'h3', 'h4', 'h5', 'h6'])
+
+# 夾在列表項目之間時不會打斷列表的元素（圖片與其說明）
+TRANSPARENT_TAGS = frozenset(['figure', 'img', 'picture', 'video', 'audio', 'br', 'hr'])
+
+# 至少要有幾個連續編號，才視為同一個列表
+MIN_RUN_LENGTH = 2
+
+
+def _is_text(node, text_types):
+    """與Tag.get_text()相同的文字類型判斷"""
+    if isinstance(text_types, type):
+        return type(node) is text_types
+    if text_types is None:
+        return isinstance(node, NavigableString)
+    return type(node) in text_types
+
+
+def renumber_lists(root, profile=None):
+    """
+    修正被打斷的手動編號列表，回傳修正的項目數
+
+    同一個父節點下的編號段落 (1. 2. …) 之間只隔著圖片或空白元素時視為同一個列表，
+    若中途又從「1.」開始，就接續前面的編號（後面的項目一併位移）。
+    profile (CleanupProfile) 不為None時記錄耗時與走訪節點數。
+    """
+    start = time.perf_counter()
+    text_types = root.interesting_string_types
+
+    # 先序走訪收集節點，反向即為由下而上
+    order = []
+    stack = [root]
+    while stack:
+        node = stack.pop()
+        order.append(node)
+        stack.extend(child for child in node.contents if isinstance(child, Tag))
+
+    text_length = {}   # 節點的文字長度（去除空白）
+    first_text = {}    # 節點中第一個非空白文字節點
+    fixed = 0
+
+    for node in reversed(order):
+        # 子節點的資訊都已計算完成，先修正這一層的編號
+        fixed += _renumber_children(node, text_length, first_text)
+
+        length = 0
+        first = None
+        for child in node.contents:
+            if isinstance(child, Tag):
+                length += text_length[id(child)]
+                if first is None:
+                    first = first_text[id(child)]
+            elif _is_text(child, text_types):
+                stripped = child.strip()
+                if stripped:
+                    length += len(stripped)
+                    if first is None:
+                        first = child
+        text_length[id(node)] = length
+        first_text[id(node)] = first
+
+    if profile is not None:
+        profile.record('numbering', time.perf_counter() - start, len(order), changed=fixed)
+    return fixed
+
+
+def _renumber_children(parent, text_length, first_text):
+    """掃描同一層的子節點，修正重新從1開始的編號"""
+    fixed = 0
+    run_length = 0     # 目前列表已有的項目數
+    last_number = 0    # 原始文字中的上一個編號
+    offset = 0         # 需要加上的位移
+
+    for child in parent.contents:
+        if not isinstance(child, Tag):
+            if child.strip():
+                run_length = 0
+            continue
+
+        match = None
+        text_node = first_text[id(child)]
+        if child.name in ITEM_TAGS and text_node is not None:
+            match = NUMBER_MARKER_RE.match(text_node)
+
+        if match is None:
+            # 只有圖片或空白元素不會打斷列表
+            if child.name not in TRANSPARENT_TAGS and text_length[id(child)] > 0:
+                run_length = 0
+            continue
+
+        number = int(match.group(2))
+        if run_length and number == last_number + 1:
+            run_length += 1
+        elif run_length >= MIN_RUN_LENGTH and number == 1:
+            # 同一個列表重新從1開始：接續前面的編號
+            offset = last_number + offset
+            run_length += 1
+        else:
+            run_length = 1
+            offset = 0
+        last_number = number
+
+        if offset:
+            prefix, digits, dot = match.groups()
+            corrected = f"{prefix}{number + offset}{dot}{text_node[match.end():]}"
+            new_node = type(text_node)(corrected)
+            text_node.replace_with(new_node)
+            # 後續比對仍可能用到這個文字節點
+            first_text[id(child)] = new_node
+            fixed += 1
+
+    return fixed
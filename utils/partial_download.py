@@ -0,0 +1,126 @@
+"""
+可續傳的圖片下載 - 先寫入 .part 檔，完成後才以原子改名放到目標位置
+中斷的下載留下 .part 檔與記錄URL、驗證資訊的 .part.json，下次以 Range / If-Range 請求接續下載；
+目標位置只會出現完整的檔案，不會再有被截斷卻看起來成功的圖片
+"""
+import os
+import re
+import json
+import hashlib
+from glob import escape as glob_escape
+from pathlib import Path
+
+PART_SUFFIX = ".part"
+
+_CONTENT_RANGE_RE = re.compile(r'bytes\s+(\d+)-\d+/(?:\d+|\*)')
+
+
+def part_path_for(save_path, url=None):
+    """
+    暫存檔路徑；指定URL時每個URL有各自的暫存檔，
+    同一張圖片的不同URL同時下載（對沖請求）時不會寫入同一個檔案
+    """
+    save_path = Path(save_path)
+    if url is None:
+        return save_path.with_name(save_path.name + PART_SUFFIX)
+    tag = hashlib.sha1(url.encode('utf-8')).hexdigest()[:8]
+    return save_path.with_name(f"{save_path.name}.{tag}{PART_SUFFIX}")
+
+
+def _range_validator(headers):
+    """可用於 If-Range 的驗證資訊（弱ETag不能用於 If-Range）"""
+    etag = headers.get('ETag')
+    if etag and not etag.startswith('W/'):
+        return etag
+    return headers.get('Last-Modified')
+
+
+class PartialDownload:
+    """
+    一次下載到 save_path 的過程
+
+    request_headers() 回傳接續下載需要的請求頭；open(response) 依回應決定接續或重新寫入，
+    寫入完成後 commit() 改名到目標位置，失敗時 discard() 清除暫存檔
+    """
+
+    def __init__(self, save_path, url):
+        self.save_path = Path(save_path)
+        self.url = url
+        self.part_path = part_path_for(self.save_path, url)
+        self.meta_path = self.part_path.with_name(self.part_path.name + '.json')
+        self.offset = 0
+        self.validator = None
+        self.digest = None
+        self._load()
+
+    def _load(self):
+        """讀取上次中斷時留下的狀態（URL不同或沒有驗證資訊時不接續）"""
+        try:
+            with open(self.meta_path, 'r', encoding='utf-8') as f:
+                meta = json.load(f)
+            size = self.part_path.stat().st_size
+        except (OSError, ValueError):
+            return
+        if meta.get('url') == self.url and meta.get('validator') and size > 0:
+            self.offset = size
+            self.validator = meta['validator']
+
+    def request_headers(self):
+        if not self.offset:
+            return {}
+        return {'Range': f'bytes={self.offset}-', 'If-Range': self.validator}
+
+    def is_continuation(self, response):
+        """回應是否從 .part 檔的結尾接續"""
+        if not self.offset or response.status_code != 206:
+            return False
+        # 解碼過的內容（gzip等）無法以位元組位置接續
+        if response.headers.get('Content-Encoding', 'identity') != 'identity':
+            return False
+        match = _CONTENT_RANGE_RE.match(response.headers.get('Content-Range', ''))
+        return bool(match) and int(match.group(1)) == self.offset
+
+    def open(self, response):
+        """開啟 .part 檔準備寫入回應內容，self.digest 包含已寫入部分的雜湊"""
+        self.digest = hashlib.sha256()
+        self.part_path.parent.mkdir(parents=True, exist_ok=True)
+        if self.is_continuation(response):
+            mode = 'ab'
+            with open(self.part_path, 'rb') as f:
+                for chunk in iter(lambda: f.read(1024 * 1024), b''):
+                    self.digest.update(chunk)
+        else:
+            # 伺服器回應完整內容（檔案已變更或不支援Range），從頭寫入
+            mode = 'wb'
+            self.offset = 0
+
+        validator = _range_validator(response.headers)
+        if validator and response.headers.get('Content-Encoding', 'identity') == 'identity':
+            with open(self.meta_path, 'w', encoding='utf-8') as f:
+                json.dump({'url': self.url, 'validator': validator}, f)
+        elif self.meta_path.exists():
+            self.meta_path.unlink()
+        return open(self.part_path, mode)
+
+    def size(self):
+        return self.part_path.stat().st_size
+
+    def commit(self, target=None):
+        """
+        將完整的 .part 檔改名到目標位置（target 取代 save_path，例如依實際格式改了副檔名；
+        不會寫入既有檔案，硬連結指向的內容不受影響）
+        同一張圖片其他URL留下的暫存檔已不需要接續，一併清除
+        """
+        os.replace(self.part_path, target or self.save_path)
+        if self.meta_path.exists():
+            self.meta_path.unlink()
+        for leftover in self.save_path.parent.glob(f"{glob_escape(self.save_path.name)}.*{PART_SUFFIX}*"):
+            try:
+                leftover.unlink()
+            except OSError:
+                pass
+
+    def discard(self):
+        for path in (self.part_path, self.meta_path):
+            if path.exists():
+                path.unlink()
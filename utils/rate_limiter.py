@@ -0,0 +1,208 @@
+"""
+每個主機的請求節流 - 兩個下載器共用
+以權杖桶限制每秒請求數（可另外限制每秒位元組數），遵守 Retry-After 並以指數退避加隨機抖動重試；
+連續失敗時斷路器打開，暫停該主機一段時間，不必每張圖片都等到逾時
+"""
+import time
+import random
+import threading
+from email.utils import parsedate_to_datetime
+from urllib.parse import urlparse
+
+# 每個主機每秒的請求數與可累積的突發請求數
+DEFAULT_RATE = 10.0
+DEFAULT_BURST = 10
+# 連線與讀取逾時（秒）
+DEFAULT_TIMEOUT = (5, 20)
+# 連續失敗幾次後打開斷路器，以及暫停的秒數
+DEFAULT_FAILURE_THRESHOLD = 5
+DEFAULT_COOLDOWN = 60.0
+# 429/503 時最多重試幾次，以及退避時間的基數與上限
+MAX_THROTTLE_RETRIES = 3
+BACKOFF_BASE = 1.0
+BACKOFF_MAX = 60.0
+
+THROTTLE_STATUS_CODES = (429, 503)
+
+
+class HostUnavailable(Exception):
+    """主機的斷路器打開中，暫時不送出請求"""
+
+
+def parse_retry_after(value):
+    """Retry-After 的秒數（可為秒數或HTTP日期），無法解析時回傳None"""
+    if not value:
+        return None
+    value = value.strip()
+    if value.isdigit():
+        return float(value)
+    try:
+        return max(0.0, parsedate_to_datetime(value).timestamp() - time.time())
+    except (TypeError, ValueError):
+        return None
+
+
+def backoff_delay(attempt, base=BACKOFF_BASE, cap=BACKOFF_MAX):
+    """第 attempt 次重試（從0起算）的等待秒數：指數退避加完整抖動"""
+    return random.uniform(0, min(cap, base * (2 ** attempt)))
+
+
+class _Bucket:
+    """權杖桶（呼叫端持有鎖）"""
+
+    def __init__(self, rate, capacity):
+        self.rate = rate
+        self.capacity = capacity
+        self.tokens = capacity
+        self.updated = time.monotonic()
+
+    def reserve(self, amount):
+        """預扣 amount 個權杖，回傳需要等待的秒數"""
+        now = time.monotonic()
+        self.tokens = min(self.capacity, self.tokens + (now - self.updated) * self.rate)
+        self.updated = now
+        self.tokens -= amount
+        return 0.0 if self.tokens >= 0 else -self.tokens / self.rate
+
+
+class HostLimiter:
+    """一個主機的節流狀態：請求權杖桶、位元組權杖桶、暫停時間與斷路器"""
+
+    def __init__(self, host, rate, burst, bytes_per_sec, failure_threshold, cooldown):
+        self.host = host
+        self.failure_threshold = failure_threshold
+        self.cooldown = cooldown
+        self._lock = threading.Lock()
+        self._requests = _Bucket(rate, burst) if rate else None
+        self._bytes = _Bucket(bytes_per_sec, bytes_per_sec) if bytes_per_sec else None
+        self._paused_until = 0.0
+        self._failures = 0
+        self._open_until = 0.0
+        self._probing = False
+
+    def acquire(self):
+        """等待可以送出請求；斷路器打開時立即拋出 HostUnavailable"""
+        with self._lock:
+            now = time.monotonic()
+            if self._failures >= self.failure_threshold:
+                if now < self._open_until or self._probing:
+                    raise HostUnavailable(f"{self.host} 連續失敗 {self._failures} 次，暫停中")
+                # 暫停期滿，只放一個請求試探主機是否恢復
+                self._probing = True
+            wait = max(0.0, self._paused_until - now)
+            if self._requests is not None:
+                wait = max(wait, self._requests.reserve(1))
+        if wait > 0:
+            time.sleep(wait)
+
+    def consume_bytes(self, amount):
+        """每秒位元組數上限：讀取 amount 個位元組後需要時等待"""
+        if self._bytes is None:
+            return
+        with self._lock:
+            wait = self._bytes.reserve(amount)
+        if wait > 0:
+            time.sleep(wait)
+
+    def pause(self, seconds):
+        """主機要求放慢（429/503）時，這段時間內所有請求都等待"""
+        with self._lock:
+            self._paused_until = max(self._paused_until, time.monotonic() + seconds)
+            # 試探中的請求被要求放慢，重試時仍允許送出
+            self._probing = False
+
+    def record_success(self):
+        with self._lock:
+            self._failures = 0
+            self._probing = False
+
+    def record_failure(self):
+        with self._lock:
+            self._failures += 1
+            self._probing = False
+            if self._failures >= self.failure_threshold:
+                self._open_until = time.monotonic() + self.cooldown
+
+    @property
+    def is_open(self):
+        with self._lock:
+            return self._failures >= self.failure_threshold and time.monotonic() < self._open_until
+
+
+class RateLimiter:
+    """依主機分別節流的限制器"""
+
+    def __init__(self, rate=DEFAULT_RATE, burst=DEFAULT_BURST, bytes_per_sec=None,
+                 failure_threshold=DEFAULT_FAILURE_THRESHOLD, cooldown=DEFAULT_COOLDOWN,
+                 timeout=DEFAULT_TIMEOUT):
+        self.rate = rate
+        self.burst = max(1, burst)
+        self.bytes_per_sec = bytes_per_sec
+        self.failure_threshold = failure_threshold
+        self.cooldown = cooldown
+        self.timeout = timeout
+        self._lock = threading.Lock()
+        self._hosts = {}
+
+    def for_url(self, url):
+        host = urlparse(url).hostname or ''
+        with self._lock:
+            limiter = self._hosts.get(host)
+            if limiter is None:
+                limiter = self._hosts[host] = HostLimiter(
+                    host, self.rate, self.burst, self.bytes_per_sec,
+                    self.failure_threshold, self.cooldown)
+            return limiter
+
+    def get(self, session, url, log=print, **kwargs):
+        """
+        經過節流的 GET 請求
+
+        429/503 時依 Retry-After（沒有時以指數退避）暫停主機後重試；連線錯誤、逾時與5xx計入斷路器。
+        斷路器打開時拋出 HostUnavailable。
+        """
+        limiter = self.for_url(url)
+        kwargs.setdefault('timeout', self.timeout)
+        for attempt in range(MAX_THROTTLE_RETRIES + 1):
+            limiter.acquire()
+            try:
+                response = session.get(url, **kwargs)
+            except Exception:
+                limiter.record_failure()
+                raise
+
+            if response.status_code in THROTTLE_STATUS_CODES and attempt < MAX_THROTTLE_RETRIES:
+                delay = parse_retry_after(response.headers.get('Retry-After'))
+                if delay is None:
+                    delay = backoff_delay(attempt)
+                response.close()
+                log(f"    → 主機要求放慢 ({response.status_code})，{delay:.1f} 秒後重試")
+                limiter.pause(min(delay, BACKOFF_MAX))
+                continue
+
+            if response.status_code >= 500 or response.status_code in THROTTLE_STATUS_CODES:
+                limiter.record_failure()
+            else:
+                limiter.record_success()
+            return response
+
+
+_limiter = None
+_limiter_lock = threading.Lock()
+
+
+def configure_rate_limiter(**settings):
+    """以新的設定建立整個行程共用的限制器（需在開始下載前呼叫）"""
+    global _limiter
+    with _limiter_lock:
+        _limiter = RateLimiter(**settings)
+        return _limiter
+
+
+def get_rate_limiter():
+    """取得整個行程共用的限制器（兩個下載器共用同一組主機狀態）"""
+    global _limiter
+    with _limiter_lock:
+        if _limiter is None:
+            _limiter = RateLimiter()
+        return _limiter
@@ -8,11 +8,9 @@ import os
 import re
 import json
 import argparse
-import requests
 from datetime import datetime
 from pathlib import Path
 from urllib.parse import urlparse, unquote
-from bs4 import BeautifulSoup
 import html2text
 
 try:
@@ -23,15 +21,49 @@ except ImportError:
     WEASYPRINT_AVAILABLE = False
 
 from utils.pdf_generator import generate_pdf
+from utils.html_parser import make_soup, resolve_parser, PARSER_CHOICES, DEFAULT_PARSER
+from utils.html_slicer import slice_article
+from utils.html_input import open_html, normalize_newlines
+from utils.article_metadata import read_head_metadata
+from utils.html_cleanup import get_cleanup_engine, load_ad_patterns, cleanup_fingerprint
+from utils.article_cache import get_article_cache, CACHED_FIELDS, DEFAULT_MAX_MB
+from utils.list_numbering import renumber_lists
+from utils.cleanup_profile import CleanupProfile
+from utils.html_minify import minify_html
+from utils.image_downloader import ImageDownloader, CONVERTER_STRATEGIES
+from utils.image_derivatives import build_derivatives, DEFAULT_PDF_IMAGE_DPI
+from utils.rate_limiter import configure_rate_limiter, DEFAULT_RATE
+
+# 同一篇文章同時下載的圖片數
+DEFAULT_IMAGE_WORKERS = 4
 
 
 class VocusArticleConverter:
     """方格子文章轉換器"""
     
-    def __init__(self, input_file, output_dir="output", images_dir="images", image_progress_callback=None):
+    def __init__(self, input_file, output_dir="output", images_dir="images", image_progress_callback=None,
+                 parser=DEFAULT_PARSER, ad_patterns=None, use_cache=True, cache_max_mb=DEFAULT_MAX_MB,
+                 profile_cleanup=False, minify_pdf=True, image_workers=DEFAULT_IMAGE_WORKERS,
+                 fetch_engine=None, use_image_store=True, use_http_cache=True, max_image_width=None,
+                 image_derivatives=True, pdf_image_dpi=DEFAULT_PDF_IMAGE_DPI, hedge_requests=True,
+                 offline_archive=None, record_archive=None):
         self.input_file = Path(input_file)
         self.output_dir = Path(output_dir)
         self.images_dir = Path(images_dir)
+        self.parser = parser  # HTML解析引擎 (auto/lexbor/lxml/html.parser)
+        self.ad_patterns = list(ad_patterns or [])  # 額外的廣告關鍵字
+        self.minify_pdf = minify_pdf  # PDF轉換前先精簡DOM
+        self.image_workers = image_workers  # 同一篇文章同時下載的圖片數
+        self.fetch_engine = fetch_engine  # 整批共用的下載引擎（None時每篇文章自己建立）
+        self.hedge_requests = hedge_requests  # 自己建立的下載引擎是否使用對沖請求
+        self.image_derivatives = image_derivatives  # PDF嵌入縮小、轉檔後的圖片（Markdown仍用原圖）
+        self.pdf_image_dpi = pdf_image_dpi
+        # 與進階下載器共用的下載引擎（圖片儲存區、條件式請求快取與策略排序）
+        self.downloader = ImageDownloader(self.images_dir, CONVERTER_STRATEGIES, use_image_store=use_image_store,
+                                          use_http_cache=use_http_cache, max_image_width=max_image_width,
+                                          offline_archive=offline_archive, record_archive=record_archive)
+        self._downloads = None  # 進行中的一批圖片下載（解析時發現圖片就開始）
+        self._start_downloads = False
         
         # 確保必要目錄存在
         self.output_dir.mkdir(exist_ok=True)
@@ -47,19 +79,41 @@ class VocusArticleConverter:
         self.content_html = ""
         self.images = []  # 儲存圖片資訊
         
+        # 解析結果快取（以輸入內容雜湊為鍵）
+        self.cache = get_article_cache(self.output_dir / ".cache" / "articles", cache_max_mb) if use_cache else None
+        
+        # 清理規則效能分析（使用快取時不會執行清理，也就沒有紀錄）
+        self.cleanup_profile = CleanupProfile() if profile_cleanup else None
+        
         # 進度回調函數
         self.image_progress_callback = image_progress_callback
         self.total_images = 0
         self.downloaded_images = 0
         
-    def parse_html(self):
-        """解析HTML檔案，提取文章內容"""
+    def parse_html(self, start_downloads=False):
+        """
+        解析HTML檔案，提取文章內容
+        start_downloads 為真時，每發現一張圖片就在背景開始下載（之後由 download_images() 等待完成）
+        """
         print(f"正在解析HTML檔案: {self.input_file}")
-        
-        with open(self.input_file, 'r', encoding='utf-8') as f:
-            html_content = f.read()
-        
-        soup = BeautifulSoup(html_content, 'html.parser')
+        self._start_downloads = start_downloads
+        
+        with open_html(self.input_file) as source:
+            # 內容與清理規則都沒變時直接使用快取，不需要建立DOM
+            cache_key = None
+            if self.cache is not None:
+                cache_key = self.cache.make_key(source.data, cleanup_fingerprint(self.ad_patterns))
+                cached = self.cache.get(cache_key)
+                if cached is not None:
+                    print("使用快取的解析結果")
+                    self._load_parsed(cached)
+                    if start_downloads:
+                        for img_info in self.images:
+                            self._start_image_download(img_info)
+                    self._print_article_info()
+                    return
+            
+            soup = self._make_soup(source)
         
         # 提取標題
         title_meta = soup.find('meta', {'property': 'og:title'})
@@ -135,12 +189,61 @@ class VocusArticleConverter:
             print("警告：無法找到文章內容區塊")
             self.content_html = "<p>無法提取文章內容</p>"
         
+        if cache_key is not None:
+            self.cache.put(cache_key, self._dump_parsed())
+        
+        self._print_article_info()
+    
+    def _make_soup(self, source):
+        """只把<head>與文章區塊交給解析器（ASCII相容的編碼直接以位元組擷取與解析）"""
+        markup = source.data if source.ascii_compatible else source.text()
+        print(f"檔案編碼: {source.encoding}")
+        
+        sliced = slice_article(markup)
+        if sliced is not None:
+            # 已經擷取出文章區塊，不需要再以引擎定位與擷取一次，直接以 html.parser 解析
+            print(f"已擷取文章區塊: {len(sliced) / 1024:.0f} KB / {len(markup) / 1024:.0f} KB")
+            markup = sliced
+            engine = 'html.parser'
+        else:
+            # 換行處理時才從mmap複製成位元組（只複製一次）；由引擎在整頁中定位文章區塊
+            print("無法擷取文章區塊，解析完整頁面")
+            engine = resolve_parser(self.parser)
+        
+        print(f"解析引擎: {engine}")
+        # 與文字模式讀檔相同的換行處理
+        return make_soup(normalize_newlines(markup), engine, source.encoding)
+    
+    def _print_article_info(self):
+        """顯示文章資訊"""
         print(f"標題: {self.title}")
         print(f"作者: {self.author}")
         print(f"發布日期: {self.publish_date_display}")
         print(f"最後修改: {self.last_modified}")
         print(f"找到 {len(self.images)} 張圖片")
     
+    def _dump_parsed(self):
+        """將解析結果轉為可保存的資料（圖片路徑相對於圖片目錄）"""
+        data = {field: getattr(self, field) for field in CACHED_FIELDS}
+        data['images'] = []
+        for img_info in self.images:
+            record = dict(img_info)
+            record.pop('downloaded_url', None)  # 背景下載中暫存的資訊，不屬於解析結果
+            record['local_path'] = Path(img_info['local_path']).relative_to(self.images_dir).as_posix()
+            data['images'].append(record)
+        return data
+    
+    def _load_parsed(self, data):
+        """從快取資料還原解析結果"""
+        for field in CACHED_FIELDS:
+            setattr(self, field, data[field])
+        self.images = []
+        for record in data['images']:
+            img_info = dict(record)
+            img_info['local_path'] = self.images_dir / record['local_path']
+            img_info['local_path'].parent.mkdir(parents=True, exist_ok=True)
+            self.images.append(img_info)
+    
     def _process_images(self, content_soup):
         """處理文章中的圖片"""
         img_tags = content_soup.find_all('img')
@@ -200,6 +303,9 @@ class VocusArticleConverter:
                 'relative_path': f"../../images/article_{self.publish_date}/{img_filename}"
             }
             self.images.append(img_info)
+            if self._start_downloads:
+                # Markdown與PDF的圖片路徑已決定，下載不必等到解析完成
+                self._start_image_download(img_info)
             
             # 更新img標籤的src屬性為本地路徑
             img['src'] = img_info['relative_path']
@@ -210,142 +316,29 @@ class VocusArticleConverter:
     
     def _clean_html_content(self, content_soup):
         """清理HTML內容中不需要的UI元素"""
+        engine = get_cleanup_engine(self.ad_patterns)
+        profile = self.cleanup_profile
         
-        # 首先標記所有需要保留的圖片
-        preserved_imgs = set()
-        all_imgs = content_soup.find_all('img')
-        for img in all_imgs:
-            # 如果img有src屬性且包含我們的相對路徑，則保留
-            src = img.get('src', '')
-            if '../../images/' in src:
-                preserved_imgs.add(img)
-        
-        # 移除縮放控制元素 (zoom control)
-        zoom_controls = content_soup.find_all('div', class_=re.compile('zoom-control'))
-        for control in zoom_controls:
-            # 確保不移除包含圖片的控制元素
-            if not control.find_all('img'):
-                control.decompose()
-        
-        # 移除放大按鈕和相關元素
-        zoom_buttons = content_soup.find_all('button', attrs={'aria-label': re.compile('Expand image')})
-        for button in zoom_buttons:
-            button.decompose()
-        
-        # 移除rmiz相關的縮放元素，但絕對保留圖片
-        rmiz_elements = content_soup.find_all(attrs={'data-rmiz': True})
-        for element in rmiz_elements:
-            if element.name == 'img':
-                # 如果是img標籤，只移除rmiz屬性，絕對保留圖片
-                if 'data-rmiz' in element.attrs:
-                    del element['data-rmiz']
-            else:
-                # 如果不是img標籤，檢查是否包含需要保留的圖片
-                contained_imgs = element.find_all('img')
-                preserved_contained = [img for img in contained_imgs if img in preserved_imgs]
-                
-                if preserved_contained:
-                    # 如果包含需要保留的圖片，將這些圖片移出後再移除容器
-                    for img in preserved_contained:
-                        element.insert_before(img)
-                    element.decompose()
-                else:
-                    # 如果沒有需要保留的圖片，直接移除
-                    element.decompose()
-        
-        # 移除所有SVG圖標 (這些通常是UI控制元素)
-        svgs = content_soup.find_all('svg')
-        for svg in svgs:
-            svg.decompose()
-        
-        # 移除ghost元素 (用於縮放的虛擬元素)
-        ghost_elements = content_soup.find_all(attrs={'data-rmiz-ghost': True})
-        for ghost in ghost_elements:
-            ghost.decompose()
-        
-        # 移除廣告相關內容
-        ad_patterns = [
-            "為什麼會看到廣告",
-            "廣告",
-            "advertisement",
-            "ads"
-        ]
-        
-        # 查找並移除包含廣告關鍵字的元素
-        all_elements = content_soup.find_all(text=True)
-        for text_node in all_elements:
-            text_content = text_node.strip()
-            for pattern in ad_patterns:
-                if pattern in text_content:
-                    # 找到包含此文字的父元素並移除
-                    parent = text_node.parent
-                    if parent:
-                        # 如果是完全匹配廣告文字的段落，移除整個段落
-                        if text_content == pattern or len(text_content) < 20:
-                            parent.decompose()
-                            break
-        
-        # 移除其他可能的UI控制元素（但保護圖片）
-        ui_selectors = [
-            {'class': re.compile('zoom.*control')},
-            {'class': re.compile('.*zoom.*')},
-            {'data-rmiz-btn-zoom': True},
-            {'data-rmiz-btn-zoom-icon': True},
-            {'class': re.compile('.*ad.*')},  # 廣告相關class
-            {'class': re.compile('.*advertisement.*')}
-        ]
-        
-        for selector in ui_selectors:
-            elements = content_soup.find_all(attrs=selector)
-            for element in elements:
-                # 檢查元素是否包含需要保留的圖片
-                if element.name == 'img' and element in preserved_imgs:
-                    continue  # 跳過保留的圖片
-                
-                contained_imgs = element.find_all('img')
-                preserved_contained = [img for img in contained_imgs if img in preserved_imgs]
-                
-                if preserved_contained:
-                    # 如果包含需要保留的圖片，將這些圖片移出後再移除容器
-                    for img in preserved_contained:
-                        element.insert_before(img)
-                
-                element.decompose()
+        # 以規則表單次走訪移除縮放控制、SVG圖標、廣告等UI元素（保護圖片）
+        engine.clean(content_soup, profile)
         
         # 修正編號問題 - 查找並修正錯誤的編號
         self._fix_numbering_issues(content_soup)
         
         # 移除空的div容器（但保留包含圖片的div）
-        empty_divs = content_soup.find_all('div')
-        for div in empty_divs:
-            # 檢查div是否為空（無文字、無圖片、無視頻、無音頻）
-            if (not div.get_text(strip=True) and 
-                not div.find_all(['img', 'video', 'audio']) and
-                not div.find_all(attrs={'src': True})):  # 額外檢查有src屬性的元素
-                div.decompose()
+        engine.remove_empty_divs(content_soup, profile)
         
         print(f"已清理HTML內容中的UI控制元素和廣告內容")
+        
+        if profile is not None:
+            profile.add_article()
+            print(profile.format_report())
     
     def _fix_numbering_issues(self, content_soup):
-        """修正編號問題"""
-        # 查找包含特定文字的列表項目並修正編號
-        all_elements = content_soup.find_all(['li', 'ol', 'p', 'div', 'span'])
-        
-        for item in all_elements:
-            # 檢查元素內的所有文字內容，包括子元素
-            text_content = item.get_text()
-            
-            # 修正 "Meta 的資本支出從 2024 開始明顯跳升" 的編號
-            if "Meta" in text_content and "資本支出" in text_content and "2024" in text_content and "跳升" in text_content:
-                # 查找包含錯誤編號的具體文字節點
-                if "1." in text_content and "Meta" in text_content:
-                    # 直接修改HTML字符串內容
-                    original_html = str(item)
-                    if "1." in original_html and "Meta" in original_html:
-                        corrected_html = original_html.replace("1.", "3.", 1)
-                        item.replace_with(BeautifulSoup(corrected_html, 'html.parser'))
-                        print("已修正Meta資本支出段落的編號：1 → 3")
-                        break
+        """修正編號問題 - 接續被圖片打斷後重新從1開始的手動編號"""
+        fixed = renumber_lists(content_soup, self.cleanup_profile)
+        if fixed:
+            print(f"已修正 {fixed} 個重新從1開始的列表編號")
     
     def _get_image_extension(self, url):
         """從URL獲取圖片副檔名"""
@@ -360,130 +353,48 @@ class VocusArticleConverter:
         return '.jpg'
     
     def download_images(self):
-        """下載所有圖片"""
-        print(f"\n開始下載圖片...")
-        
-        session = requests.Session()
-        success_count = 0
-        fail_count = 0
+        """
+        下載所有圖片並等待完成（圖片編號與儲存路徑在解析時已決定）
+        解析時已開始的下載只需要等待；有共用的下載引擎時排入整批共用的佇列，
+        否則以 image_workers 為上限建立自己的引擎
+        """
+        if self._downloads is None:
+            for img_info in self.images:
+                self._start_image_download(img_info)
+        downloads, self._downloads = self._downloads, None
+        
+        print("\n等待圖片下載...")
         
         self.total_images = len(self.images)
         self.downloaded_images = 0
         
-        # 發送初始進度
-        if self.image_progress_callback:
-            self.image_progress_callback(0, self.total_images)
-        
-        for idx, img_info in enumerate(self.images):
-            # 嘗試多種下載策略
-            download_success = False
-            
-            # 策略1：直接下載原始URL（通常是images.vocus.cc）
-            if img_info['url'] and 'images.vocus.cc' in img_info['url']:
-                download_success = self._try_download(
-                    session, 
-                    img_info['url'], 
-                    img_info['local_path'],
-                    strategy="原始URL"
-                )
-            
-            # 策略2：如果有resize URL，嘗試使用它
-            if not download_success and img_info.get('resize_url'):
-                download_success = self._try_download(
-                    session,
-                    img_info['resize_url'],
-                    img_info['local_path'],
-                    strategy="Resize URL"
-                )
-            
-            # 策略3：嘗試使用不同的請求頭組合
-            if not download_success and img_info['url']:
-                # 嘗試模擬從網頁直接訪問
-                headers_web = {
-                    'User-Agent': 'Mozilla/5.0 (Macintosh; Intel Mac OS X 10_15_7) AppleWebKit/537.36 (KHTML, like Gecko) Chrome/120.0.0.0 Safari/537.36',
-                    'Accept': 'text/html,application/xhtml+xml,application/xml;q=0.9,image/avif,image/webp,image/apng,*/*;q=0.8',
-                    'Accept-Language': 'zh-TW,zh;q=0.9,en;q=0.8',
-                    'Accept-Encoding': 'gzip, deflate, br',
-                    'Cache-Control': 'no-cache',
-                    'Pragma': 'no-cache',
-                    'Upgrade-Insecure-Requests': '1'
-                }
-                download_success = self._try_download(
-                    session,
-                    img_info['url'],
-                    img_info['local_path'],
-                    strategy="網頁模式",
-                    headers=headers_web
-                )
-            
-            if download_success:
-                success_count += 1
-                self.downloaded_images += 1
-            else:
-                fail_count += 1
-                print(f"  → 所有策略都失敗了，請手動下載: {img_info['url']}")
-                print(f"  → 目標位置: {img_info['local_path']}")
-            
-            # 更新進度
+        def progress(done, total):
+            self.downloaded_images = done
             if self.image_progress_callback:
-                self.image_progress_callback(self.downloaded_images, self.total_images)
-        
-        print(f"\n下載完成：成功 {success_count} 個，失敗 {fail_count} 個")
-    
-    def _try_download(self, session, url, save_path, strategy="", headers=None):
-        """嘗試下載圖片"""
-        if not headers:
-            # 預設請求頭（模擬瀏覽器請求圖片）
-            headers = {
-                'User-Agent': 'Mozilla/5.0 (Macintosh; Intel Mac OS X 10_15_7) AppleWebKit/537.36 (KHTML, like Gecko) Chrome/120.0.0.0 Safari/537.36',
-                'Accept': 'image/avif,image/webp,image/apng,image/svg+xml,image/*,*/*;q=0.8',
-                'Accept-Language': 'zh-TW,zh;q=0.9,en;q=0.8',
-                'Accept-Encoding': 'gzip, deflate, br',
-                'Referer': 'https://vocus.cc/',
-                'Sec-Ch-Ua': '"Not_A Brand";v="8", "Chromium";v="120", "Google Chrome";v="120"',
-                'Sec-Ch-Ua-Mobile': '?0',
-                'Sec-Ch-Ua-Platform': '"macOS"',
-                'Sec-Fetch-Dest': 'image',
-                'Sec-Fetch-Mode': 'no-cors',
-                'Sec-Fetch-Site': 'same-site',
-                'Connection': 'keep-alive'
-            }
-        
-        try:
-            print(f"  → 嘗試 {strategy}: {url}")
-            response = session.get(url, headers=headers, timeout=30, stream=True)
-            response.raise_for_status()
-            
-            # 檢查內容類型
-            content_type = response.headers.get('content-type', '')
-            if 'image' not in content_type and 'octet-stream' not in content_type:
-                print(f"    → 回應不是圖片: {content_type}")
-                return False
-            
-            # 儲存圖片
-            with open(save_path, 'wb') as f:
-                for chunk in response.iter_content(chunk_size=8192):
-                    if chunk:
-                        f.write(chunk)
-            
-            # 檢查檔案大小
-            file_size = save_path.stat().st_size
-            if file_size < 100:  # 小於100 bytes可能是錯誤頁面
-                save_path.unlink()  # 刪除無效檔案
-                print(f"    → 檔案太小，可能是錯誤: {file_size} bytes")
-                return False
-            
-            print(f"    → 成功！儲存至: {save_path} ({file_size:,} bytes)")
-            return True
-            
-        except requests.exceptions.HTTPError as e:
-            print(f"    → HTTP錯誤: {e}")
-        except requests.exceptions.Timeout:
-            print(f"    → 請求超時")
-        except Exception as e:
-            print(f"    → 錯誤: {str(e)}")
+                self.image_progress_callback(done, total)
         
-        return False
+        if downloads is None:
+            progress(0, 0)
+            return
+        downloads.wait(progress)
+        self._update_image_paths()
+    
+    def _update_image_paths(self):
+        """縮圖依實際格式改了副檔名時，更新Markdown與PDF引用的圖片路徑"""
+        for img_info in self.images:
+            old_path = img_info['relative_path']
+            new_path = f"{old_path.rsplit('/', 1)[0]}/{Path(img_info['local_path']).name}"
+            if new_path != old_path:
+                self.content_html = self.content_html.replace(f'src="{old_path}"', f'src="{new_path}"')
+                img_info['relative_path'] = new_path
+    
+    def _start_image_download(self, img_info):
+        """在背景開始下載一張圖片（第一張圖片時建立這篇文章的一批下載）"""
+        if self._downloads is None:
+            print("開始下載圖片...")
+            self._downloads = self.downloader.begin(engine=self.fetch_engine, workers=self.image_workers,
+                                                    hedge=self.hedge_requests)
+        self._downloads.add(img_info)
     
     def convert_to_markdown(self):
         """轉換為Markdown格式"""
@@ -522,12 +433,29 @@ class VocusArticleConverter:
         print(f"Markdown檔案已儲存至: {md_path}")
         return md_path
     
-    def convert_to_pdf(self):
-        """轉換為PDF格式"""
-        print(f"\n轉換為PDF格式...")
-        
-        # 處理HTML內容中的圖片路徑，將相對路徑轉換為絕對路徑
+    def _prepare_pdf_images(self):
+        """產生PDF用的圖片衍生檔，回傳 {圖片相對路徑: 衍生檔路徑}（只包含與原圖不同的項目）"""
+        print("準備PDF用圖片...")
+        derived = build_derivatives([img_info['local_path'] for img_info in self.images],
+                                    self.images_dir, dpi=self.pdf_image_dpi)
+        pdf_images = {}
+        for img_info in self.images:
+            target = derived.get(img_info['local_path'])
+            if target is not None and target != img_info['local_path']:
+                pdf_images[img_info['relative_path']] = Path(target).resolve()
+        return pdf_images
+    
+    def _build_pdf_html(self, minify=True, pdf_images=None):
+        """
+        建立PDF用的完整HTML（圖片改為絕對路徑，minify 時先精簡DOM）
+        pdf_images 中有的圖片改為引用衍生檔
+        """
+        pdf_images = pdf_images or {}
         processed_html = self.content_html
+        if minify:
+            processed_html, stats = minify_html(processed_html)
+            print(f"已精簡PDF用的HTML: {stats['nodes_before']} → {stats['nodes_after']} 個節點，"
+                  f"{stats['bytes_before'] / 1024:.0f} KB → {stats['bytes_after'] / 1024:.0f} KB")
         
         # 將圖片的相對路徑轉換為絕對路徑
         import re
@@ -538,7 +466,9 @@ class VocusArticleConverter:
             src_match = re.search(r'src="([^"]+)"', img_tag)
             if src_match:
                 src_path = src_match.group(1)
-                if src_path.startswith('../../images/'):
+                if src_path in pdf_images:
+                    img_tag = img_tag.replace(src_path, pdf_images[src_path].as_uri())
+                elif src_path.startswith('../../images/'):
                     # 轉換為絕對路徑
                     abs_path = str(Path.cwd() / src_path[6:])  # 移除 '../../'
                     img_tag = img_tag.replace(src_path, f"file://{abs_path}")
@@ -633,6 +563,14 @@ class VocusArticleConverter:
 </body>
 </html>
 """
+        return full_html
+    
+    def convert_to_pdf(self):
+        """轉換為PDF格式"""
+        print(f"\n轉換為PDF格式...")
+        
+        pdf_images = self._prepare_pdf_images() if self.image_derivatives and self.images else {}
+        full_html = self._build_pdf_html(minify=self.minify_pdf, pdf_images=pdf_images)
         
         # 設定字體配置
         font_config = FontConfiguration()
@@ -664,7 +602,17 @@ class VocusArticleConverter:
         
         return pdf_path
     
-    def _safe_filename(self, filename):
+    @staticmethod
+    def _date_prefix(pubdate_str):
+        """將pubdate轉換為檔名使用的YYYYMMDD前綴（與parse_html相同的規則）"""
+        try:
+            dt = datetime.fromisoformat((pubdate_str or '').replace('Z', '+00:00'))
+        except ValueError:
+            dt = datetime.now()
+        return dt.strftime('%Y%m%d')
+    
+    @staticmethod
+    def _safe_filename(filename):
         """生成安全的檔案名稱"""
         # 移除或替換不安全的字元
         safe = re.sub(r'[<>:"/\\|?*]', '_', filename)
@@ -675,47 +623,7 @@ class VocusArticleConverter:
     
     def check_already_converted(self):
         """檢查文章是否已經被轉換過"""
-        # 先解析HTML獲取標題（但不進行完整處理）
-        with open(self.input_file, 'r', encoding='utf-8') as f:
-            html_content = f.read()
-        
-        soup = BeautifulSoup(html_content, 'html.parser')
-        
-        # 提取標題
-        title_meta = soup.find('meta', {'property': 'og:title'})
-        if title_meta:
-            title = title_meta.get('content', '').strip()
-        else:
-            h1_tag = soup.find('h1')
-            if h1_tag:
-                title = h1_tag.get_text().strip()
-            else:
-                return False, "無法提取標題"
-        
-        # 生成安全的檔案名稱
-        safe_title = self._safe_filename(title)
-        
-        # 檢查PDF和Markdown檔案是否存在
-        pdf_path = self.output_dir / "pdf" / f"{safe_title}.pdf"
-        md_path = self.output_dir / "md" / f"{safe_title}.md"
-        
-        pdf_exists = pdf_path.exists()
-        md_exists = md_path.exists()
-        
-        if pdf_exists and md_exists:
-            # 檢查檔案修改時間是否比HTML檔案新
-            html_mtime = self.input_file.stat().st_mtime
-            pdf_mtime = pdf_path.stat().st_mtime
-            md_mtime = md_path.stat().st_mtime
-            
-            if pdf_mtime > html_mtime and md_mtime > html_mtime:
-                return True, f"已存在且較新: {safe_title}"
-            else:
-                return True, f"已存在但較舊: {safe_title}"
-        elif pdf_exists or md_exists:
-            return True, f"部分已存在: {safe_title}"
-        else:
-            return False, f"未轉換: {safe_title}"
+        return check_already_converted(self.input_file, self.output_dir)
     
     def convert(self):
         """執行完整的轉換流程"""
@@ -723,26 +631,37 @@ class VocusArticleConverter:
         print("開始轉換方格子文章")
         print("="*50)
         
-        # 1. 解析HTML
-        self.parse_html()
+        self.prepare()
+        self.finish()
         
-        # 2. 下載圖片
+        print("\n轉換完成！")
+        print("="*50)
+    
+    def prepare(self):
+        """
+        轉換的前半段：解析文章，圖片在背景下載
+        批次轉換時先準備下一篇文章，它的圖片和這篇的PDF轉換同時進行
+        """
+        # 1. 解析HTML（每發現一張圖片就在背景開始下載）
+        self.parse_html(start_downloads=True)
+        
+        # 2. 生成並保存圖片URL列表
         if self.images:
-            self.download_images()
-            
-            # 3. 生成並保存圖片URL列表
             self._save_image_urls()
         
-        # 4. HTML檔案由使用者自行管理，不需要移動
+        # 3. HTML檔案由使用者自行管理，不需要移動
+    
+    def finish(self):
+        """轉換的後半段：等待圖片下載完成，轉換為Markdown與PDF"""
+        # 4. 等待圖片下載完成（縮圖的副檔名依實際格式決定，之後圖片路徑才確定）
+        if self.images:
+            self.download_images()
         
         # 5. 轉換為Markdown
         self.convert_to_markdown()
         
         # 6. 轉換為PDF
         self.convert_to_pdf()
-        
-        print("\n轉換完成！")
-        print("="*50)
     
     def _save_image_urls(self):
         """保存圖片URL列表到對應的圖片資料夾"""
@@ -770,14 +689,85 @@ class VocusArticleConverter:
     
 
 
+def check_already_converted(input_file, output_dir="output"):
+    """
+    檢查文章是否已經被轉換過，回傳 (是否已轉換, 狀態說明)
+    只串流讀取<head>獲取標題與發布日期，不需要建立轉換器（批次預先檢查時使用）
+    """
+    input_file = Path(input_file)
+    output_dir = Path(output_dir)
+    metadata = read_head_metadata(input_file)
+    title = metadata['title']
+    if title is None:
+        return False, "無法提取標題"
+    
+    # 生成與convert_to_pdf/convert_to_markdown相同的檔案名稱
+    date_prefix = VocusArticleConverter._date_prefix(metadata['pubdate'])
+    safe_title = f"{date_prefix}_{VocusArticleConverter._safe_filename(title)}"
+    
+    # 檢查PDF和Markdown檔案是否存在
+    pdf_path = output_dir / "pdf" / f"{safe_title}.pdf"
+    md_path = output_dir / "md" / f"{safe_title}.md"
+    
+    pdf_exists = pdf_path.exists()
+    md_exists = md_path.exists()
+    
+    if pdf_exists and md_exists:
+        # 檢查檔案修改時間是否比HTML檔案新
+        html_mtime = input_file.stat().st_mtime
+        pdf_mtime = pdf_path.stat().st_mtime
+        md_mtime = md_path.stat().st_mtime
+        
+        if pdf_mtime > html_mtime and md_mtime > html_mtime:
+            return True, f"已存在且較新: {safe_title}"
+        else:
+            return True, f"已存在但較舊: {safe_title}"
+    elif pdf_exists or md_exists:
+        return True, f"部分已存在: {safe_title}"
+    else:
+        return False, f"未轉換: {safe_title}"
+
+
 def main():
     """主函數"""
     parser = argparse.ArgumentParser(description='將方格子HTML文章轉換為PDF和Markdown格式')
     parser.add_argument('input_file', help='輸入的HTML檔案路徑')
     parser.add_argument('--output-dir', '-o', default='output', help='輸出目錄 (預設: output)')
     parser.add_argument('--images-dir', '-i', default='images', help='圖片儲存目錄 (預設: images)')
+    parser.add_argument('--parser', choices=PARSER_CHOICES, default=DEFAULT_PARSER,
+                        help=f'HTML解析引擎，不可用時自動退回html.parser (預設: {DEFAULT_PARSER})')
+    parser.add_argument('--ad-patterns', help='額外的廣告關鍵字檔案（每行一個）')
+    parser.add_argument('--no-cache', action='store_true', help='不使用解析結果快取')
+    parser.add_argument('--cache-max-mb', type=int, default=DEFAULT_MAX_MB,
+                        help=f'解析結果快取容量上限 (預設: {DEFAULT_MAX_MB} MB)')
+    parser.add_argument('--profile-cleanup', action='store_true',
+                        help='記錄每條清理規則的耗時與移除節點數（建議搭配 --no-cache）')
+    parser.add_argument('--no-minify', action='store_true', help='PDF轉換前不精簡HTML')
+    parser.add_argument('--image-workers', type=int, default=DEFAULT_IMAGE_WORKERS,
+                        help=f'同一篇文章同時下載的圖片數 (預設: {DEFAULT_IMAGE_WORKERS})')
+    parser.add_argument('--no-image-store', action='store_true',
+                        help='不使用圖片儲存區（每篇文章各自下載與儲存圖片）')
+    parser.add_argument('--no-http-cache', action='store_true',
+                        help='重新下載圖片時不送出條件式請求（If-None-Match / If-Modified-Since）')
+    parser.add_argument('--max-image-width', type=int, metavar='PX',
+                        help='先下載這個寬度的縮圖（例如1600），失敗時退回原圖 (預設: 下載原圖)')
+    parser.add_argument('--no-image-derivatives', action='store_true',
+                        help='PDF直接嵌入原圖，不先縮小與轉檔')
+    parser.add_argument('--pdf-image-dpi', type=int, default=DEFAULT_PDF_IMAGE_DPI,
+                        help=f'PDF用圖片縮小到的頁面解析度 (預設: {DEFAULT_PDF_IMAGE_DPI})')
+    parser.add_argument('--rate-limit', type=float, default=DEFAULT_RATE,
+                        help=f'每個主機每秒的請求數上限 (預設: {DEFAULT_RATE:g})')
+    parser.add_argument('--max-bytes-per-sec', type=int,
+                        help='每個主機每秒下載的位元組數上限 (預設: 不限制)')
+    parser.add_argument('--no-hedge', action='store_true',
+                        help='不使用對沖請求（下載方式失敗後才嘗試下一個）')
+    parser.add_argument('--offline-archive', metavar='PATH',
+                        help='離線模式：圖片只從這個封存（目錄或.zip）取得，缺少的圖片只回報不下載')
+    parser.add_argument('--record-archive', metavar='PATH',
+                        help='把下載完成的圖片記錄到這個封存（目錄或.zip），供之後離線重播')
     
     args = parser.parse_args()
+    configure_rate_limiter(rate=args.rate_limit, bytes_per_sec=args.max_bytes_per_sec)
     
     # 檢查輸入檔案是否存在
     if not os.path.exists(args.input_file):
@@ -788,7 +778,22 @@ def main():
     converter = VocusArticleConverter(
         input_file=args.input_file,
         output_dir=args.output_dir,
-        images_dir=args.images_dir
+        images_dir=args.images_dir,
+        parser=args.parser,
+        ad_patterns=load_ad_patterns(args.ad_patterns) if args.ad_patterns else None,
+        use_cache=not args.no_cache,
+        cache_max_mb=args.cache_max_mb,
+        profile_cleanup=args.profile_cleanup,
+        minify_pdf=not args.no_minify,
+        image_workers=args.image_workers,
+        use_image_store=not args.no_image_store,
+        use_http_cache=not args.no_http_cache,
+        max_image_width=args.max_image_width,
+        image_derivatives=not args.no_image_derivatives,
+        pdf_image_dpi=args.pdf_image_dpi,
+        hedge_requests=not args.no_hedge,
+        offline_archive=args.offline_archive,
+        record_archive=args.record_archive
     )
     
     converter.convert()